@@ -0,0 +1,2 @@
+from .dataset import load_dataset
+from .parse import explode, parse_list, parse_lists, read_csv_lists
@@ -0,0 +1,137 @@
+import argparse
+import os
+import re
+from multiprocessing import Pool
+
+import pandas as pd
+
+from .dataset import DATA_FOLDER, load_dataset
+from .hadolint import dockerfile_hashes
+
+
+BASE_IMAGES_PATH = os.path.join(DATA_FOLDER, 'RQ2_base_images.csv')
+BASE_IMAGE_COLUMNS = [
+    'image_name', 'update_year', 'base_image_name', 'base_image_tag', 'registry', 'digest', 'platform', 'stage',
+]
+# Dockerfiles parsed by each task of the pool
+CHUNK_SIZE = 1000
+DOCKER_HUB_REGISTRIES = ['docker.io', 'index.docker.io', 'registry-1.docker.io']
+CONTINUATION_PATTERN = re.compile(r'\\[ \t]*\r?\n')
+INSTRUCTION_PATTERN = re.compile(r'^[ \t]*(FROM|ARG)[ \t]+(.*)$', re.IGNORECASE | re.MULTILINE)
+# $NAME, ${NAME}, ${NAME:-default} and ${NAME-default}
+VARIABLE_PATTERN = re.compile(r'\$(?:\{(\w+)(?::?-([^}]*))?\}|(\w+))')
+
+
+def parse_args(arguments, args):
+    # ARG NAME=value OTHER="value" NO_DEFAULT
+    for argument in arguments.split():
+        name, equals, value = argument.partition('=')
+        if(equals):
+            args[name] = substitute(value.strip('"\''), args)
+
+
+def substitute(reference, args):
+    def replace(match):
+        name = match.group(1) or match.group(3)
+        if(name in args):
+            return args[name]
+        return match.group(2) if match.group(2) != None else match.group(0)
+    return VARIABLE_PATTERN.sub(replace, reference)
+
+
+# (stage, reference, platform, stage name, is stage reference) of each FROM of a Dockerfile, with the
+# ARGs declared before the first FROM substituted
+def parse_dockerfile(dockerfile):
+    if(type(dockerfile) != str):
+        return []
+    args = {}
+    stages = set()
+    results = []
+    for instruction, arguments in INSTRUCTION_PATTERN.findall(CONTINUATION_PATTERN.sub(' ', dockerfile)):
+        if(instruction.upper() == 'ARG'):
+            if(len(results) == 0):  # Only the ARGs before the first FROM apply to FROM
+                parse_args(arguments, args)
+            continue
+        platform = None
+        words = arguments.split()
+        while(len(words) > 0 and words[0].startswith('--')):
+            flag, equals, value = words.pop(0).partition('=')
+            if(flag.lower() == '--platform'):
+                platform = substitute(value, args)
+        if(len(words) == 0):
+            continue
+        reference = substitute(words[0], args)
+        stage_name = words[2].lower() if len(words) >= 3 and words[1].upper() == 'AS' else None
+        results.append((len(results), reference, platform, stage_name, reference.lower() in stages))
+        if(stage_name != None):
+            stages.add(stage_name)
+    return results
+
+
+# Split an image reference into (registry, name, tag, digest), e.g. docker.io/library/ubuntu into
+# (docker.io, ubuntu, latest, None)
+def split_reference(reference):
+    digest = None
+    if('@' in reference):
+        reference, digest = reference.split('@', 1)
+    tag = None
+    colon = reference.rfind(':')
+    if(colon > reference.rfind('/')):  # Not the port of a registry
+        reference, tag = reference[:colon], reference[colon + 1:]
+    parts = reference.split('/')
+    registry = None
+    name = reference
+    if(len(parts) > 1 and ('.' in parts[0] or ':' in parts[0] or parts[0] == 'localhost')):
+        registry = parts[0]
+        if(registry.lower() in DOCKER_HUB_REGISTRIES):
+            registry = None
+            name = '/'.join(parts[1:])
+    if(registry == None and name.startswith('library/')):
+        name = name[len('library/'):]
+    if(tag == None and digest == None):
+        tag = 'latest'
+    return registry, name, tag, digest
+
+
+def parse_base_images(dockerfile):
+    results = []
+    for stage, reference, platform, stage_name, is_stage in parse_dockerfile(dockerfile):
+        if(not is_stage):
+            results.append((stage, platform) + split_reference(reference))
+    return results
+
+
+# One row per FROM of a Series of Dockerfiles, parsed by a pool of processes (all the CPUs by default)
+def extract_base_images(dockerfiles, processes=None, chunk_size=CHUNK_SIZE):
+    dockerfiles = pd.Series(dockerfiles)
+    if(processes != 1 and len(dockerfiles) > chunk_size):
+        with Pool(processes) as pool:
+            results = pool.map(parse_base_images, dockerfiles.values, chunk_size)
+    else:
+        results = [parse_base_images(dockerfile) for dockerfile in dockerfiles.values]
+    rows = [(label,) + result for label, dockerfile_results in zip(dockerfiles.index, results)
+            for result in dockerfile_results]
+    return pd.DataFrame(rows, columns=['row', 'stage', 'platform', 'registry', 'base_image_name', 'base_image_tag',
+                                       'digest'])
+
+
+# Base images table of RQ2, each distinct Dockerfile counted once, for the first image using it
+def base_image_table(images, processes=None):
+    images = images[images['latest_dockerfile'].notnull()]
+    dockerfiles = images[~dockerfile_hashes(images).duplicated(keep='first')]
+    dockerfiles.index = range(0, dockerfiles.shape[0])
+    base_images = extract_base_images(dockerfiles['latest_dockerfile'], processes)
+    base_images['image_name'] = dockerfiles['image_name'].values[base_images['row'].values]
+    base_images['update_year'] = pd.to_datetime(dockerfiles['pushed_at']).dt.year.values[base_images['row'].values]
+    return base_images[BASE_IMAGE_COLUMNS]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild RQ2_base_images.csv from the dataset')
+    parser.add_argument('path', nargs='?', default=BASE_IMAGES_PATH)
+    parser.add_argument('--processes', type=int, help='processes parsing the Dockerfiles, all the CPUs by default')
+    args = parser.parse_args()
+    images = load_dataset(['image_name', 'latest_dockerfile', 'pushed_at'], dockerfiles_only=True)
+    base_images = base_image_table(images, args.processes)
+    base_images.to_csv(args.path, index=False)
+    print('Wrote {} base images to {}'.format(len(base_images), args.path))
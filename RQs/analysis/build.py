@@ -0,0 +1,92 @@
+import argparse
+import os
+import shutil
+import time
+from multiprocessing import Pool
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .dataset import (BOOLEAN_COLUMNS, CATEGORY_COLUMNS, COLUMNS, CSV_PATH, DATASET_PATH, DATETIME_COLUMNS,
+                      INTEGER_COLUMNS, LIST_COLUMNS, NO_DOCKERFILE, PARTITION_COLUMN, ROW_COLUMN, file_schema)
+from .parse import parse_lists, to_datetime
+
+
+CHUNK_SIZE = 100000
+# Lists decoded by each task of the pool
+LIST_CHUNK_SIZE = 10000
+
+
+def read_chunks(path, chunk_size):
+    # Read every column as text, the types are set by build_chunk
+    try:  # Skip malformed lines, as the notebooks did
+        return pd.read_csv(path, usecols=COLUMNS, dtype=str, chunksize=chunk_size, on_bad_lines='skip')
+    except TypeError:  # pandas < 1.3
+        return pd.read_csv(path, usecols=COLUMNS, dtype=str, chunksize=chunk_size, error_bad_lines=False,
+                           warn_bad_lines=False)
+
+
+def build_chunk(df, schema, pool=None):
+    arrays = []
+    for field in schema:
+        column = df[field.name]
+        if(field.name in INTEGER_COLUMNS):
+            array = pa.array(pd.to_numeric(column, errors='coerce'), from_pandas=True).cast(pa.int64(), safe=False)
+        elif(field.name in BOOLEAN_COLUMNS):
+            array = pa.array(column.str.lower().map({'true': True, 'false': False}), type=pa.bool_(), from_pandas=True)
+        elif(field.name in DATETIME_COLUMNS):
+            array = pa.array(to_datetime(column), type=field.type, from_pandas=True)
+        elif(field.name in CATEGORY_COLUMNS):
+            array = pa.array(column, type=pa.string(), from_pandas=True).dictionary_encode()
+        elif(field.name in LIST_COLUMNS):
+            array = parse_lists(column, LIST_COLUMNS[field.name], processes=1, pool=pool, chunk_size=LIST_CHUNK_SIZE)
+        else:
+            array = pa.array(column, type=field.type, from_pandas=True)
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+# Convert docker_image_dataset.csv chunk by chunk into a Parquet dataset partitioned by collection_method,
+# moved in place once complete
+def build_dataset(csv_path=CSV_PATH, path=DATASET_PATH, chunk_size=CHUNK_SIZE, processes=None, log=print):
+    schema = file_schema()
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    writers = {}
+    count = 0
+    start = time.time()
+    pool = Pool(processes) if processes != 1 else None
+    try:
+        for df in read_chunks(csv_path, chunk_size):
+            df.index = range(count, count + len(df))
+            df[ROW_COLUMN] = df.index
+            # The CSV file spells out NA for the images without a Dockerfile, which pandas reads as missing
+            df[PARTITION_COLUMN] = df[PARTITION_COLUMN].fillna(NO_DOCKERFILE)
+            for method, partition in df.groupby(PARTITION_COLUMN):
+                if(not method in writers):
+                    partition_path = os.path.join(tmp_path, '{}={}'.format(PARTITION_COLUMN, method))
+                    os.makedirs(partition_path)
+                    writers[method] = pq.ParquetWriter(os.path.join(partition_path, 'part-0.parquet'), schema)
+                writers[method].write_table(build_chunk(partition, schema, pool))
+            count += len(df)
+            log('{} rows converted ({:.0f} rows/s)'.format(count, count / max(time.time() - start, 1e-6)))
+    finally:
+        for writer in writers.values():
+            writer.close()
+        if(pool != None):
+            pool.close()
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp_path, path)
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the Parquet dataset loaded by analysis.load_dataset')
+    parser.add_argument('csv_path', nargs='?', default=CSV_PATH)
+    parser.add_argument('path', nargs='?', default=DATASET_PATH)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--processes', type=int, help='processes decoding the list columns, all the CPUs by default')
+    args = parser.parse_args()
+    count = build_dataset(args.csv_path, args.path, args.chunk_size, args.processes)
+    print('Built {} from {} rows of {}'.format(args.path, count, args.csv_path))
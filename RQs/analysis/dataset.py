@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from .parse import to_lists
+
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+CSV_PATH = os.path.join(DATA_FOLDER, 'docker_image_dataset.csv')
+DATASET_PATH = os.path.join(DATA_FOLDER, 'docker_image_dataset')
+
+# Columns of docker_image_dataset.csv, as described in the README
+COLUMNS = [
+    'image_name', 'source_repo_name', 'latest_dockerfile', 'tags_count', 'tags_name', 'image_size',
+    'image_updated_at', 'image_pull_count', 'image_star_count', 'image_description', 'repo_commits_count',
+    'dockerfile_commit_sha', 'dockerfile_commit_date', 'dockerfile_commit_message', 'language', 'forks_count',
+    'stargazers_count', 'watchers_count', 'repo_size', 'default_branch', 'open_issues_count', 'has_issues',
+    'has_projects', 'has_wiki', 'has_pages', 'has_downloads', 'archived', 'pushed_at', 'created_at', 'updated_at',
+    'subscribers_count', 'network_count', 'license', 'collection_method',
+]
+INTEGER_COLUMNS = [
+    'tags_count', 'image_pull_count', 'image_star_count', 'repo_commits_count', 'forks_count', 'stargazers_count',
+    'watchers_count', 'repo_size', 'open_issues_count', 'subscribers_count', 'network_count',
+]
+BOOLEAN_COLUMNS = ['has_issues', 'has_projects', 'has_wiki', 'has_pages', 'has_downloads', 'archived']
+DATETIME_COLUMNS = ['pushed_at', 'created_at', 'updated_at']
+CATEGORY_COLUMNS = ['language', 'license', 'collection_method']
+# Stringified list columns and the type of their items
+LIST_COLUMNS = {
+    'tags_name': pa.string(),
+    'image_size': pa.int64(),
+    'image_updated_at': pa.timestamp('us'),
+    'dockerfile_commit_sha': pa.string(),
+    'dockerfile_commit_date': pa.timestamp('us'),
+    'dockerfile_commit_message': pa.string(),
+}
+# The dataset is partitioned by collection_method, NA being the images without a Dockerfile
+PARTITION_COLUMN = 'collection_method'
+NO_DOCKERFILE = 'NA'
+# Line of each image in the CSV file, to load the images in their original order
+ROW_COLUMN = 'row'
+# Images read at a time by iter_dataset
+BATCH_SIZE = 100000
+
+
+def column_type(column):
+    if(column in INTEGER_COLUMNS):
+        return pa.int64()
+    if(column in BOOLEAN_COLUMNS):
+        return pa.bool_()
+    if(column in DATETIME_COLUMNS):
+        return pa.timestamp('us')
+    if(column in CATEGORY_COLUMNS):
+        return pa.dictionary(pa.int32(), pa.string())
+    if(column in LIST_COLUMNS):
+        return pa.list_(LIST_COLUMNS[column])
+    return pa.string()
+
+
+# Schema of the files of a partition, which do not store the partition column
+def file_schema():
+    return pa.schema([pa.field(ROW_COLUMN, pa.int64())] + [
+        pa.field(column, column_type(column)) for column in COLUMNS if column != PARTITION_COLUMN])
+
+
+def open_dataset(columns, path=DATASET_PATH):
+    if(not os.path.isdir(path)):
+        raise FileNotFoundError('{} not found, build it with python3 -m analysis.build'.format(path))
+    unknown = [column for column in columns if column not in COLUMNS]
+    if(len(unknown) > 0):
+        raise ValueError('Unknown columns: {}'.format(', '.join(unknown)))
+    return ds.dataset(path, format='parquet', partitioning='hive', filesystem=fs.LocalFileSystem(use_mmap=True))
+
+
+def dataset_filter(dockerfiles_only):
+    # Filtering on the partition column skips the files of the other partitions
+    return (ds.field(PARTITION_COLUMN) != NO_DOCKERFILE) if dockerfiles_only else None
+
+
+# Columns of the dataset built by analysis.build as an Arrow table, in the order of the CSV file
+def read_table(columns=None, dockerfiles_only=False, path=DATASET_PATH):
+    columns = list(columns or COLUMNS)
+    dataset = open_dataset(columns, path)
+    table = dataset.to_table(columns=[ROW_COLUMN] + columns, filter=dataset_filter(dockerfiles_only))
+    table = table.take(pa.array(np.argsort(table.column(ROW_COLUMN).to_numpy(), kind='stable')))
+    return table.drop([ROW_COLUMN])
+
+
+def to_frame(table, columns):
+    # DataFrame of a table of the dataset, typed as described in load_dataset
+    df = table.drop([column for column in columns if column in LIST_COLUMNS]).to_pandas()
+    for column in columns:
+        if(column in LIST_COLUMNS):
+            df[column] = to_lists(table.column(column))
+        elif(column in CATEGORY_COLUMNS and df[column].dtype.name != 'category'):
+            df[column] = df[column].astype('category')
+    if(PARTITION_COLUMN in columns):
+        df[PARTITION_COLUMN] = df[PARTITION_COLUMN].cat.remove_categories(
+            [category for category in [NO_DOCKERFILE] if category in df[PARTITION_COLUMN].cat.categories])
+    return df[columns]
+
+
+# Columns of the dataset as a DataFrame, the list columns decoded and the timestamps parsed (see
+# analysis.build); dockerfiles_only skips the images without a Dockerfile
+def load_dataset(columns=None, dockerfiles_only=False, path=DATASET_PATH):
+    columns = list(columns or COLUMNS)
+    return to_frame(read_table(columns, dockerfiles_only, path), columns)
+
+
+# Same as load_dataset, batch_size images at a time in no particular order
+def iter_dataset(columns=None, dockerfiles_only=False, path=DATASET_PATH, batch_size=BATCH_SIZE):
+    columns = list(columns or COLUMNS)
+    dataset = open_dataset(columns, path)
+    for batch in dataset.to_batches(columns=columns, filter=dataset_filter(dockerfiles_only), batch_size=batch_size):
+        if(batch.num_rows > 0):
+            yield to_frame(pa.Table.from_batches([batch]), columns)
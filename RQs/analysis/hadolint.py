@@ -0,0 +1,142 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .dataset import DATA_FOLDER, load_dataset
+
+
+HADOLINT = 'hadolint'
+CACHE_PATH = os.path.join(DATA_FOLDER, 'hadolint_cache')
+SAT_RESULT_PATH = os.path.join(DATA_FOLDER, 'RQ6_SAT_result.csv')
+# Dockerfiles linted by each hadolint process
+BATCH_SIZE = 200
+LEVELS = ['error', 'warning', 'info', 'style']
+# A Dockerfile without any finding is cached as one row with a null rule
+CACHE_SCHEMA = pa.schema([
+    pa.field('hash', pa.string()),
+    pa.field('rule', pa.string()),
+    pa.field('line', pa.int64()),
+    pa.field('level', pa.string()),
+])
+
+
+def dockerfile_hash(dockerfile):
+    return hashlib.sha256(dockerfile.encode('utf-8')).hexdigest()
+
+
+def dockerfile_hashes(images):
+    # Hash of the latest_dockerfile of each image (None if missing), to process each Dockerfile once and join back
+    return images['latest_dockerfile'].map(lambda dockerfile: dockerfile_hash(dockerfile)
+                                           if type(dockerfile) == str else None)
+
+
+# Lint (hash, Dockerfile) pairs with one hadolint process, return (hash, rule, line, level) rows
+def run_hadolint(dockerfiles, hadolint=HADOLINT):
+    with tempfile.TemporaryDirectory(prefix='hadolint-') as directory:
+        # Each Dockerfile is written to its own file, named after its hash
+        for digest, dockerfile in dockerfiles:
+            with open(os.path.join(directory, digest), 'w', encoding='utf-8') as f:
+                f.write(dockerfile)
+        proc = subprocess.run([hadolint, '-f', 'json'] + [digest for digest, dockerfile in dockerfiles],
+                              cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # hadolint exits with an error status when it finds anything, so only its output tells whether it failed
+    output = proc.stdout.decode('utf-8').strip()
+    try:
+        findings = json.loads(output) if output or proc.returncode != 0 else []
+    except ValueError:
+        raise RuntimeError('hadolint failed: {}'.format(proc.stderr.decode('utf-8', 'replace').strip()))
+    rows = [(os.path.basename(item['file']), item['code'], item.get('line'), item.get('level'))
+            for item in findings]
+    found = set(row[0] for row in rows)
+    rows += [(digest, None, None, None) for digest, dockerfile in dockerfiles if not digest in found]
+    return rows
+
+
+def read_cache(cache_path=CACHE_PATH):
+    if(not os.path.isdir(cache_path) or len(os.listdir(cache_path)) == 0):
+        return CACHE_SCHEMA.empty_table().to_pandas()
+    return pq.read_table(cache_path).to_pandas()
+
+
+def write_cache(rows, cache_path=CACHE_PATH):
+    os.makedirs(cache_path, exist_ok=True)
+    table = pa.Table.from_pandas(pd.DataFrame(rows, columns=CACHE_SCHEMA.names), schema=CACHE_SCHEMA,
+                                 preserve_index=False)
+    # Write to a temporary file first (ignored by read_cache, as its name starts with _), so that an interrupted run
+    # never leaves a truncated part
+    name = 'part-{}.parquet'.format(uuid.uuid4().hex)
+    pq.write_table(table, os.path.join(cache_path, '_' + name))
+    os.replace(os.path.join(cache_path, '_' + name), os.path.join(cache_path, name))
+
+
+def lint_results(rows):
+    results = rows[rows['rule'].notnull()].copy()
+    results['rule'] = results['rule'].astype('category')
+    results['line'] = results['line'].astype('int64')
+    results['level'] = pd.Categorical(results['level'], categories=LEVELS)
+    results.index = range(0, results.shape[0])
+    return results
+
+
+# Findings of hadolint as a (hash, rule, line, level) table, each distinct Dockerfile being linted
+# once: the findings are cached in cache_path batch by batch, so that an interrupted run resumes
+def lint_dockerfiles(dockerfiles, cache_path=CACHE_PATH, processes=None, batch_size=BATCH_SIZE, hadolint=HADOLINT,
+                     log=None):
+    dockerfiles = dict((dockerfile_hash(dockerfile), dockerfile) for dockerfile in pd.Series(dockerfiles)
+                       if type(dockerfile) == str)
+    cached = read_cache(cache_path)
+    linted = set(cached['hash'])
+    todo = [(digest, dockerfile) for digest, dockerfile in dockerfiles.items() if not digest in linted]
+    batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+    frames = [cached[cached['hash'].isin(dockerfiles)]]
+    with ThreadPoolExecutor(processes or os.cpu_count()) as executor:
+        # Each thread waits on its own hadolint process
+        for i, rows in enumerate(executor.map(lambda batch: run_hadolint(batch, hadolint), batches)):
+            write_cache(rows, cache_path)
+            frames.append(pd.DataFrame(rows, columns=CACHE_SCHEMA.names))
+            if(log != None):
+                log('{} of {} Dockerfiles linted'.format(min((i + 1) * batch_size, len(todo)), len(todo)))
+    return lint_results(pd.concat(frames, ignore_index=True))
+
+
+# RQ6_SAT_result from image_name, latest_dockerfile and the findings of lint_dockerfiles
+def sat_result(dockerfiles, results):
+    hashes = dockerfiles['latest_dockerfile'].map(lambda dockerfile: dockerfile_hash(dockerfile)
+                                                  if type(dockerfile) == str else np.nan)
+    rules = results.groupby('hash', sort=False)['rule'].agg(lambda rule: list(rule.astype(str)))
+    smell_count = hashes.map(rules.map(len))
+    smell_count[hashes.notnull() & smell_count.isnull()] = 0
+    return pd.DataFrame({
+        'image_name': dockerfiles['image_name'],
+        'latest_dockerfile': dockerfiles['latest_dockerfile'],
+        'smell_count': smell_count,
+        'violated_rule': hashes.map(rules),
+    })
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Lint the unique Dockerfiles of the dataset and rebuild RQ6_SAT_result.csv')
+    parser.add_argument('path', nargs='?', default=SAT_RESULT_PATH)
+    parser.add_argument('--cache', default=CACHE_PATH, help='directory of the cached findings')
+    parser.add_argument('--processes', type=int, help='hadolint processes run at a time, one per CPU by default')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Dockerfiles linted by each process')
+    parser.add_argument('--hadolint', default=HADOLINT, help='path of the hadolint executable')
+    args = parser.parse_args()
+    images = load_dataset(['image_name', 'latest_dockerfile'], dockerfiles_only=True)
+    dockerfiles = images[~dockerfile_hashes(images).duplicated(keep='first')].copy()
+    dockerfiles.index = range(0, dockerfiles.shape[0])
+    results = lint_dockerfiles(dockerfiles['latest_dockerfile'], args.cache, args.processes, args.batch_size,
+                               args.hadolint, log=print)
+    sat_result(dockerfiles, results).to_csv(args.path, index=False)
+    print('Wrote {} findings of {} Dockerfiles to {}'.format(len(results), len(dockerfiles), args.path))
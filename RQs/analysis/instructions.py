@@ -0,0 +1,171 @@
+import argparse
+import os
+import re
+import uuid
+from multiprocessing import Pool
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .dataset import DATA_FOLDER, load_dataset
+from .hadolint import dockerfile_hash, dockerfile_hashes
+
+
+INSTRUCTIONS_PATH = os.path.join(DATA_FOLDER, 'dockerfile_instructions')
+# Dockerfiles parsed by each task of the pool
+CHUNK_SIZE = 1000
+# Rows of each row group, whose statistics let filters on instruction skip the others
+ROW_GROUP_SIZE = 100000
+# A Dockerfile without any instruction is stored as one row with a null instruction, so that it is parsed once
+INSTRUCTIONS_SCHEMA = pa.schema([
+    pa.field('hash', pa.string()),
+    pa.field('line', pa.int32()),
+    pa.field('stage', pa.int32()),
+    pa.field('instruction', pa.string()),
+    pa.field('arguments', pa.string()),
+])
+ESCAPE_PATTERN = re.compile(r'^#\s*escape\s*=\s*([\\`])\s*$', re.IGNORECASE)
+INSTRUCTION_PATTERN = re.compile(r'^(\S+)\s*(.*)$', re.DOTALL)
+
+
+def escape_character(lines):
+    # The escape parser directive, which can only come before any comment or instruction
+    for line in lines:
+        match = ESCAPE_PATTERN.match(line.strip())
+        if(match):
+            return match.group(1)
+        if(not line.strip().startswith('#') or not '=' in line):
+            break
+    return '\\'
+
+
+# (line, stage, instruction, arguments) rows of a Dockerfile, continuation lines joined, the ARGs
+# before the first FROM being in stage -1
+def parse_instructions(dockerfile):
+    if(type(dockerfile) != str):
+        return []
+    lines = dockerfile.splitlines()
+    escape = escape_character(lines)
+    rows = []
+    stage = -1
+    start = None
+    parts = []
+    for number, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if(stripped == '' or stripped.startswith('#')):
+            continue
+        if(start == None):
+            start = number
+        if(line.rstrip().endswith(escape)):
+            parts.append(line.rstrip()[:-1].strip())
+            continue
+        parts.append(stripped)
+        stage = add_instruction(rows, start, stage, ' '.join(part for part in parts if part))
+        start = None
+        parts = []
+    if(start != None):  # A continuation at the end of the file
+        add_instruction(rows, start, stage, ' '.join(part for part in parts if part))
+    return rows
+
+
+def add_instruction(rows, line, stage, text):
+    match = INSTRUCTION_PATTERN.match(text)
+    if(not match):
+        return stage
+    instruction = match.group(1).upper()
+    if(instruction == 'FROM'):
+        stage += 1
+    rows.append((line, stage, instruction, match.group(2)))
+    return stage
+
+
+def parse_dockerfiles(dockerfiles):
+    # (hash, Dockerfile) pairs into instruction rows
+    rows = []
+    for digest, dockerfile in dockerfiles:
+        instructions = parse_instructions(dockerfile)
+        rows += [(digest,) + row for row in instructions] if len(instructions) > 0 else [(digest, None, None, None, None)]
+    return rows
+
+
+def parsed_hashes(path=INSTRUCTIONS_PATH):
+    if(not os.path.isdir(path) or len(os.listdir(path)) == 0):
+        return set()
+    return set(instruction_dataset(path).to_table(columns=['hash']).column('hash').to_pylist())
+
+
+def write_instructions(rows, path=INSTRUCTIONS_PATH):
+    os.makedirs(path, exist_ok=True)
+    table = pd.DataFrame(rows, columns=INSTRUCTIONS_SCHEMA.names)
+    # Sorted by instruction, so that the row groups of a part hold few instructions each
+    table = table.sort_values(['instruction', 'hash', 'line'], kind='mergesort', na_position='first')
+    table = pa.Table.from_pandas(table, schema=INSTRUCTIONS_SCHEMA, preserve_index=False)
+    # Written under a name starting with _, ignored by readers, until complete
+    name = 'part-{}.parquet'.format(uuid.uuid4().hex)
+    pq.write_table(table, os.path.join(path, '_' + name), row_group_size=ROW_GROUP_SIZE)
+    os.replace(os.path.join(path, '_' + name), os.path.join(path, name))
+
+
+# Parse the Dockerfiles not parsed yet into the instruction table at path, return their number
+def build_instructions(dockerfiles, path=INSTRUCTIONS_PATH, processes=None, chunk_size=CHUNK_SIZE):
+    dockerfiles = dict((dockerfile_hash(dockerfile), dockerfile) for dockerfile in pd.Series(dockerfiles)
+                       if type(dockerfile) == str)
+    parsed = parsed_hashes(path)
+    todo = [(digest, dockerfile) for digest, dockerfile in dockerfiles.items() if not digest in parsed]
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    if(processes != 1 and len(chunks) > 1):
+        with Pool(processes) as pool:
+            results = pool.map(parse_dockerfiles, chunks)
+    else:
+        results = [parse_dockerfiles(chunk) for chunk in chunks]
+    rows = [row for result in results for row in result]
+    if(len(rows) > 0):
+        write_instructions(rows, path)
+    return len(todo)
+
+
+def instruction_dataset(path=INSTRUCTIONS_PATH):
+    if(not os.path.isdir(path)):
+        raise FileNotFoundError('{} not found, build it with python3 -m analysis.instructions'.format(path))
+    return ds.dataset(path, format='parquet', schema=INSTRUCTIONS_SCHEMA)
+
+
+# Rows of the given instructions (e.g. ['RUN']), all by default, the filter being pushed down to
+# the Parquet files
+def read_instructions(instructions=None, columns=None, path=INSTRUCTIONS_PATH):
+    instruction_filter = None
+    if(instructions != None):
+        instructions = [instruction.upper() for instruction in instructions]
+        instruction_filter = ds.field('instruction').isin(instructions)
+    return instruction_dataset(path).to_table(columns=columns, filter=instruction_filter).to_pandas()
+
+
+# Instructions whose arguments match a regular expression, e.g. ('RUN', r'apt-get install.*\bcurl\b')
+def find_instructions(instruction, pattern, path=INSTRUCTIONS_PATH):
+    rows = read_instructions([instruction], path=path)
+    return rows[rows['arguments'].str.contains(pattern, regex=True, na=False)]
+
+
+def stage_counts(path=INSTRUCTIONS_PATH):
+    # Number of build stages (FROM instructions) of each Dockerfile
+    return read_instructions(['FROM'], ['hash'], path).groupby('hash').size()
+
+
+def exposed_ports(path=INSTRUCTIONS_PATH):
+    # One (hash, port) row per port of each EXPOSE instruction, e.g. 80/tcp
+    rows = read_instructions(['EXPOSE'], ['hash', 'arguments'], path)
+    ports = rows.assign(port=rows['arguments'].str.split()).explode('port')
+    return ports[ports['port'].notnull()][['hash', 'port']].reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Parse the unique Dockerfiles of the dataset into the instruction table dockerfile_instructions')
+    parser.add_argument('path', nargs='?', default=INSTRUCTIONS_PATH)
+    parser.add_argument('--processes', type=int, help='processes parsing the Dockerfiles, all the CPUs by default')
+    args = parser.parse_args()
+    images = load_dataset(['latest_dockerfile'], dockerfiles_only=True)
+    parsed = build_instructions(images['latest_dockerfile'], args.path, args.processes)
+    print('Parsed {} new Dockerfiles into {}'.format(parsed, args.path))
@@ -0,0 +1,166 @@
+import ast
+import os
+import re
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+
+CHUNK_SIZE = 50000
+# Items of the crawled stringified lists: quoted strings, numbers, None and e.g. Timestamp('2019-02-13 15:05:50')
+ITEM = r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|None|Timestamp\(\s*'[^']*'[^)]*\)"""
+ITEM_PATTERN = re.compile(ITEM)
+LIST_PATTERN = re.compile(r'\[\s*(?:(?:{0})\s*,\s*)*(?:(?:{0})\s*,?\s*)?\]'.format(ITEM))
+# str() of a list of plain strings or of integers, as written by the crawler, which is simply split
+STRINGS_PATTERN = re.compile(r"\[(?:'[^'\\]*'(?:, '[^'\\]*')*)?\]")
+INTEGERS_PATTERN = re.compile(r'\[(?:-?\d+(?:, -?\d+)*)?\]')
+ITEM_TYPES = {
+    'string': pa.string(),
+    'int': pa.int64(),
+    'timestamp': pa.timestamp('us'),
+}
+# ISO 8601 timestamps, with an optional fraction of a second and UTC offset (Z or e.g. +02:00)
+ISO_DATETIME_PATTERN = (r'^\s*(?P<date>\d{4}-\d{2}-\d{2})[T ](?P<time>\d{2}:\d{2}:\d{2})(?:\.(?P<fraction>\d+))?'
+                        r'\s*(?:Z|(?P<offset_sign>[-+])(?P<offset_hours>\d{2}):?(?P<offset_minutes>\d{2}))?\s*$')
+
+
+def parse_item(token):
+    if(token[0] == "'" or token[0] == '"'):
+        if('\\' in token):
+            return ast.literal_eval(token)
+        return token[1:-1]
+    if(token == 'None'):
+        return None
+    if(token.startswith('Timestamp')):
+        return parse_item(ITEM_PATTERN.search(token, token.index('(')).group(0))
+    try:
+        return int(token)
+    except ValueError:
+        return float(token)
+
+
+# Decode a stringified list such as "['v1', 'latest']" without eval, None if it is not a list
+def parse_list(value):
+    if(type(value) != str):
+        return None
+    if(value == '[]'):
+        return []
+    if(STRINGS_PATTERN.fullmatch(value)):
+        return value[2:-2].split("', '")
+    if(INTEGERS_PATTERN.fullmatch(value)):
+        return [int(item) for item in value[1:-1].split(', ')]
+    if(LIST_PATTERN.fullmatch(value.strip())):
+        return [parse_item(token) for token in ITEM_PATTERN.findall(value)]
+    try:
+        result = ast.literal_eval(value)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return None
+    if(type(result) != list):
+        return None
+    return result
+
+
+# Parse ISO 8601 timestamps into naive UTC timestamps, keeping the milliseconds, NaT if invalid
+def to_datetime(values):
+    parts = pd.Series(values, dtype=object).str.extract(ISO_DATETIME_PATTERN)
+    result = pd.to_datetime(parts['date'] + ' ' + parts['time'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    nanoseconds = parts['fraction'].fillna('').str.pad(9, side='right', fillchar='0').str.slice(0, 9).astype(np.int64)
+    offset = (parts['offset_hours'].fillna('0').astype(np.int64) * 60 + parts['offset_minutes'].fillna('0').astype(np.int64))
+    offset = offset.where(parts['offset_sign'] != '-', -offset)
+    return result + pd.to_timedelta(nanoseconds, unit='ns') - pd.to_timedelta(offset, unit='m')
+
+
+def item_type(value_type):
+    return ITEM_TYPES.get(value_type, value_type)
+
+
+# Decode stringified lists into an Arrow list array of value_type, null if they cannot be decoded
+def list_array(values, value_type):
+    value_type = item_type(value_type)
+    lists = [parse_list(value) for value in values]
+    if(value_type == pa.int64()):
+        lists = [l if l == None or all(type(item) == int or item == None for item in l) else None for l in lists]
+    elif(value_type == pa.string()):
+        lists = [l if l == None else [item if item == None else str(item) for item in l] for l in lists]
+    else:  # Parse the timestamps of all the lists at once
+        lengths = np.array([0 if l == None else len(l) for l in lists])
+        items = to_datetime([item if type(item) == str else None for l in lists if l != None for item in l])
+        items = items.to_numpy().astype('datetime64[us]')
+        splits = np.split(items, np.cumsum(lengths)[:-1]) if len(lists) > 0 else []
+        lists = [None if l == None else split for l, split in zip(lists, splits)]
+    return pa.array(lists, type=pa.list_(value_type), from_pandas=True)
+
+
+def _list_array(args):
+    return list_array(*args)
+
+
+# Same as list_array, chunk by chunk in a pool of processes (all the CPUs by default)
+def parse_lists(values, value_type, processes=None, pool=None, chunk_size=CHUNK_SIZE):
+    values = list(values)
+    chunks = [(values[i:i + chunk_size], value_type) for i in range(0, len(values), chunk_size)]
+    if(pool == None and processes != 1 and len(chunks) > 1):
+        with Pool(processes) as pool:
+            return pa.chunked_array(pool.map(_list_array, chunks), type=pa.list_(item_type(value_type)))
+    arrays = pool.map(_list_array, chunks) if pool != None else [_list_array(chunk) for chunk in chunks]
+    return pa.chunked_array(arrays, type=pa.list_(item_type(value_type)))
+
+
+# One row per item of an Arrow list array, with the position (or label in index) of its list and its
+# position in the list
+def explode(lists, index=None, name='value'):
+    if(isinstance(lists, pa.ChunkedArray)):
+        lists = pa.concat_arrays(lists.chunks) if lists.num_chunks > 0 else pa.array([], type=lists.type)
+    rows = pc.list_parent_indices(lists).to_numpy()
+    frame = pd.DataFrame({
+        'row': rows if index is None else np.asarray(index)[rows],
+        # The parent indices are sorted, so the position is the distance to the first item of the list
+        'position': np.arange(len(rows)) - np.searchsorted(rows, rows),
+        name: pc.list_flatten(lists).to_pandas(),
+    })
+    return frame
+
+
+def as_list_array(lists, value_type):
+    # Arrow list array of lists which are either Arrow arrays or Series of Python lists (NaN if missing)
+    if(isinstance(lists, pa.ChunkedArray)):
+        return pa.concat_arrays(lists.chunks) if lists.num_chunks > 0 else pa.array([], type=lists.type)
+    if(isinstance(lists, pa.Array)):
+        return lists
+    return pa.array(list(pd.Series(lists, dtype=object)), type=pa.list_(value_type), from_pandas=True)
+
+
+def to_lists(lists):
+    # Python lists, or NaN for null lists, as the notebooks expect
+    return pd.Series(lists.to_pylist(), dtype=object).fillna(np.nan)
+
+
+def cache_path(path):
+    return os.path.splitext(path)[0] + '.parquet'
+
+
+# Read a CSV file, decoding its list_columns ({column: item type}) with parse_lists, and cache the
+# decoded table as a Parquet file next to it
+def read_csv_lists(path, list_columns, processes=None, cache=True):
+    parquet_path = cache_path(path)
+    if(cache and os.path.isfile(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(path)):
+        table = pq.read_table(parquet_path, memory_map=True)
+    else:
+        try:  # Skip malformed lines, as the notebooks did
+            df = pd.read_csv(path, low_memory=False, on_bad_lines='skip')
+        except TypeError:  # pandas < 1.3
+            df = pd.read_csv(path, low_memory=False, error_bad_lines=False, warn_bad_lines=False)
+        lists = {column: parse_lists(df[column], value_type, processes) for column, value_type in list_columns.items()}
+        table = pa.Table.from_pandas(df.drop(columns=list(lists)), preserve_index=False)
+        table = pa.Table.from_arrays([lists[column] if column in lists else table.column(column)
+                                      for column in df.columns], names=list(df.columns))
+        if(cache):
+            pq.write_table(table, parquet_path)
+    df = table.drop(list(list_columns)).to_pandas()
+    for column in list_columns:
+        df[column] = to_lists(table.column(column))
+    return df[table.column_names]
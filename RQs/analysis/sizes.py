@@ -0,0 +1,117 @@
+import argparse
+import os
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .dataset import DATA_FOLDER, read_table
+from .parse import as_list_array, explode
+
+
+SIZE_SLOPES_PATH = os.path.join(DATA_FOLDER, 'RQ3_size_slopes.csv')
+# As in RQ3, the trend of an image needs the sizes of at least 3 tags
+MIN_TAGS = 3
+# Images whose Theil-Sen slope is computed by each task of the pool
+CHUNK_SIZE = 10000
+METHODS = ['least_squares', 'theil_sen']
+
+
+# (image, tag_order, size) table of the image_size lists, sizes in MB, without the images left out
+# by RQ3
+def size_table(image_size, index=None):
+    lists = as_list_array(image_size, pa.int64())
+    sizes = explode(lists, name='size')
+    rows = sizes['row'].values
+    count = np.bincount(rows, minlength=len(lists))
+    missing = np.bincount(rows, weights=sizes['size'].isnull().values, minlength=len(lists))
+    keep = ((count >= MIN_TAGS) & (missing == 0))[rows]
+    return pd.DataFrame({
+        'image': (rows if index is None else np.asarray(index)[rows])[keep],
+        'tag_order': sizes['position'].values[keep] + 1,
+        'size': sizes['size'].values[keep].astype(float) / 1024.0 / 1024.0,
+    })
+
+
+def segments(table):
+    # Start of the rows of each image, the rows of an image being contiguous
+    images = table['image'].values
+    starts = np.concatenate([[0], np.flatnonzero(images[1:] != images[:-1]) + 1]) if len(images) > 0 \
+        else np.array([], dtype=np.int64)
+    return images[starts], starts
+
+
+# Least-squares slope of the sizes of each image against tag_order, by segment sums over the
+# whole table (exactly 0 for constant sizes)
+def least_squares_slopes(table):
+    images, starts = segments(table)
+    if(len(images) == 0):
+        return pd.Series([], dtype=float)
+    count = np.diff(np.append(starts, len(table)))
+    x = table['tag_order'].values.astype(float)
+    y = table['size'].values
+    dx = x - np.repeat(np.add.reduceat(x, starts) / count, count)
+    dy = y - np.repeat(np.add.reduceat(y, starts) / count, count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = np.add.reduceat(dx * dy, starts) / np.add.reduceat(dx * dx, starts)
+    return pd.Series(slopes, index=images)
+
+
+def theil_sen_slope(xy):
+    # Median of the slopes between every pair of tags of an image
+    x, y = xy
+    i, j = np.triu_indices(len(x), 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = (y[j] - y[i]) / (x[j] - x[i])
+    slopes = slopes[np.isfinite(slopes)]
+    return np.median(slopes) if len(slopes) > 0 else np.nan
+
+
+# Theil-Sen slope of the sizes of each image, robust to outliers, by a pool of processes
+def theil_sen_slopes(table, processes=None, chunk_size=CHUNK_SIZE):
+    images, starts = segments(table)
+    groups = list(zip(np.split(table['tag_order'].values.astype(float), starts[1:]),
+                      np.split(table['size'].values, starts[1:]))) if len(images) > 0 else []
+    if(processes != 1 and len(groups) > chunk_size):
+        with Pool(processes) as pool:
+            slopes = pool.map(theil_sen_slope, groups, chunk_size)
+    else:
+        slopes = [theil_sen_slope(group) for group in groups]
+    return pd.Series(slopes, index=images, dtype=float)
+
+
+# Slope of the sizes of each image of a Series of image_size lists, NaN when it has no trend
+def size_slopes(image_size, method='least_squares', processes=None):
+    if(not method in METHODS):
+        raise ValueError('Unknown method {}, expected one of {}'.format(method, ', '.join(METHODS)))
+    image_size = pd.Series(image_size) if not isinstance(image_size, (pa.Array, pa.ChunkedArray)) else image_size
+    table = size_table(image_size)
+    slopes = least_squares_slopes(table) if method == 'least_squares' else theil_sen_slopes(table, processes)
+    slopes = slopes.reindex(range(0, len(image_size)))
+    if(isinstance(image_size, pd.Series)):
+        slopes.index = image_size.index
+    return slopes
+
+
+def slope_classes(slopes):
+    # Proportions of the images whose size increases, decreases or remains stable, as in RQ3
+    slopes = slopes.dropna()
+    increase = (slopes > 0).mean()
+    decrease = (slopes < 0).mean()
+    return pd.Series({'increase': increase, 'decrease': decrease, 'stable': 1 - increase - decrease})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compute the size trend of every image into RQ3_size_slopes.csv')
+    parser.add_argument('path', nargs='?', default=SIZE_SLOPES_PATH)
+    parser.add_argument('--method', choices=METHODS, default='least_squares')
+    parser.add_argument('--processes', type=int, help='processes computing Theil-Sen slopes, all the CPUs by default')
+    args = parser.parse_args()
+    table = read_table(['image_name', 'image_size'])
+    slopes = size_slopes(table.column('image_size'), args.method, args.processes)
+    slopes.index = table.column('image_name').to_pandas()
+    slopes.dropna().to_csv(args.path, index_label='image_name', header=['slope'])
+    for trend, proportion in slope_classes(slopes).items():
+        print('{}: {:.4f}'.format(trend, proportion))
+    print('Wrote the size slopes of {} images to {}'.format(slopes.notnull().sum(), args.path))
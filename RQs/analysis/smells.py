@@ -0,0 +1,79 @@
+import argparse
+import os
+
+import pandas as pd
+
+from .dataset import DATA_FOLDER, load_dataset
+from .hadolint import SAT_RESULT_PATH
+from .parse import read_csv_lists
+
+
+PREVALENCE_PATH = os.path.join(DATA_FOLDER, 'RQ6_prevalent_code_smell.csv')
+TREND_PATH = os.path.join(DATA_FOLDER, 'RQ6_code_smell_trend.csv')
+# Year of the violations of Dockerfiles whose year is unknown, counted in the prevalence only
+NO_YEAR = -1
+
+
+# (year, rule) table of lists of violated rules, one row per violation, NO_YEAR if the year is missing
+def rule_table(violated_rule, years=None):
+    violated_rule = pd.Series(list(violated_rule), dtype=object)
+    table = pd.DataFrame({
+        'year': pd.Series(list(years) if years is not None else [None] * len(violated_rule), dtype=float),
+        'rule': violated_rule.where(violated_rule.map(lambda rules: type(rules) == list)),
+    })
+    table = table[table['rule'].notnull()].explode('rule')
+    table = table[table['rule'].notnull()]  # Empty lists
+    table['year'] = table['year'].fillna(NO_YEAR).astype('int64')
+    return table
+
+
+# Counts of rule violations by year, updated batch by batch, of which the RQ6 tables are read
+class SmellCounter():
+
+    def __init__(self, counts=None):
+        if(counts is None):
+            counts = pd.Series([], dtype='int64',
+                               index=pd.MultiIndex.from_arrays([[], []], names=['year', 'rule']))
+        self.counts = counts
+
+    @classmethod
+    def from_tables(cls, prevalence, trend):
+        # Resume from saved (rule, count) prevalence and (rule, count, year) trend tables
+        by_year = trend.groupby(['year', 'rule'])['count'].sum()
+        unknown = prevalence.set_index('rule')['count'].sub(by_year.groupby(level='rule').sum(), fill_value=0)
+        unknown = unknown[unknown > 0]
+        unknown.index = pd.MultiIndex.from_arrays([[NO_YEAR] * len(unknown), unknown.index], names=['year', 'rule'])
+        return cls(pd.concat([by_year, unknown]).astype('int64'))
+
+    def update(self, violated_rule, years=None):
+        counts = rule_table(violated_rule, years).groupby(['year', 'rule']).size()
+        self.counts = self.counts.add(counts, fill_value=0).astype('int64')
+        return self
+
+    def prevalence(self):
+        counts = self.counts.groupby(level='rule').sum().sort_values(ascending=False, kind='mergesort')
+        return pd.DataFrame({'rule': counts.index, 'count': counts.values})
+
+    def trend(self, years=None):
+        counts = self.counts.reset_index(name='count')
+        counts = counts[counts['year'] != NO_YEAR]
+        if(years is not None):
+            counts = counts[counts['year'].isin(list(years))]
+        counts = counts.sort_values(['year', 'count'], ascending=[True, False], kind='mergesort')
+        return counts[['rule', 'count', 'year']].reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild the prevalence and trend tables of RQ6 from RQ6_SAT_result.csv')
+    parser.add_argument('--sat-result', default=SAT_RESULT_PATH)
+    parser.add_argument('--first-year', type=int, default=2014)
+    parser.add_argument('--last-year', type=int, default=2019)
+    args = parser.parse_args()
+    sat_result = read_csv_lists(args.sat_result, {'violated_rule': 'string'})
+    # As in RQ6, the year of a Dockerfile is the year of the last update of its repository
+    images = load_dataset(['image_name', 'updated_at'], dockerfiles_only=True).drop_duplicates('image_name')
+    years = sat_result['image_name'].map(images.set_index('image_name')['updated_at'].dt.year)
+    smells = SmellCounter().update(sat_result['violated_rule'], years)
+    smells.prevalence().to_csv(PREVALENCE_PATH, index=False)
+    smells.trend(range(args.first_year, args.last_year + 1)).to_csv(TREND_PATH, index=False)
+    print('Wrote {} and {}'.format(PREVALENCE_PATH, TREND_PATH))
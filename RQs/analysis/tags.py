@@ -0,0 +1,99 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .dataset import DATA_FOLDER, read_table
+from .parse import as_list_array, explode
+
+
+TAG_SMELLS_PATH = os.path.join(DATA_FOLDER, 'RQ4_tag_smells.csv')
+LATEST = 'latest'
+# Thresholds of the smells of RQ4
+LONG_NAME_LENGTH = 20
+SHA_NAME_LENGTH = 40
+VERSIONS_BEHIND = 3
+DAYS_BEHIND = 90
+# Smells of the images with self-defined tags, i.e. not only a latest tag, and the proportions of RQ4
+SMELLS = ['no_latest', 'long_name', 'sha_name', 'stale_latest', 'latest_3_versions_behind',
+          'latest_90_days_behind']
+
+
+# Items at (row, position) of the exploded items of lists of count items, NaT where there is none
+def item_at(items, count, rows, positions):
+    starts = np.cumsum(count) - count
+    found = (positions >= 0) & (positions < count[rows])
+    values = items['value'].values[np.where(found, starts[rows] + positions, 0)] if len(items) > 0 \
+        else np.full(len(rows), np.datetime64('NaT'), dtype='datetime64[ns]')
+    return pd.Series(values).where(found).values
+
+
+# One row of RQ4 tag smell flags per image, computed at once on the exploded tags, from the tags_name and
+# image_updated_at lists (Arrow list arrays or Series of lists)
+def tag_smells(tags_name, image_updated_at, index=None):
+    tags = as_list_array(tags_name, pa.string())
+    times = as_list_array(image_updated_at, pa.timestamp('us'))
+    n = len(tags)
+    rows = np.arange(n)
+    tagged = pc.is_valid(tags).to_numpy(zero_copy_only=False)
+    flat = explode(tags)
+    tag_rows = flat['row'].values
+    names = pc.list_flatten(tags)
+    count = np.bincount(tag_rows, minlength=n)
+    is_latest = pc.equal(names, LATEST).to_numpy(zero_copy_only=False)
+    length = pc.utf8_length(names).to_numpy(zero_copy_only=False)
+    is_long = length >= LONG_NAME_LENGTH
+    is_sha = length >= SHA_NAME_LENGTH
+    # isalnum is only needed for the few tags long enough to be a SHA
+    is_sha[is_sha] = flat['value'][is_sha].str.isalnum().values
+    # First latest tag of each image, the exploded rows being sorted
+    latest_rows, first = np.unique(tag_rows[is_latest], return_index=True)
+    latest_position = np.full(n, -1)
+    latest_position[latest_rows] = flat['position'].values[is_latest][first]
+    has_latest = latest_position >= 0
+    latest_only = tagged & (count == 1) & has_latest
+    self_defined = tagged & ~latest_only
+    time_items = explode(times)
+    time_count = np.bincount(time_items['row'].values, minlength=n)
+    latest_time = pd.Series(item_at(time_items, time_count, rows, np.where(has_latest, latest_position, -1)))
+    first_time = pd.Series(item_at(time_items, time_count, rows, np.zeros(n, dtype=np.int64)))
+    days_behind = (first_time - latest_time).dt.days
+    smells = pd.DataFrame({
+        'tagged': tagged,
+        'latest_only': latest_only,
+        'self_defined': self_defined,
+        'no_latest': self_defined & ~has_latest,
+        'long_name': self_defined & (np.bincount(tag_rows[is_long], minlength=n) > 0),
+        'sha_name': self_defined & (np.bincount(tag_rows[is_sha], minlength=n) > 0),
+        'stale_latest': self_defined & (latest_position > 0) & (first_time != latest_time).values
+        & first_time.notnull().values & latest_time.notnull().values,
+        'latest_3_versions_behind': self_defined & (latest_position >= VERSIONS_BEHIND),
+        'latest_90_days_behind': self_defined & (days_behind >= DAYS_BEHIND).values,
+        'latest_position': pd.Series(latest_position).where(has_latest & tagged),
+        'latest_days_behind': days_behind.where(has_latest & tagged),
+    })
+    if(index is not None):
+        smells.index = index
+    return smells
+
+
+# Proportions of RQ4: latest_only among the tagged images, the other smells among the self-defined ones
+def smell_proportions(smells):
+    proportions = smells[SMELLS][smells['self_defined']].mean()
+    return pd.concat([pd.Series({'latest_only': smells['latest_only'][smells['tagged']].mean()}), proportions])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Detect the tag smells of every image into RQ4_tag_smells.csv')
+    parser.add_argument('path', nargs='?', default=TAG_SMELLS_PATH)
+    args = parser.parse_args()
+    table = read_table(['image_name', 'tags_name', 'image_updated_at'])
+    smells = tag_smells(table.column('tags_name'), table.column('image_updated_at'),
+                        table.column('image_name').to_pandas())
+    smells.to_csv(args.path, index_label='image_name')
+    for smell, proportion in smell_proportions(smells).items():
+        print('{}: {:.4f}'.format(smell, proportion))
+    print('Wrote the tag smells of {} images to {}'.format(len(smells), args.path))
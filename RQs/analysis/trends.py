@@ -0,0 +1,126 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .dataset import BATCH_SIZE, DATA_FOLDER, DATASET_PATH, iter_dataset
+from .parse import as_list_array, explode
+
+
+TRENDS_PATH = os.path.join(DATA_FOLDER, 'trends.csv')
+PERIODS = {'year': 'Y', 'quarter': 'Q', 'month': 'M'}
+# Aggregations which can be computed batch by batch, a mean being a sum divided by a count
+AGGREGATIONS = ['mean', 'sum', 'count', 'min', 'max']
+
+
+def list_lengths(lists):
+    # Number of items of each list, NaN for missing and empty lists
+    lengths = pc.list_value_length(as_list_array(lists, pa.string())).to_pandas()
+    return pd.Series(lengths.values, index=getattr(lists, 'index', None), dtype=float).where(lambda x: x > 0)
+
+
+def list_means(lists, value_type=pa.int64()):
+    # Mean of the items of each list, NaN for missing and empty lists and for lists with missing items
+    index = getattr(lists, 'index', None)
+    lists = as_list_array(lists, value_type)
+    items = explode(lists)
+    values = items['value'].values.astype(float)
+    count = np.bincount(items['row'].values, minlength=len(lists))
+    total = np.bincount(items['row'].values, weights=np.nan_to_num(values), minlength=len(lists))
+    missing = np.bincount(items['row'].values, weights=np.isnan(values), minlength=len(lists))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.where((count > 0) & (missing == 0), total / count, np.nan)
+    return pd.Series(means, index=index)
+
+
+def average_image_size(images):
+    # Average size in MB of the versions of each image, as in RQ3, 0 being unknown
+    size = list_means(images['image_size']) / 1024.0 / 1024.0
+    return size.where(size != 0)
+
+
+def commit_ratio(images):
+    # Ratio between the commits of the repository and the commits of its Dockerfile, as in RQ5
+    return images['repo_commits_count'] / list_lengths(images['dockerfile_commit_sha'])
+
+
+# Metrics of the trends of RQ3 and RQ5, and the columns they need
+METRICS = {
+    'average_image_size': (average_image_size, 'mean'),
+    'commit_ratio': (commit_ratio, 'mean'),
+}
+METRIC_COLUMNS = ['image_size', 'dockerfile_commit_sha', 'repo_commits_count']
+
+
+def metric_values(frame, metric):
+    if(callable(metric)):
+        return pd.Series(metric(frame), index=frame.index)
+    return frame[metric]
+
+
+# Aggregate metrics ({name: (column or function, aggregation)}) by period for one batch of images,
+# to be combined by combine_trends
+def partial_trend(frame, time_column, metrics, period='month'):
+    for name, (metric, aggregation) in metrics.items():
+        if(not aggregation in AGGREGATIONS):
+            raise ValueError('Unknown aggregation {} of {}'.format(aggregation, name))
+    values = pd.DataFrame({name: metric_values(frame, metric) for name, (metric, aggregation) in metrics.items()},
+                          index=frame.index)
+    grouped = values.groupby(pd.DatetimeIndex(frame[time_column]).to_period(PERIODS[period]))
+    parts = {}
+    for name, (metric, aggregation) in metrics.items():
+        if(aggregation == 'mean'):
+            parts[(name, 'sum')] = grouped[name].sum()
+            parts[(name, 'count')] = grouped[name].count()
+        else:
+            parts[(name, aggregation)] = grouped[name].agg(aggregation)
+    return pd.DataFrame(parts)
+
+
+# One row per period (every period from start to end if given) and one column per metric of the
+# partial aggregates of partial_trend
+def combine_trends(parts, metrics, period='month', start=None, end=None):
+    parts = pd.concat(list(parts))
+
+    def combine(name, aggregation):
+        # Sums and counts of the batches add up, their minimums and maximums are aggregated again
+        return parts[(name, aggregation)].groupby(level=0).agg('sum' if aggregation == 'count' else aggregation)
+    trend = pd.DataFrame(index=parts.index.unique().sort_values())
+    for name, (metric, aggregation) in metrics.items():
+        if(aggregation == 'mean'):
+            trend[name] = combine(name, 'sum') / combine(name, 'count').replace(0, np.nan)
+        else:
+            trend[name] = combine(name, aggregation)
+    if(start != None and end != None):
+        trend = trend.reindex(pd.period_range(start, end, freq=PERIODS[period]))
+    return trend
+
+
+# Aggregate metrics by period of time_column in one groupby, see partial_trend and combine_trends
+def trend(frame, time_column, metrics, period='month', start=None, end=None):
+    return combine_trends([partial_trend(frame, time_column, metrics, period)], metrics, period, start, end)
+
+
+def dataset_trend(metrics, columns, time_column='updated_at', period='month', start=None, end=None,
+                  dockerfiles_only=True, path=DATASET_PATH, batch_size=BATCH_SIZE):
+    # trend of the whole dataset, read batch by batch by iter_dataset so that it never has to fit in memory
+    images = iter_dataset(list(columns) + [time_column], dockerfiles_only, path, batch_size)
+    return combine_trends((partial_trend(frame, time_column, metrics, period) for frame in images), metrics, period,
+                          start, end)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compute the image size (RQ3) and commit ratio (RQ5) trends')
+    parser.add_argument('path', nargs='?', default=TRENDS_PATH)
+    parser.add_argument('--period', choices=list(PERIODS), default='month')
+    parser.add_argument('--start', default='2014-01')
+    parser.add_argument('--end', default='2019-03')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='images read at a time')
+    args = parser.parse_args()
+    trends = dataset_trend(METRICS, METRIC_COLUMNS, period=args.period, start=args.start, end=args.end,
+                           batch_size=args.batch_size)
+    trends.to_csv(args.path, index_label=args.period)
+    print('Wrote the {} trends of {} to {}'.format(args.period, ', '.join(METRICS), args.path))
@@ -0,0 +1,73 @@
+import datetime
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+# The analysis package is imported from ./RQs, as the notebooks do with sys.path.append('..')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Values of the built images
+RULES = ['DL3008', 'DL3007', 'DL4000', 'DL3015', 'SC2086', 'DL3013']
+TAG_NAMES = ['latest', 'v1', 'v2', '1.0', 'stable', 'a' * 19, 'release-2019-02-14-build', '0123456789abcdef' * 3,
+             'f' * 39 + '-', 'F' * 40]
+
+
+def sizes(generator):
+    # Sizes in bytes, some constant, some all 0 and some with a missing size
+    sizes = [int(size) for size in generator.randint(1, 2 * 1024 ** 3, generator.randint(0, 12))]
+    kind = generator.rand()
+    if(kind < 0.2):
+        return sizes[:1] * len(sizes)
+    if(kind < 0.25):
+        return [0] * len(sizes)
+    if(kind < 0.3):
+        return sizes[:-1] + [None]
+    return sizes
+
+
+def tags(generator):
+    # Tag names, most recent first, and their update times, a few milliseconds apart, a few days apart, or pushed
+    # together
+    names = [TAG_NAMES[i] for i in generator.permutation(len(TAG_NAMES))[:generator.randint(1, 7)]]
+    if(generator.rand() < 0.15):
+        names = ['latest']
+    time = datetime.datetime(2019, 6, 1) - datetime.timedelta(seconds=int(generator.randint(0, 10 ** 6)))
+    times = []
+    for name in names:
+        times.append(time.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z')
+        time -= [datetime.timedelta(milliseconds=1), datetime.timedelta(days=40),
+                 datetime.timedelta(0)][generator.randint(0, 3)]
+    return names, times
+
+
+@pytest.fixture
+def dataset():
+    # Build n images as the notebooks read them from the dataset: the list columns stringified, NaN when missing,
+    # and the hadolint findings of their Dockerfile as read from RQ6_SAT_result
+    def dataset(n, seed=0):
+        generator = np.random.RandomState(seed)
+        start = pd.Timestamp('2013-06-01').value // 10 ** 9
+        end = pd.Timestamp('2019-06-01').value // 10 ** 9
+        images = pd.DataFrame(index=['image/%d' % i for i in range(n)])
+        images['updated_at'] = pd.to_datetime(generator.randint(start, end, n), unit='s')
+        images.loc[generator.rand(n) < 0.05, 'updated_at'] = pd.NaT
+        images['image_size'] = [np.nan if generator.rand() < 0.05 else str(sizes(generator)) for i in range(n)]
+        images['dockerfile_commit_sha'] = [
+            np.nan if generator.rand() < 0.05 else
+            str(['%040x' % generator.randint(0, 2 ** 31) for j in range(generator.randint(0, 8))]) for i in range(n)]
+        images['repo_commits_count'] = generator.randint(1, 5000, n).astype(float)
+        images.loc[generator.rand(n) < 0.05, 'repo_commits_count'] = np.nan
+        tag_lists = [tags(generator) if generator.rand() >= 0.1 else (np.nan, np.nan) for i in range(n)]
+        images['tags_name'] = [names if names is np.nan else str(names) for names, times in tag_lists]
+        images['image_updated_at'] = [times if times is np.nan else str(times) for names, times in tag_lists]
+        images['violated_rule'] = pd.Series(
+            [[RULES[j] for j in generator.randint(0, len(RULES), generator.randint(1, 6))]
+             if generator.rand() < 0.8 else np.nan for i in range(n)], index=images.index, dtype=object)
+        years = list(range(2012, 2021)) + [np.nan]
+        images['update_year'] = [years[j] for j in generator.randint(0, len(years), n)]
+        return images
+    return dataset
@@ -0,0 +1,117 @@
+import os
+import stat
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.hadolint import dockerfile_hash, lint_dockerfiles, read_cache, run_hadolint, sat_result
+
+
+# Stands in for hadolint: reports DL3007 on each FROM of a latest image and DL3008 on each apt-get install, as hadolint
+# -f json does, and counts its runs in hadolint.log
+FAKE_HADOLINT = '''#!{python}
+import json, os, sys
+with open({log!r}, 'a') as log:
+    log.write(' '.join(sys.argv[3:]) + '\\n')
+findings = []
+for name in sys.argv[3:]:
+    with open(name) as f:
+        for line, text in enumerate(f.read().split('\\n'), 1):
+            if text.startswith('FROM') and text.endswith(':latest'):
+                findings.append({{'file': name, 'line': line, 'column': 1, 'code': 'DL3007', 'level': 'warning',
+                                  'message': 'Using latest'}})
+            if 'apt-get install' in text:
+                findings.append({{'file': name, 'line': line, 'column': 1, 'code': 'DL3008', 'level': 'warning',
+                                  'message': 'Pin versions'}})
+print(json.dumps(findings))
+sys.exit(1 if findings else 0)
+'''
+
+DOCKERFILES = [
+    'FROM ubuntu:latest\nRUN apt-get install -y curl',
+    'FROM alpine:3.9\nRUN apk add curl',
+    'FROM debian:latest',
+    'FROM python:3.7\nRUN apt-get install -y gcc\nRUN apt-get install -y make',
+]
+
+
+@pytest.fixture
+def hadolint(tmp_path):
+    path = str(tmp_path / 'hadolint')
+    with open(path, 'w') as f:
+        f.write(FAKE_HADOLINT.format(python=sys.executable, log=str(tmp_path / 'hadolint.log')))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+
+def runs(tmp_path):
+    with open(str(tmp_path / 'hadolint.log')) as f:
+        return [line.split() for line in f.read().splitlines()]
+
+
+def test_run_hadolint_keeps_dockerfiles_without_findings(hadolint):
+    dockerfiles = [(dockerfile_hash(dockerfile), dockerfile) for dockerfile in DOCKERFILES[:2]]
+    rows = run_hadolint(dockerfiles, hadolint)
+    assert sorted(rows, key=str) == sorted([
+        (dockerfiles[0][0], 'DL3007', 1, 'warning'),
+        (dockerfiles[0][0], 'DL3008', 2, 'warning'),
+        (dockerfiles[1][0], None, None, None),
+    ], key=str)
+
+
+def test_run_hadolint_fails_without_output(tmp_path):
+    path = str(tmp_path / 'broken')
+    with open(path, 'w') as f:
+        f.write('#!/bin/sh\necho "hadolint: cannot parse" >&2\nexit 1\n')
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    with pytest.raises(RuntimeError, match='cannot parse'):
+        run_hadolint([(dockerfile_hash(DOCKERFILES[0]), DOCKERFILES[0])], path)
+
+
+def test_lint_dockerfiles_batches_and_caches(tmp_path, hadolint):
+    cache = str(tmp_path / 'cache')
+    results = lint_dockerfiles(DOCKERFILES + [DOCKERFILES[0], None], cache, processes=2, batch_size=3,
+                               hadolint=hadolint)
+    # Each distinct Dockerfile is linted once, in batches of at most 3 files
+    assert sorted(len(run) for run in runs(tmp_path)) == [1, 3]
+    assert list(results.columns) == ['hash', 'rule', 'line', 'level']
+    assert results.shape[0] == 5
+    assert results['line'].dtype == 'int64'
+    assert list(results['level'].cat.categories) == ['error', 'warning', 'info', 'style']
+    assert set(read_cache(cache)['hash']) == set(dockerfile_hash(dockerfile) for dockerfile in DOCKERFILES)
+    # Cached Dockerfiles are not linted again, and only the requested ones are returned
+    again = lint_dockerfiles(DOCKERFILES[2:] + ['FROM node:latest'], cache, batch_size=3, hadolint=hadolint)
+    assert len(runs(tmp_path)) == 3 and runs(tmp_path)[-1] == [dockerfile_hash('FROM node:latest')]
+    assert sorted(again['rule']) == ['DL3007', 'DL3007', 'DL3008', 'DL3008']
+
+
+def baseline_sat_result(dockerfiles, hadolint):
+    # The RQ6 notebook loop, one hadolint run per Dockerfile
+    smell_count = pd.Series([np.nan] * len(dockerfiles['latest_dockerfile']))
+    violated_rule = pd.Series([np.nan] * len(dockerfiles['latest_dockerfile']))
+    for i in range(0, len(dockerfiles['latest_dockerfile'])):
+        result = hadolint(str(dockerfiles['latest_dockerfile'][i]))
+        smell_count[i] = len(result)
+        if(len(result) != 0):
+            error_list = []
+            for item in result:
+                error_list.append(item['code'])
+            violated_rule[i] = error_list
+    return pd.concat([dockerfiles['image_name'], dockerfiles['latest_dockerfile'], smell_count, violated_rule],
+                     axis=1, keys=['image_name', 'latest_dockerfile', 'smell_count', 'violated_rule'])
+
+
+def test_sat_result_matches_the_notebook(tmp_path, hadolint):
+    dockerfiles = pd.DataFrame({'image_name': ['a/%d' % i for i in range(len(DOCKERFILES))],
+                                'latest_dockerfile': DOCKERFILES})
+    results = lint_dockerfiles(dockerfiles['latest_dockerfile'], str(tmp_path / 'cache'), hadolint=hadolint)
+
+    def lint_one(dockerfile):
+        digest = dockerfile_hash(dockerfile)
+        rows = run_hadolint([(digest, dockerfile)], hadolint)
+        return [{'code': rule} for digest, rule, line, level in rows if rule != None]
+
+    expected = baseline_sat_result(dockerfiles, lint_one)
+    pd.testing.assert_frame_equal(sat_result(dockerfiles, results), expected)
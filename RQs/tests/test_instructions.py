@@ -0,0 +1,91 @@
+import pandas as pd
+
+from analysis.hadolint import dockerfile_hash
+from analysis.instructions import (build_instructions, exposed_ports, find_instructions, parse_instructions,
+                                   read_instructions, stage_counts)
+
+
+MULTI_STAGE = '''# syntax=docker/dockerfile:1
+ARG VERSION=3.7
+FROM python:${VERSION} AS build
+# Build dependencies
+RUN apt-get update \\
+    # comments within continuations are skipped
+    && apt-get install -y gcc \\
+
+    && rm -rf /var/lib/apt/lists/*
+from alpine:3.9
+copy --from=build /app /app
+EXPOSE 80/tcp 443
+CMD ["python", "app.py"]
+'''
+
+WINDOWS = '''# escape=`
+FROM mcr.microsoft.com/windowsservercore
+COPY testfile.txt C:\\
+RUN dir C:\\ `
+    && echo done
+'''
+
+
+def test_parse_instructions():
+    assert parse_instructions(MULTI_STAGE) == [
+        (2, -1, 'ARG', 'VERSION=3.7'),
+        (3, 0, 'FROM', 'python:${VERSION} AS build'),
+        (5, 0, 'RUN', 'apt-get update && apt-get install -y gcc && rm -rf /var/lib/apt/lists/*'),
+        (10, 1, 'FROM', 'alpine:3.9'),
+        (11, 1, 'COPY', '--from=build /app /app'),
+        (12, 1, 'EXPOSE', '80/tcp 443'),
+        (13, 1, 'CMD', '["python", "app.py"]'),
+    ]
+
+
+def test_escape_directive():
+    assert parse_instructions(WINDOWS) == [
+        (2, 0, 'FROM', 'mcr.microsoft.com/windowsservercore'),
+        (3, 0, 'COPY', 'testfile.txt C:\\'),
+        (4, 0, 'RUN', 'dir C:\\ && echo done'),
+    ]
+    # A directive is only one before any instruction, comment or empty line
+    assert parse_instructions('\n# escape=`\nRUN a `\nRUN b')[0] == (3, -1, 'RUN', 'a `')
+    assert parse_instructions('# a comment\n# escape=`\nRUN a \\\n  b') == [(3, -1, 'RUN', 'a b')]
+
+
+def test_parse_instructions_edge_cases():
+    assert parse_instructions(None) == []
+    assert parse_instructions('') == []
+    assert parse_instructions('# only a comment\n\n') == []
+    # A continuation at the end of the file, and Windows line endings
+    assert parse_instructions('FROM a\r\nRUN make \\\r\n  install \\') == [(1, 0, 'FROM', 'a'),
+                                                                        (2, 0, 'RUN', 'make install')]
+    assert parse_instructions('  run   echo  hi  ') == [(1, -1, 'RUN', 'echo  hi')]
+
+
+def test_build_and_read_instructions(tmp_path):
+    path = str(tmp_path / 'instructions')
+    dockerfiles = pd.Series([MULTI_STAGE, WINDOWS, MULTI_STAGE, None, '# nothing'])
+    assert build_instructions(dockerfiles, path, processes=1) == 3
+    # Each distinct Dockerfile is parsed once
+    assert build_instructions(dockerfiles, path, processes=1) == 0
+    assert build_instructions(['FROM scratch\nEXPOSE 8080'], path, processes=1) == 1
+    rows = read_instructions(path=path)
+    assert len(rows) == 7 + 3 + 1 + 2
+    assert rows[rows['hash'] == dockerfile_hash('# nothing')]['instruction'].isnull().all()
+    assert sorted(read_instructions(['from'], ['hash'], path)['hash']) == sorted(
+        [dockerfile_hash(MULTI_STAGE)] * 2 + [dockerfile_hash(WINDOWS), dockerfile_hash('FROM scratch\nEXPOSE 8080')])
+    assert dict(stage_counts(path)) == {dockerfile_hash(MULTI_STAGE): 2, dockerfile_hash(WINDOWS): 1,
+                                        dockerfile_hash('FROM scratch\nEXPOSE 8080'): 1}
+    found = find_instructions('RUN', r'apt-get install.*\bgcc\b', path)
+    assert list(found['hash']) == [dockerfile_hash(MULTI_STAGE)] and list(found['line']) == [5]
+    assert sorted(exposed_ports(path)['port']) == ['443', '80/tcp', '8080']
+
+
+def test_build_instructions_in_a_pool(tmp_path):
+    dockerfiles = ['FROM image:%d\nRUN make %d' % (i, i) for i in range(20)]
+    build_instructions(dockerfiles, str(tmp_path / 'pool'), processes=2, chunk_size=3)
+    build_instructions(dockerfiles, str(tmp_path / 'serial'), processes=1)
+    columns = ['hash', 'line', 'stage', 'instruction', 'arguments']
+    pool = read_instructions(path=str(tmp_path / 'pool')).sort_values(columns).reset_index(drop=True)
+    serial = read_instructions(path=str(tmp_path / 'serial')).sort_values(columns).reset_index(drop=True)
+    assert len(pool) == 40
+    pd.testing.assert_frame_equal(pool, serial)
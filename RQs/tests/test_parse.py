@@ -0,0 +1,101 @@
+import datetime
+import math
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from analysis.parse import explode, list_array, parse_list, parse_lists, read_csv_lists, to_datetime, to_lists
+
+
+# Stringified lists as found in the dataset, which the notebooks decoded with eval
+LISTS = [
+    "['latest', 'v1.0']",
+    '[]',
+    '[1024, 2048, None]',
+    "['it\\'s', \"say \\\"hi\\\"\", 'a, b']",
+    "['2019-02-14T09:57:18.123Z', '2019-01-01T00:00:00Z']",
+    "[Timestamp('2019-02-13 15:05:50'), Timestamp('2019-02-13 15:05:50+0000', tz='UTC')]",
+    "[1.5, -2, 3e2]",
+    "['Initial commit\\n\\nSigned-off-by: someone']",
+]
+
+
+@pytest.mark.parametrize('value', LISTS)
+def test_parse_list_decodes_like_eval(value):
+    class Timestamp(str):
+        def __new__(cls, value, tz=None):
+            return str.__new__(cls, value)
+    assert parse_list(value) == eval(value, {'Timestamp': Timestamp})
+
+
+@pytest.mark.parametrize('value', [None, np.nan, '', 'latest', "{'a': 1}", "('a', 'b')", "[os.system('ls')]", '[1, 2'])
+def test_parse_list_rejects_what_is_not_a_list(value):
+    assert parse_list(value) is None
+
+
+def test_list_array_of_strings():
+    array = list_array(["['latest', 'v1']", None, '[]', "[1, 'a']"], 'string')
+    assert array.to_pylist() == [['latest', 'v1'], None, [], ['1', 'a']]
+
+
+def test_list_array_of_integers_drops_lists_of_the_wrong_type():
+    array = list_array(['[1, None]', "['a']", '[]'], 'int')
+    assert array.type == pa.list_(pa.int64())
+    assert array.to_pylist() == [[1, None], None, []]
+
+
+def test_list_array_of_timestamps():
+    array = list_array(["['2019-02-14T09:57:18.123Z', 'junk']", None, "[Timestamp('2019-02-13 15:05:50')]"], 'timestamp')
+    assert array.to_pylist() == [
+        [datetime.datetime(2019, 2, 14, 9, 57, 18, 123000), None], None, [datetime.datetime(2019, 2, 13, 15, 5, 50)]]
+
+
+def test_to_datetime_keeps_the_fraction_of_a_second():
+    parsed = to_datetime(['2019-02-14T09:57:18.123Z', '2019-02-14T09:57:18.125Z', '2019-02-14T09:57:18Z'])
+    assert parsed[0] != parsed[1]
+    assert parsed.tolist() == [pd.Timestamp(value).tz_localize(None) for value in
+                               ['2019-02-14T09:57:18.123', '2019-02-14T09:57:18.125', '2019-02-14T09:57:18']]
+
+
+def test_to_datetime_is_utc():
+    parsed = to_datetime(['2019-02-14T11:57:18.5+02:00', '2019-02-14 09:57:18.5', '2019-02-14T04:57:18.5-0500'])
+    assert parsed.nunique() == 1
+    assert parsed[0] == pd.Timestamp('2019-02-14 09:57:18.5')
+
+
+def test_to_datetime_of_missing_values():
+    assert to_datetime([None, np.nan, 'junk', '2019-02-14']).isnull().all()
+
+
+def test_parse_lists_in_chunks():
+    values = ["['a']", None, "['b', 'c']"] * 5
+    lists = parse_lists(values, 'string', processes=1, chunk_size=4)
+    assert lists.num_chunks == 4
+    assert lists.to_pylist() == [['a'], None, ['b', 'c']] * 5
+
+
+def test_explode():
+    frame = explode(pa.array([['a', 'b'], None, [], ['c']]))
+    assert frame['row'].tolist() == [0, 0, 3]
+    assert frame['position'].tolist() == [0, 1, 0]
+    assert frame['value'].tolist() == ['a', 'b', 'c']
+    assert explode(pa.array([['a'], ['b']]), index=[10, 20])['row'].tolist() == [10, 20]
+
+
+def test_to_lists_uses_nan_for_missing_lists():
+    lists = to_lists(pa.array([['a'], None]))
+    assert lists[0] == ['a']
+    assert math.isnan(lists[1])
+
+
+def test_read_csv_lists_caches_the_decoded_lists(tmp_path):
+    path = str(tmp_path / 'results.csv')
+    pd.DataFrame({'image_name': ['a', 'b'], 'violated_rule': ["['DL3008', 'DL3015']", '[]']}).to_csv(path, index=False)
+    first = read_csv_lists(path, {'violated_rule': 'string'}, processes=1)
+    assert (tmp_path / 'results.parquet').exists()
+    second = read_csv_lists(path, {'violated_rule': 'string'}, processes=1)
+    for df in [first, second]:
+        assert df['image_name'].tolist() == ['a', 'b']
+        assert df['violated_rule'].tolist() == [['DL3008', 'DL3015'], []]
@@ -0,0 +1,93 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.parse import list_array, to_lists
+from analysis.sizes import least_squares_slopes, size_slopes, size_table, slope_classes, theil_sen_slopes
+
+
+def get_slope(data):
+    # From RQ3
+    if(type(data) != list):
+        return np.nan
+    if(len(data) == 1):
+        return np.nan
+    x = list(range(1, len(data) + 1))
+    xy_mean = np.mean(np.array(x) * np.array(data))
+    x_mean_y_mean = np.mean(np.array(x)) * np.mean(np.array(data))
+    x_square_mean = np.mean(np.array(x) * np.array(x))
+    x_mean_squre = np.mean(x) * np.mean(x)
+    return (xy_mean - x_mean_y_mean) * 1.0 / (x_square_mean - x_mean_squre)
+
+
+def str2intlist(s):
+    # From RQ3
+    try:
+        s = s[1:-1]
+        s = s.split(',')
+        for i in range(len(s)):
+            s[i] = int(s[i]) / 1024.0 / 1024.0
+        if(len(s) >= 3):
+            return s
+        return np.nan
+    except:
+        return np.nan
+
+
+def decoded(image_size):
+    # image_size as load_dataset decodes it
+    return pd.Series(list(to_lists(list_array(list(image_size), 'int'))), index=image_size.index)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_least_squares_slopes_match_rq3(dataset, seed):
+    image_size = dataset(2000, seed)['image_size']
+    expected = image_size.apply(lambda x: get_slope(str2intlist(x))).rename(None)
+    slopes = size_slopes(decoded(image_size))
+    pd.testing.assert_index_equal(slopes.index, image_size.index)
+    pd.testing.assert_series_equal(slopes.isnull(), expected.isnull())
+    np.testing.assert_allclose(slopes.dropna().values, expected.dropna().values, rtol=1e-9, atol=1e-9)
+    # The notebook's slopes of constant sizes can be rounding noise around 0, which is exactly 0 here
+    expected[expected.abs() < 1e-9] = 0.0
+    pd.testing.assert_series_equal(slope_classes(slopes), slope_classes(expected))
+
+
+def test_slopes_match_polyfit(dataset):
+    image_size = dataset(300, 3)['image_size']
+    table = size_table(decoded(image_size), image_size.index)
+    slopes = least_squares_slopes(table)
+    for image, sizes in table.groupby('image', sort=False):
+        assert slopes[image] == pytest.approx(np.polyfit(sizes['tag_order'], sizes['size'], 1)[0], abs=1e-9)
+
+
+def test_constant_sizes_are_stable():
+    slopes = size_slopes(pd.Series([[123456789] * 7, [3] * 3, [1, 2, 3], [3, 2, 1], [1, 2], None, [1, None, 3]]))
+    assert list(slopes[:4]) == [0.0, 0.0, 1 / 1024.0 / 1024.0, -1 / 1024.0 / 1024.0]
+    assert slopes[4:].isnull().all()
+    assert dict(slope_classes(slopes)) == {'increase': 0.25, 'decrease': 0.25, 'stable': 0.5}
+
+
+def brute_force_theil_sen(sizes):
+    pairs = [(sizes[j] - sizes[i]) / (j - i) for i, j in itertools.combinations(range(len(sizes)), 2)]
+    return np.median(pairs)
+
+
+def test_theil_sen_slopes(dataset):
+    image_size = dataset(500, 4)['image_size']
+    table = size_table(decoded(image_size), image_size.index)
+    expected = pd.Series({image: brute_force_theil_sen(list(sizes['size']))
+                          for image, sizes in table.groupby('image', sort=False)})
+    slopes = theil_sen_slopes(table, processes=1)
+    np.testing.assert_allclose(slopes.values, expected[slopes.index].values, rtol=1e-12)
+    # A pool of processes computes the same slopes by chunks
+    pd.testing.assert_series_equal(theil_sen_slopes(table, processes=2, chunk_size=50), slopes)
+    # and an outlying size does not change it
+    robust = size_slopes(pd.Series([[1, 2, 3, 4, 5, 6, 1000]]), 'theil_sen', processes=1)
+    assert robust[0] == pytest.approx(1 / 1024.0 / 1024.0)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError, match='median'):
+        size_slopes(pd.Series([[1, 2, 3]]), 'median')
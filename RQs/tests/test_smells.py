@@ -0,0 +1,96 @@
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.smells import NO_YEAR, SmellCounter, rule_table
+
+
+YEAR_LIST = range(2014, 2020)
+
+
+def baseline_prevalence(violated_rule):
+    # The RQ6 notebook loop, with DataFrame.append spelled as pd.concat
+    violated_rule = violated_rule.dropna()
+    violated_rule.index = range(0, len(violated_rule))
+    prevalent_code_smell = pd.DataFrame(columns=['rule', 'count'])
+    for i in range(0, len(violated_rule)):
+        for item in violated_rule[i]:
+            if(item in prevalent_code_smell['rule'].tolist()):
+                prevalent_code_smell.loc[prevalent_code_smell['rule'] == item, 'count'] += 1
+            else:
+                prevalent_code_smell = pd.concat([prevalent_code_smell,
+                                                  pd.DataFrame([[item, 1]], columns=['rule', 'count'])],
+                                                 ignore_index=True)
+    return prevalent_code_smell.sort_values('count', ascending=False)
+
+
+def baseline_trend(violated_rule, update_year):
+    RQ6_SAT_result = pd.DataFrame({'violated_rule': violated_rule, 'update_year': update_year})
+    code_smell_trend = pd.DataFrame(columns=['rule', 'count', 'year'])
+    for year in YEAR_LIST:
+        violated_rule_year = RQ6_SAT_result[RQ6_SAT_result['update_year'] == year]['violated_rule']
+        violated_rule_year = violated_rule_year.dropna()
+        violated_rule_year.index = range(0, len(violated_rule_year))
+        for i in range(0, len(violated_rule_year)):
+            for item in violated_rule_year[i]:
+                if(item in code_smell_trend[code_smell_trend['year'] == year]['rule'].tolist()):
+                    code_smell_trend.loc[(code_smell_trend['rule'] == item) & (code_smell_trend['year'] == year),
+                                         'count'] += 1
+                else:
+                    code_smell_trend = pd.concat([code_smell_trend,
+                                                  pd.DataFrame([[item, 1, year]], columns=['rule', 'count', 'year'])],
+                                                 ignore_index=True)
+    code_smell_trend['proportion'] = pd.Series(dtype=float)
+    semll_count = {}
+    for year in YEAR_LIST:
+        semll_count[year] = (code_smell_trend[code_smell_trend['year'] == year]['count'].sum())
+    for i in range(len(code_smell_trend)):
+        code_smell_trend.loc[i, ['proportion']] = (code_smell_trend['count'][i] /
+                                                   semll_count[code_smell_trend['year'][i]] * 100.0)
+    return code_smell_trend
+
+
+def records(table, columns):
+    return sorted(tuple(row) for row in table[columns].astype(object).itertuples(index=False))
+
+
+def test_rule_table_explodes_one_row_per_violation():
+    table = rule_table([['DL3008', 'DL3008'], np.nan, [], ['DL3007']], [2019, 2018, 2017, np.nan])
+    assert list(table['rule']) == ['DL3008', 'DL3008', 'DL3007']
+    assert list(table['year']) == [2019, 2019, NO_YEAR]
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_prevalence_matches_the_notebook(dataset, seed):
+    images = dataset(300, seed)
+    violated_rule, years = images['violated_rule'], images['update_year']
+    prevalence = SmellCounter().update(violated_rule, years).prevalence()
+    expected = baseline_prevalence(violated_rule)
+    assert records(prevalence, ['rule', 'count']) == records(expected, ['rule', 'count'])
+    assert list(prevalence['count']) == sorted(prevalence['count'], reverse=True)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_trend_matches_the_notebook(dataset, seed):
+    images = dataset(300, seed)
+    violated_rule, years = images['violated_rule'], images['update_year']
+    trend = SmellCounter().update(violated_rule, years).trend(YEAR_LIST)
+    trend['proportion'] = trend['count'] / trend.groupby('year')['count'].transform('sum') * 100.0
+    expected = baseline_trend(violated_rule, years)
+    assert records(trend, ['rule', 'count', 'year']) == records(expected, ['rule', 'count', 'year'])
+    merged = trend.merge(expected, on=['rule', 'year'], suffixes=('', '_expected'))
+    assert len(merged) == len(trend)
+    np.testing.assert_allclose(merged['proportion'], merged['proportion_expected'].astype(float))
+
+
+def test_updates_and_resumed_tables_add_up(dataset):
+    images = dataset(400, 3)
+    violated_rule, years = images['violated_rule'], images['update_year']
+    whole = SmellCounter().update(violated_rule, years)
+    resumed = SmellCounter.from_tables(SmellCounter().update(violated_rule[:150], years[:150]).prevalence(),
+                                       SmellCounter().update(violated_rule[:150], years[:150]).trend())
+    resumed.update(violated_rule[150:].reset_index(drop=True), years[150:].reset_index(drop=True))
+    pd.testing.assert_series_equal(resumed.counts.sort_index(), whole.counts.sort_index())
+    pd.testing.assert_frame_equal(resumed.prevalence(), whole.prevalence())
+    pd.testing.assert_frame_equal(resumed.trend(YEAR_LIST), whole.trend(YEAR_LIST))
@@ -0,0 +1,91 @@
+import datetime
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.parse import list_array, to_lists
+from analysis.tags import SMELLS, smell_proportions, tag_smells
+
+
+def baseline_counts(tags_name, image_update_time):
+    # The RQ4 notebook loops, on the lists decoded with eval
+    tags_name = pd.Series(tags_name).dropna()
+    tags_name = tags_name.map(eval)
+    image_update_time = pd.Series(image_update_time).map(lambda times: eval(times) if type(times) == str else times)
+    latest_only_count = 0
+    for i in tags_name.index:
+        if(len(tags_name[i]) == 1):
+            if('latest' == tags_name[i][0]):
+                latest_only_count += 1
+    non_latest_tags_name = tags_name[tags_name.map(lambda names: names != ['latest'])]
+    counts = dict((smell, 0) for smell in SMELLS)
+    for i in non_latest_tags_name.index:
+        names = non_latest_tags_name[i]
+        if(not('latest' in names)):
+            counts['no_latest'] += 1
+        if(any(len(name) >= 20 for name in names)):
+            counts['long_name'] += 1
+        if(any(len(name) >= 40 and name.isalnum() for name in names)):
+            counts['sha_name'] += 1
+        if('latest' in names):
+            latest_index = names.index('latest')
+            time_diff = pd.Timestamp(image_update_time[i][0]) - pd.Timestamp(image_update_time[i][latest_index])
+            if(names[0] != 'latest'):
+                if(pd.Timestamp(image_update_time[i][0]) != pd.Timestamp(image_update_time[i][latest_index])):
+                    counts['stale_latest'] += 1
+            if(latest_index >= 3):
+                counts['latest_3_versions_behind'] += 1
+            if(time_diff.days >= 90):
+                counts['latest_90_days_behind'] += 1
+    proportions = dict((smell, count / len(non_latest_tags_name)) for smell, count in counts.items())
+    proportions['latest_only'] = latest_only_count / len(tags_name)
+    return len(non_latest_tags_name), proportions
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_smells_match_the_notebook(dataset, seed):
+    images = dataset(500, seed)
+    tags_name, image_updated_at = list(images['tags_name']), list(images['image_updated_at'])
+    smells = tag_smells(list_array(tags_name, 'string'), list_array(image_updated_at, 'timestamp'))
+    self_defined, expected = baseline_counts(tags_name, image_updated_at)
+    assert smells['self_defined'].sum() == self_defined
+    proportions = smell_proportions(smells)
+    assert sorted(proportions.index) == sorted(expected)
+    for smell, proportion in expected.items():
+        assert proportions[smell] == pytest.approx(proportion), smell
+
+
+def test_lists_and_arrays_give_the_same_smells(dataset):
+    images = dataset(200, 3)
+    tags_name, image_updated_at = list(images['tags_name']), list(images['image_updated_at'])
+    tags = list_array(tags_name, 'string')
+    times = list_array(image_updated_at, 'timestamp')
+    index = pd.Index(['image/%d' % i for i in range(len(tags_name))])
+    expected = tag_smells(tags, times, index)
+    pd.testing.assert_frame_equal(tag_smells(pd.Series(to_lists(tags)), pd.Series(to_lists(times)), index), expected)
+
+
+def test_stale_latest_within_a_second():
+    tags_name = ["['v2', 'latest']", "['v2', 'latest']", "['latest', 'v1']"]
+    image_updated_at = ["['2019-02-14T09:57:18.124Z', '2019-02-14T09:57:18.123Z']",
+                        "['2019-02-14T09:57:18.123Z', '2019-02-14T09:57:18.123Z']",
+                        "['2019-02-14T09:57:18.124Z', '2019-02-14T09:57:18.123Z']"]
+    smells = tag_smells(list_array(tags_name, 'string'), list_array(image_updated_at, 'timestamp'))
+    assert list(smells['stale_latest']) == [True, False, False]
+    assert list(smells['latest_position']) == [1, 1, 0]
+    assert list(smells['latest_days_behind']) == [0, 0, 0]
+
+
+def test_missing_update_times():
+    smells = tag_smells(list_array(["['v3', 'v2', 'v1', 'latest']", "['latest']", None], 'string'),
+                        list_array(["['2019-02-14T09:57:18Z']", None, None], 'timestamp'))
+    assert list(smells['tagged']) == [True, True, False]
+    assert list(smells['latest_only']) == [False, True, False]
+    assert list(smells['self_defined']) == [True, False, False]
+    # The time the latest tag points to is unknown, so only the version count is flagged
+    assert list(smells['latest_3_versions_behind']) == [True, False, False]
+    assert list(smells['stale_latest']) == [False, False, False]
+    assert list(smells['latest_90_days_behind']) == [False, False, False]
+    assert smells['latest_days_behind'].isnull().all()
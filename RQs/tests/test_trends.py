@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.parse import list_array, to_lists
+from analysis.trends import (METRICS, average_image_size, combine_trends, commit_ratio, list_lengths, partial_trend,
+                             trend)
+
+
+def decoded(strings):
+    # The images with their list columns decoded, as load_dataset does
+    images = strings.copy()
+    images['image_size'] = list(to_lists(list_array(strings['image_size'], 'int')))
+    images['dockerfile_commit_sha'] = list(to_lists(list_array(strings['dockerfile_commit_sha'], 'string')))
+    return images
+
+
+def str2intlist(s):
+    # From RQ3
+    try:
+        s = s[1:-1]
+        s = s.split(',')
+        for i in range(len(s)):
+            s[i] = int(s[i])
+        return s
+    except:
+        return np.nan
+
+
+def strlist2list(s):
+    # From RQ5
+    try:
+        return(eval(s))
+    except:
+        return np.nan
+
+
+def commit_count(l):
+    if(type(l) != list):
+        return np.nan
+    else:
+        length = len(l)
+        if(length == 0):
+            return np.nan
+        else:
+            return length
+
+
+def baseline_monthly(dockerfiles, column, skip_zero=False):
+    # The monthly loop of RQ3 and RQ5, with Series.append spelled as pd.concat
+    dockerfiles = dockerfiles.copy()
+    dockerfiles['update_year'] = pd.DatetimeIndex(dockerfiles['updated_at']).year
+    dockerfiles['update_month'] = pd.DatetimeIndex(dockerfiles['updated_at']).month
+    means = []
+    for year in range(2014, 2020):
+        for month in range(1, 13):
+            if(year == 2019 and month == 4):
+                break
+            dockerfile = dockerfiles[dockerfiles['update_year'] == year]
+            dockerfile = dockerfile[dockerfile['update_month'] == month]
+            values = dockerfile[column]
+            if(skip_zero):
+                values = values.apply(lambda x: x if x != 0 else np.nan)
+            means.append(values.dropna().mean())
+    return pd.Series(means)
+
+
+def baseline_yearly(monthly):
+    years = pd.Series([2014 + i // 12 for i in range(len(monthly))])
+    return pd.Series([monthly[years == y].mean() for y in range(2014, 2020)])
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_average_image_size_trend_matches_rq3(dataset, seed):
+    strings = dataset(3000, seed)
+    images = decoded(strings)
+    strings['avg_image_size'] = strings['image_size'].apply(lambda x: np.mean(str2intlist(x)) / 1024.0 / 1024.0)
+    pd.testing.assert_series_equal(average_image_size(images).fillna(0), strings['avg_image_size'].fillna(0),
+                                   check_names=False)
+    monthly = trend(images, 'updated_at', {'average_image_size': (average_image_size, 'mean')}, 'month', '2014-01',
+                    '2019-03')
+    expected = baseline_monthly(strings, 'avg_image_size', skip_zero=True)
+    assert len(monthly) == len(expected) == 63
+    np.testing.assert_allclose(monthly['average_image_size'].values, expected.values)
+    yearly = monthly.groupby(monthly.index.year)['average_image_size'].mean().reindex(range(2014, 2020))
+    np.testing.assert_allclose(yearly.values, baseline_yearly(expected).values)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_commit_ratio_trend_matches_rq5(dataset, seed):
+    strings = dataset(3000, seed)
+    images = decoded(strings)
+    strings['dockerfile_commit_count'] = strings['dockerfile_commit_sha'].apply(lambda x: commit_count(strlist2list(x)))
+    pd.testing.assert_series_equal(list_lengths(images['dockerfile_commit_sha']), strings['dockerfile_commit_count'],
+                                   check_names=False)
+    ratio = pd.Series([np.nan] * strings.shape[0], index=strings.index)
+    for i in range(strings.shape[0]):
+        row = strings.iloc[i, :]
+        ratio.iloc[i] = row['repo_commits_count'] / row['dockerfile_commit_count']
+    strings['ratio_between_dockerfile_and_all_commits'] = ratio
+    images['ratio_between_dockerfile_and_all_commits'] = commit_ratio(images)
+    np.testing.assert_allclose(images['ratio_between_dockerfile_and_all_commits'].values, ratio.values)
+    monthly = trend(images, 'updated_at', {'ratio': ('ratio_between_dockerfile_and_all_commits', 'mean')}, 'month',
+                    '2014-01', '2019-03')
+    expected = baseline_monthly(strings, 'ratio_between_dockerfile_and_all_commits')
+    np.testing.assert_allclose(monthly['ratio'].values, expected.values)
+
+
+def test_batches_combine_to_the_whole_trend(dataset):
+    images = decoded(dataset(2000, 2))
+    metrics = dict(METRICS)
+    metrics['images'] = ('repo_commits_count', 'count')
+    metrics['commits'] = ('repo_commits_count', 'sum')
+    metrics['fewest_commits'] = ('repo_commits_count', 'min')
+    metrics['most_commits'] = ('repo_commits_count', 'max')
+    for period in ['year', 'quarter', 'month']:
+        whole = trend(images, 'updated_at', metrics, period)
+        parts = [partial_trend(images[i:i + 300], 'updated_at', metrics, period) for i in range(0, len(images), 300)]
+        pd.testing.assert_frame_equal(combine_trends(parts, metrics, period), whole)
+
+
+def test_unknown_aggregation(dataset):
+    images = decoded(dataset(10))
+    with pytest.raises(ValueError, match='median'):
+        trend(images, 'updated_at', {'commits': ('repo_commits_count', 'median')})
@@ -0,0 +1,163 @@
+import asyncio
+import email.utils
+import threading
+import time
+from urllib.parse import urlparse
+
+
+# Initial requests per second allowed for each host, before any rate limit
+# headers have been seen
+DEFAULT_RATES = {
+    'api.github.com': 1.0,
+    'hub.docker.com': 2.0,
+    'raw.githubusercontent.com': 10.0,
+}
+DEFAULT_RATE = 2.0
+# Hosts which do not count the conditional requests answered 304 against the rate limit
+FREE_REVALIDATION_HOSTS = ['api.github.com']
+DEFAULT_CAPACITY = 10
+# Slowest rate a bucket is refilled at, so that it recovers after its reset time
+MIN_RATE = 0.01
+# Backoff on rate limited responses without a Retry-After header
+MIN_BACKOFF = 1
+MAX_BACKOFF = 300
+MAX_RETRIES = 5
+
+
+def header_number(headers, name):
+    # Docker Hub may append a window to the value, e.g. "180;w=21600"
+    value = headers.get(name)
+    if(value is None):
+        return None
+    try:
+        return float(str(value).split(';')[0])
+    except ValueError:
+        return None
+
+
+def retry_after_seconds(headers):
+    value = headers.get('Retry-After')
+    if(value is None):
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        try:
+            return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return None
+
+
+def is_rate_limited(status_code, headers):
+    if(status_code == 429):
+        return True
+    # GitHub answers 403 both for exhausted quotas and for forbidden resources
+    return status_code == 403 and (header_number(headers, 'X-RateLimit-Remaining') == 0 or 'Retry-After' in headers)
+
+
+# Token bucket refilled at rate tokens per second up to capacity, following the rate limit headers
+class TokenBucket():
+
+    def __init__(self, rate=DEFAULT_RATE, capacity=DEFAULT_CAPACITY):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0
+        self.backoff = MIN_BACKOFF
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    # Take a token, or return how many seconds to wait before trying again
+    def _take(self):
+        with self.lock:
+            now = time.monotonic()
+            if(now < self.blocked_until):
+                return self.blocked_until - now
+            self._refill(now)
+            if(self.tokens >= 1):
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        wait = self._take()
+        while(wait > 0):
+            time.sleep(wait)
+            wait = self._take()
+
+    async def acquire_async(self):
+        wait = self._take()
+        while(wait > 0):
+            await asyncio.sleep(wait)
+            wait = self._take()
+
+    def update(self, status_code, headers):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            remaining = header_number(headers, 'X-RateLimit-Remaining')
+            reset = header_number(headers, 'X-RateLimit-Reset')
+            if(remaining is not None and reset is not None):
+                reset_in = max(reset - time.time(), 1)
+                self.tokens = min(self.tokens, remaining)
+                if(remaining == 0):
+                    self.blocked_until = max(self.blocked_until, now + reset_in)
+                else:
+                    self.rate = max(remaining / reset_in, MIN_RATE)
+            if(is_rate_limited(status_code, headers)):
+                retry_after = retry_after_seconds(headers)
+                if(retry_after is None):
+                    retry_after = self.backoff
+                    self.backoff = min(self.backoff * 2, MAX_BACKOFF)
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                self.tokens = 0
+            else:
+                self.backoff = MIN_BACKOFF
+
+    # Give back the token of a request which the server did not count
+    def refund(self):
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+
+# One token bucket per host, and per credential when given a key
+class RateLimiter():
+
+    def __init__(self, rates=None, capacity=DEFAULT_CAPACITY):
+        self.rates = dict(DEFAULT_RATES, **(rates or {}))
+        self.capacity = capacity
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url, key=None):
+        host = urlparse(url).netloc
+        with self.lock:
+            if((host, key) not in self.buckets):
+                self.buckets[(host, key)] = TokenBucket(self.rates.get(host, DEFAULT_RATE), self.capacity)
+            return self.buckets[(host, key)]
+
+    def wait(self, url, key=None):
+        self.bucket(url, key).acquire()
+
+    async def wait_async(self, url, key=None):
+        await self.bucket(url, key).acquire_async()
+
+    def update(self, url, status_code, headers, key=None):
+        bucket = self.bucket(url, key)
+        bucket.update(status_code, headers)
+        if(status_code == 304 and urlparse(url).netloc in FREE_REVALIDATION_HOSTS):
+            bucket.refund()
+
+    # GET url with session (a requests.Session or the requests module), retrying rate limited responses
+    def get(self, session, url, max_retries=MAX_RETRIES, key=None, **kwargs):
+        for i in range(max_retries + 1):
+            self.wait(url, key)
+            res = session.get(url, **kwargs)
+            self.update(url, res.status_code, res.headers, key)
+            if(not is_rate_limited(res.status_code, res.headers)):
+                break
+        return res
@@ -0,0 +1,248 @@
+import asyncio
+import gzip
+import json
+import traceback
+from urllib.parse import urlparse
+
+import aiohttp
+
+from docker_image_crawler import (DockerImageCrawler, dockerfile_commits_results, docker_image_tag_results,
+                                  parse_docker_image_info, parse_docker_image_tag_page, parse_dockerfile,
+                                  parse_dockerfile_commits, parse_dockerfile_from_dockerhub, parse_repo_info,
+                                  parse_source_repo_name, repo_exists, docker_image_tags_url, tag_page_count)
+from credential_pool import CredentialsRejected
+from http_cache import Response
+from rate_limiter import MAX_RETRIES, is_rate_limited
+
+
+# Maximum number of concurrent requests sent to each host
+DEFAULT_HOST_LIMITS = {
+    'hub.docker.com': 10,
+    'api.github.com': 10,
+    'raw.githubusercontent.com': 20,
+}
+DEFAULT_HOST_LIMIT = 10
+
+
+# Crawl the image info of many images concurrently, within a limit of requests per host
+class AsyncDockerImageCrawler(DockerImageCrawler):
+
+    def __init__(self, url='http://127.0.0.1:8000', username=None, password=None, lease_count=50, flush_count=50,
+                 concurrency=20, host_limits=None, github_tokens=None, cache_dir=None, **config_options):
+        super().__init__(url, username, password, lease_count, flush_count, github_tokens=github_tokens,
+                         cache_dir=cache_dir, **config_options)
+        self.concurrency = concurrency
+        self.host_limits = dict(DEFAULT_HOST_LIMITS, **(host_limits or {}))
+        self.host_semaphores = {}
+
+    def host_semaphore(self, url):
+        host = urlparse(url).netloc
+        if(host not in self.host_semaphores):
+            self.host_semaphores[host] = asyncio.Semaphore(
+                self.host_limits.get(host, DEFAULT_HOST_LIMIT))
+        return self.host_semaphores[host]
+
+    # The HTTP cache reads and writes files, which run in the default executor to keep the event loop free
+    async def cache_lookup_async(self, url):
+        if(self.http_cache == None):
+            return None, {}
+        return await asyncio.get_running_loop().run_in_executor(None, self.cache_lookup, url)
+
+    async def cache_response_async(self, url, entry, response):
+        if(self.http_cache == None):
+            return response
+        return await asyncio.get_running_loop().run_in_executor(None, self.cache_response, url, entry, response)
+
+    # GET url within the concurrency and rate limits of its host, retrying rate limited responses.
+    # GitHub calls go to the credential with the most remaining quota, see DockerImageCrawler.call_github_api
+    async def get(self, http, url, github=False):
+        entry, headers = await self.cache_lookup_async(url)
+        for i in range(MAX_RETRIES + 1):
+            kwargs = {'headers': headers}
+            key = None
+            credential = None
+            if(github):
+                credential = await self.github_pool.acquire_async()
+            if(credential != None):
+                kwargs['headers'] = dict(credential.headers, **headers)
+                if(credential.auth != None):
+                    kwargs['auth'] = aiohttp.BasicAuth(*credential.auth)
+                key = credential.key
+            await self.rate_limiter.wait_async(url, key)
+            async with self.host_semaphore(url):
+                async with http.get(url, **kwargs) as res:
+                    response = Response(res.status, res.headers, await res.text())
+            self.rate_limiter.update(url, response.status, response.headers, key)
+            if(credential != None):
+                self.github_pool.update(credential, response.status, response.headers)
+                if(response.status == 401):
+                    continue
+            if(not is_rate_limited(response.status, response.headers)):
+                break
+        return await self.cache_response_async(url, entry, response)
+
+    async def get_json(self, http, url, github=False):
+        res = await self.get(http, url, github)
+        try:
+            return res.json()
+        except ValueError:
+            return None
+
+    async def get_source_repo_name_async(self, http, image_name):
+        return parse_source_repo_name(await self.get_json(http, self.DockerHubSourceRepoQueryURL + image_name))
+
+    async def get_all_commits_count_async(self, http, repo_full_name):
+        json_data = await self.get_json(
+            http, 'https://api.github.com/repos/{}/contributors'.format(repo_full_name), github=True)
+        try:
+            return json_data[-1]['contributions']
+        except:
+            json_data = await self.get_json(
+                http, 'https://api.github.com/repos/{}/commits'.format(repo_full_name), github=True)
+            commit_count = len(json_data)
+            if(commit_count == 0):
+                return -1
+            else:
+                return commit_count
+
+    async def get_dockerfile_async(self, http, repo_full_name):
+        res = await self.get(
+            http, 'https://raw.githubusercontent.com/{}/master/Dockerfile'.format(repo_full_name), github=True)
+        return parse_dockerfile(res.text)
+
+    async def get_dockerfile_from_dockerhub_async(self, http, image_name):
+        json_data = await self.get_json(
+            http, 'https://hub.docker.com/v2/repositories/{}/dockerfile/'.format(image_name))
+        return parse_dockerfile_from_dockerhub(json_data)
+
+    async def get_dockerfile_commits_async(self, http, repo_full_name):
+        json_data = await self.get_json(
+            http, 'https://api.github.com/repos/{}/commits?path=Dockerfile'.format(repo_full_name), github=True)
+        return parse_dockerfile_commits(json_data)
+
+    async def get_docker_image_info_async(self, http, image_name):
+        json_data = await self.get_json(http, 'https://hub.docker.com/v2/repositories/{}/'.format(image_name))
+        if(json_data is None):
+            return {}
+        return parse_docker_image_info(json_data)
+
+    # Same as DockerImageCrawler.get_docker_image_tag
+    async def get_docker_image_tag_async(self, http, image_name, since=None):
+        json_data = await self.get_json(http, docker_image_tags_url(image_name, 1, since != None))
+        try:
+            j = {'tags_count': json_data['count'], 'tags_name': [], 'image_size': [], 'image_updated_at': []}
+        except:
+            return {'tags_count': -1}
+        page_count = tag_page_count(j['tags_count'])
+        if(since != None):
+            j['tags_incremental'] = True
+            page = 1
+            while(not parse_docker_image_tag_page(json_data, j, since) and page < page_count):
+                page += 1
+                json_data = await self.get_json(http, docker_image_tags_url(image_name, page, True))
+            return j
+        parse_docker_image_tag_page(json_data, j)
+        pages = await asyncio.gather(*[self.get_json(http, docker_image_tags_url(image_name, page))
+                                       for page in range(2, page_count + 1)])
+        for json_data in pages:
+            parse_docker_image_tag_page(json_data, j)
+        return j
+
+    # Same as DockerImageCrawler.crawl_all_images_info_task, for the GitHub and Dockerfile part of one image
+    async def crawl_source_repo_async(self, http, image_name):
+        results = {}
+        source_repo_name = await self.get_source_repo_name_async(http, image_name)
+        if(source_repo_name != None):
+            results['source_repo_name'] = source_repo_name
+            repo_res, latest_dockerfile = await asyncio.gather(
+                self.get_json(http, 'https://api.github.com/repos/' + source_repo_name, github=True),
+                self.get_dockerfile_async(http, source_repo_name))
+            if(repo_exists(repo_res)):
+                results.update(parse_repo_info(repo_res))
+                if(latest_dockerfile != 404):  # crawl the latest dockerfile from github source repo
+                    results['dockerfile_source'] = 'GitHub'
+                    results['latest_dockerfile'] = latest_dockerfile
+                    results['repo_commits_count'], dockerfile_commits = await asyncio.gather(
+                        self.get_all_commits_count_async(http, source_repo_name),
+                        self.get_dockerfile_commits_async(http, source_repo_name))
+                    results.update(dockerfile_commits_results(dockerfile_commits))
+                    return results
+        # If the image does not have a GitHub source repo or Dockerfile, try to
+        # get the latest dockerfile from DockerHub (may come from Bitbucket)
+        latest_dockerfile = await self.get_dockerfile_from_dockerhub_async(http, image_name)
+        if(latest_dockerfile != None):
+            results['latest_dockerfile'] = latest_dockerfile
+            results['dockerfile_source'] = 'DockerHub'
+        return results
+
+    async def crawl_image_async(self, http, task_json):
+        image_name = task_json['image_name']
+        results = {'pk': task_json['pk'], 'imageinfo_task': True}
+        source_repo_results, docker_image_tag, docker_image_info = await asyncio.gather(
+            self.crawl_source_repo_async(http, image_name),
+            self.get_docker_image_tag_async(http, image_name, self.tags_since(task_json)),
+            self.get_docker_image_info_async(http, image_name))
+        results.update(source_repo_results)
+        results.update(docker_image_tag_results(docker_image_tag))
+        results.update(docker_image_info)
+        return results
+
+    async def flush_results_async(self, http):
+        results_buffer, self.results_buffer = self.results_buffer, []
+        if(len(results_buffer) > 0):
+            body = gzip.compress(json.dumps(results_buffer).encode('utf-8'))
+            async with http.post(self.url + '/dockerimages/', data=body, headers={
+                    'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}) as res:
+                await res.read()
+
+    async def lease_tasks_async(self, http, task):
+        async with http.get(self.url + '/lease_tasks/', params={
+                'task': task, 'count': self.lease_count, 'worker': self.worker}) as res:
+            return (await res.json())['tasks']
+
+    async def crawl_worker(self, http, queue):
+        while True:
+            task_json = await queue.get()
+            try:
+                self.results_buffer.append(await self.crawl_image_async(http, task_json))
+            except CredentialsRejected:
+                raise
+            except Exception:  # The image is leased again once its lease expires
+                traceback.print_exc()
+            if(len(self.results_buffer) >= self.flush_count):
+                await self.flush_results_async(http)
+            queue.task_done()
+
+    async def flush_worker(self, http):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush_results_async(http)
+
+    async def lease_worker(self, http, queue, queue_name):
+        while True:
+            tasks = await self.lease_tasks_async(http, queue_name)
+            if(len(tasks) == 0):  # No more images left
+                await queue.join()
+                await self.flush_results_async(http)
+                await asyncio.sleep(60)  # Try again one min later
+                continue
+            for task_json in tasks:
+                await queue.put(task_json)
+
+    async def crawl_all_images_info_task_async(self, queue_name='allimageinfo'):
+        async with aiohttp.ClientSession() as http:
+            queue = asyncio.Queue(maxsize=self.lease_count)
+            workers = [asyncio.ensure_future(self.crawl_worker(http, queue)) for i in range(self.concurrency)]
+            workers.append(asyncio.ensure_future(self.flush_worker(http)))
+            workers.append(asyncio.ensure_future(self.lease_worker(http, queue, queue_name)))
+            try:
+                # Stops on the first error of a worker, e.g. when all the GitHub credentials are rejected
+                await asyncio.gather(*workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+
+    # Identifier: imageinfo_task
+    def crawl_all_images_info_task(self, queue='allimageinfo'):
+        asyncio.run(self.crawl_all_images_info_task_async(queue))
+
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+
+from rate_limiter import header_number, is_rate_limited, retry_after_seconds
+
+
+# Hourly quota of an authenticated GitHub account, assumed until its first response
+DEFAULT_LIMIT = 5000
+# How long a token is benched when it is rate limited without a reset time
+DEFAULT_BENCH_SECONDS = 60
+
+
+def load_tokens(tokens=None, tokens_file=None):
+    # tokens: comma separated, tokens_file: one token per line, lines starting with # are ignored
+    results = []
+    if(tokens):
+        results += [token.strip() for token in tokens.split(',')]
+    if(tokens_file):
+        with open(tokens_file) as f:
+            results += [line.strip() for line in f if not line.strip().startswith('#')]
+    return [token for token in dict.fromkeys(results) if token]
+
+
+# Raised by GitHubTokenPool.acquire once all its credentials were rejected as invalid,
+# instead of crawling on anonymously within a much lower quota
+class CredentialsRejected(RuntimeError):
+    pass
+
+
+class GitHubCredential():
+
+    def __init__(self, token=None, username=None, password=None):
+        self.token = token
+        self.username = username
+        self.password = password
+        self.remaining = None
+        self.benched_until = 0
+        self.disabled = False
+
+    @property
+    def key(self):
+        # Used to give each credential its own bucket in the rate limiter
+        return 'credential-%d' % id(self)
+
+    @property
+    def headers(self):
+        if(self.token):
+            return {'Authorization': 'token %s' % self.token}
+        return {}
+
+    @property
+    def auth(self):
+        if(self.token):
+            return None
+        return (self.username, self.password)
+
+    def budget(self):
+        if(self.remaining is None):
+            return DEFAULT_LIMIT
+        return self.remaining
+
+
+# Spread GitHub API calls over many credentials, the one with the most remaining quota first.
+# Exhausted credentials are benched until their reset, and rejected ones are not used again.
+class GitHubTokenPool():
+
+    def __init__(self, credentials=None):
+        self.credentials = list(credentials or [])
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_tokens(cls, tokens=None, username=None, password=None, api_token=None):
+        credentials = [GitHubCredential(token=token) for token in tokens or []]
+        if(api_token):
+            credentials.append(GitHubCredential(token=api_token))
+        elif(username != None and password != None):
+            credentials.append(GitHubCredential(username=username, password=password))
+        return cls(credentials)
+
+    def __len__(self):
+        return len(self.credentials)
+
+    # Take a credential, or return how many seconds to wait before trying again
+    def _take(self):
+        with self.lock:
+            now = time.time()
+            credentials = [c for c in self.credentials if not c.disabled]
+            if(len(credentials) == 0):
+                if(len(self.credentials) > 0):
+                    raise CredentialsRejected(
+                        'All the {} GitHub credentials were rejected as invalid (401)'.format(len(self.credentials)))
+                return None, 0
+            for credential in credentials:
+                if(credential.benched_until and credential.benched_until <= now):
+                    credential.benched_until = 0
+                    credential.remaining = None
+            available = [c for c in credentials if c.benched_until == 0]
+            if(len(available) == 0):
+                return None, min(c.benched_until for c in credentials) - now
+            credential = max(available, key=GitHubCredential.budget)
+            # Count the call right away, so that concurrent calls spread over the credentials
+            credential.remaining = credential.budget() - 1
+            return credential, 0
+
+    # Return the credential to use for the next call, or None if the pool has no credentials
+    def acquire(self):
+        credential, wait = self._take()
+        while(wait > 0):
+            time.sleep(wait)
+            credential, wait = self._take()
+        return credential
+
+    async def acquire_async(self):
+        credential, wait = self._take()
+        while(wait > 0):
+            await asyncio.sleep(wait)
+            credential, wait = self._take()
+        return credential
+
+    def update(self, credential, status_code, headers):
+        with self.lock:
+            if(status_code == 401):  # Bad credentials
+                credential.disabled = True
+                return
+            remaining = header_number(headers, 'X-RateLimit-Remaining')
+            reset = header_number(headers, 'X-RateLimit-Reset')
+            if(remaining is not None):
+                credential.remaining = remaining
+            if(is_rate_limited(status_code, headers) or remaining == 0):
+                retry_after = retry_after_seconds(headers)
+                if(retry_after is not None):
+                    credential.benched_until = time.time() + retry_after
+                elif(reset is not None):
+                    credential.benched_until = max(reset, time.time() + 1)
+                else:
+                    credential.benched_until = time.time() + DEFAULT_BENCH_SECONDS
@@ -1,46 +1,295 @@
 import time
 import requests
 import os
+import re
+import socket
+import json
+import gzip
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from credential_pool import GitHubTokenPool, load_tokens
+from http_cache import HTTPCache
+from rate_limiter import MAX_RETRIES, RateLimiter, is_rate_limited
+
+
+# Keys copied as is from the GitHub repos API
+REPO_KEYS = ['language', 'forks_count', 'stargazers_count', 'watchers_count', 'default_branch', 'open_issues_count', 'topics', 'has_issues', 'has_projects',
+             'has_wiki', 'has_pages', 'has_downloads', 'archived', 'pushed_at', 'created_at', 'updated_at', 'subscribers_count', 'network_count']
+# Largest page size of the DockerHub tags API
+TAG_PAGE_SIZE = 100
+# Number of tag pages of one image fetched at a time
+TAG_PAGE_WORKERS = 4
+
+
+# The parse_* functions turn API responses into results, independent of how they were fetched
+def parse_source_repo_name(json_data):
+    try:
+        if(len(json_data['objects']) == 0):
+            return None
+        elif(json_data['objects'][0]['provider'] == 'Github'):
+            return json_data['objects'][0]['owner'] + '/' + json_data['objects'][0]['repository']
+    except:  # error happends (invalid image name, API internal error...)
+        return None
+
+
+def repo_exists(repo_res):
+    try:  # To check whether the repo exists on GitHub
+        repo_res['full_name']
+        return True
+    except:  # if the repo does not exist
+        return False
+
+
+def parse_repo_info(repo_res):
+    results = {}
+    try:
+        results['repo_size'] = repo_res['size']
+    except:
+        pass
+    try:
+        results['license'] = repo_res['license']['key']
+    except:
+        pass
+    for key in REPO_KEYS:
+        try:
+            results[key] = repo_res[key]
+        except:
+            pass
+    return results
+
+
+def parse_dockerfile(text):
+    if(text == '404: Not Found\n'):
+        return 404
+    return text
+
+
+def parse_dockerfile_from_dockerhub(json_data):
+    try:
+        # There may be three results: 404 page, objects not found JSON, and
+        # contents JSON
+        return(json_data['contents'])
+    except:
+        return None
+
+
+def parse_dockerfile_commits(json_data):
+    dockerfile_commit_count = len(json_data)
+    dockerfile_commits = {}
+    if(dockerfile_commit_count == 0):
+        dockerfile_commits['dockerfile_commit_count'] = 0
+        dockerfile_commits['dockerfile_commit_date'] = []
+        dockerfile_commits['dockerfile_commit_sha'] = []
+        dockerfile_commits['dockerfile_commit_message'] = []
+        return dockerfile_commits
+    else:
+        dockerfile_commits[
+            'dockerfile_commit_count'] = dockerfile_commit_count
+        dockerfile_commit_date = []
+        dockerfile_commit_sha = []
+        dockerfile_commit_message = []
+        for i in range(dockerfile_commit_count):
+            dockerfile_commit_date.append(
+                json_data[i]['commit']['committer']['date'])
+            dockerfile_commit_sha.append(json_data[i]['sha'])
+            dockerfile_commit_message.append(
+                json_data[i]['commit']['message'])
+        dockerfile_commits[
+            'dockerfile_commit_date'] = dockerfile_commit_date
+        dockerfile_commits['dockerfile_commit_sha'] = dockerfile_commit_sha
+        dockerfile_commits[
+            'dockerfile_commit_message'] = dockerfile_commit_message
+        return dockerfile_commits
+
+
+def dockerfile_commits_results(dockerfile_commits):
+    return {
+        'dockerfile_commit_sha': dockerfile_commits['dockerfile_commit_sha'],
+        'dockerfile_commit_date': dockerfile_commits['dockerfile_commit_date'],
+        'dockerfile_commit_message': dockerfile_commits['dockerfile_commit_message'],
+    }
+
+
+# Get Docker image description, star_count and pull_count from a DockerHub response
+def parse_docker_image_info(json_data):
+    results = {}
+    try:
+        results['image_description'] = json_data['description']
+    except:
+        pass
+    try:
+        results['image_star_count'] = json_data['star_count']
+    except:
+        pass
+    try:
+        results['image_pull_count'] = json_data['pull_count']
+    except:
+        pass
+    return results
+
+
+# The tags of an image, listed from the most recently updated one when ordered, so that incremental crawls can
+# stop early. Full crawls keep the default order of the API.
+def docker_image_tags_url(image_name, page=1, ordered=False):
+    url = 'https://hub.docker.com/v2/repositories/{}/tags/?page_size={}&page={}'.format(image_name, TAG_PAGE_SIZE, page)
+    if(ordered):
+        url += '&ordering=last_updated'
+    return url
+
+
+def tag_page_count(tags_count):
+    return (tags_count + TAG_PAGE_SIZE - 1) // TAG_PAGE_SIZE
+
+
+# ISO 8601 times of DockerHub and of the webapp, e.g. 2019-06-20T10:00:00.123456Z or 2019-06-20T12:00:00+02:00
+ISO_DATETIME_PATTERN = re.compile(r'(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?'
+                                  r'(?:Z|([-+])(\d{2}):?(\d{2}))?')
+
+
+# Parse an ISO 8601 time into an aware datetime, UTC when it has no offset, or None
+def parse_date(value):
+    match = ISO_DATETIME_PATTERN.fullmatch(value.strip()) if isinstance(value, str) else None
+    if(match == None):
+        return None
+    year, month, day, hour, minute, second, fraction, sign, offset_hours, offset_minutes = match.groups()
+    try:
+        date = datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                        int((fraction or '0')[:6].ljust(6, '0')), timezone.utc)
+    except ValueError:
+        return None
+    if(sign != None):
+        offset = timedelta(hours=int(offset_hours), minutes=int(offset_minutes))
+        date -= offset if sign == '+' else -offset
+    return date
+
+
+# Append the tags of one page of the DockerHub tags API to j.
+# With since (the latest tag update time already crawled), stop at the first tag not updated
+# after it and return True.
+def parse_docker_image_tag_page(json_data, j, since=None):
+    try:
+        tags = json_data['results']
+    except:  # The page could not be fetched
+        return False
+    since = parse_date(since)
+    for tag in tags:
+        last_updated = parse_date(tag['last_updated'])
+        if(since != None and last_updated != None and last_updated <= since):
+            return True
+        j['tags_name'].append(tag['name'])
+        j['image_size'].append(tag['full_size'])
+        j['image_updated_at'].append(tag['last_updated'])
+    return False
+
+
+def docker_image_tag_results(docker_image_tag):
+    if(docker_image_tag['tags_count'] == -1):
+        return {}
+    results = {
+        'tags_count': docker_image_tag['tags_count'],
+        'tags_name': docker_image_tag['tags_name'],
+        'image_size': docker_image_tag['image_size'],
+        'image_updated_at': docker_image_tag['image_updated_at'],
+    }
+    if(docker_image_tag.get('tags_incremental')):  # Only the tags updated since the last crawl, merged by the webapp
+        results['tags_incremental'] = True
+    return results
 
 
 class DockerImageCrawler():
 
-    def __init__(self, url='http:/127.0.0.1:8000', username=None, password=None, **config_options):
+    def __init__(self, url='http:/127.0.0.1:8000', username=None, password=None, lease_count=10, flush_count=50, flush_interval=60, github_tokens=None, cache_dir=None, **config_options):
         self.url = url
+        self.lease_count = lease_count
+        self.flush_count = flush_count
+        self.flush_interval = flush_interval
+        self.results_buffer = []
+        self.last_flush = time.time()
+        self.worker = socket.gethostname()
         self.DockerHubSourceRepoQueryURL = 'https://hub.docker.com/api/build/v1/source/?image='
-        if(username == None or password == None):
-            self.authEnabled = False
-            self.get_interval = 60
-        else:
-            self.authEnabled = True
-            self.get_interval = 0.5
-        if(self.authEnabled):
-            self.username = username
-            self.password = password
-            self.__dict__.update(**config_options)
-            self.session = requests.Session()
-            if hasattr(self, 'api_token'):
-                self.session.headers[
-                    'Authorization'] = 'token %s' % self.api_token
-            elif hasattr(self, 'username') and hasattr(self, 'password'):
-                self.session.auth = (self.username, self.password)
+        self.rate_limiter = RateLimiter()
+        self.incremental_tags = False
+        self.http_cache = HTTPCache(cache_dir) if cache_dir else None
+        self.username = username
+        self.password = password
+        self.__dict__.update(**config_options)
+        self.session = requests.Session()
+        # GitHub calls are spread over all the tokens, plus the username/password or api_token if given
+        self.github_pool = GitHubTokenPool.from_tokens(
+            github_tokens, username, password, getattr(self, 'api_token', None))
+        self.authEnabled = len(self.github_pool) > 0
+
+    # Look up url in the HTTP cache, returning its entry and the headers of a conditional request
+    def cache_lookup(self, url):
+        if(self.http_cache == None):
+            return None, {}
+        entry = self.http_cache.load(url)
+        return entry, self.http_cache.conditional_headers(entry)
+
+    # Serve a 304 response from the HTTP cache, and store 200 responses in it
+    def cache_response(self, url, entry, res):
+        if(self.http_cache == None):
+            return res
+        cached = self.http_cache.response(url, entry, res.status_code, res.headers, res.text)
+        if(cached != None):
+            return cached
+        return res
 
+    # GET url within the rate limit of its host
+    def get(self, url):
+        entry, headers = self.cache_lookup(url)
+        return self.cache_response(url, entry, self.rate_limiter.get(requests, url, headers=headers))
+
+    # GET url with the GitHub credential which has the most remaining quota,
+    # retrying rate limited responses with the next one
     def call_github_api(self, url):
-        if(self.authEnabled):
-            return self.session.get(url)
-        else:
-            return requests.get(url)
+        entry, headers = self.cache_lookup(url)
+        for i in range(MAX_RETRIES + 1):
+            credential = self.github_pool.acquire()
+            if(credential == None):  # No credentials, call the API anonymously
+                return self.get(url)
+            self.rate_limiter.wait(url, credential.key)
+            res = self.session.get(url, headers=dict(credential.headers, **headers), auth=credential.auth)
+            self.rate_limiter.update(url, res.status_code, res.headers, credential.key)
+            self.github_pool.update(credential, res.status_code, res.headers)
+            if(not is_rate_limited(res.status_code, res.headers) and res.status_code != 401):
+                break
+        return self.cache_response(url, entry, res)
+
+    # Buffer crawled results and post them to the webapp in batches
+    def post_result(self, results):
+        self.results_buffer.append(results)
+        if(len(self.results_buffer) >= self.flush_count or time.time() - self.last_flush >= self.flush_interval):
+            self.flush_results()
+
+    def flush_results(self):
+        if(len(self.results_buffer) > 0):
+            body = gzip.compress(json.dumps(self.results_buffer).encode('utf-8'))
+            requests.post(self.url + '/dockerimages/', data=body, headers={
+                'Content-Type': 'application/json', 'Content-Encoding': 'gzip'})
+        self.results_buffer = []
+        self.last_flush = time.time()
+
+    # Lease tasks from the webapp in batches and yield them one by one
+    def lease_tasks(self, task):
+        while True:
+            self.flush_results()  # Post the results of the previous batch before its lease expires
+            res = requests.get(self.url + '/lease_tasks/', params={
+                'task': task, 'count': self.lease_count, 'worker': self.worker}).json()
+            if(len(res['tasks']) == 0):  # No more images left
+                time.sleep(60)  # Try again one min later
+                continue
+            for task_json in res['tasks']:
+                yield task_json
 
     def get_source_repo_name(self, image_name):
-        res = requests.get(
+        res = self.get(
             self.DockerHubSourceRepoQueryURL + image_name).json()
-        try:
-            if(len(res['objects']) == 0):
-                return None
-            elif(res['objects'][0]['provider'] == 'Github'):
-                return res['objects'][0]['owner'] + '/' + res['objects'][0]['repository']
-        except:  # error happends (invalid image name, API internal error...)
-            return None
+        return parse_source_repo_name(res)
+
+    def get_repo(self, repo_full_name):
+        return self.call_github_api(
+            'https://api.github.com/repos/' + repo_full_name).json()
 
     def get_first_commit(self, repo_full_name):
         url = 'https://api.github.com/repos/{}/commits'.format(repo_full_name)
@@ -49,7 +298,7 @@ class DockerImageCrawler():
         if req.headers.get('Link'):
             page_url = req.headers.get('Link').split(',')[1].split(';')[
                 0].split('<')[1].split('>')[0]
-            req_last_commit = requests.get(page_url)
+            req_last_commit = self.call_github_api(page_url)
             first_commit = req_last_commit.json()
             first_commit_hash = first_commit[-1]['sha']
         else:
@@ -65,7 +314,6 @@ class DockerImageCrawler():
             commit_count = json_data['contributions']
             return commit_count
         except:
-            time.sleep(self.get_interval)
             url = 'https://api.github.com/repos/{}/commits'.format(
                 repo_full_name)
             req = self.call_github_api(url)
@@ -79,260 +327,124 @@ class DockerImageCrawler():
         url = 'https://raw.githubusercontent.com/{}/master/Dockerfile'.format(
             repo_full_name)
         req = self.call_github_api(url)
-        req_text = req.text
-        if(req_text == '404: Not Found\n'):
-            return 404
-        return req_text
+        return parse_dockerfile(req.text)
 
     def get_dockerfile_from_dockerhub(self, image_name):
         url = 'https://hub.docker.com/v2/repositories/{}/dockerfile/'.format(
             image_name)
-        req = requests.get(url)
+        req = self.get(url)
         try:
-            # There may be three results: 404 page, objects not found JSON, and
-            # contents JSON
             json_data = req.json()
-            return(json_data['contents'])
         except:
             return None
+        return parse_dockerfile_from_dockerhub(json_data)
 
     def get_dockerfile_commits(self, repo_full_name):
         url = 'https://api.github.com/repos/{}/commits?path=Dockerfile'.format(
             repo_full_name)
         req = self.call_github_api(url)
-        json_data = req.json()
-        dockerfile_commit_count = len(json_data)
-        dockerfile_commits = {}
-        if(dockerfile_commit_count == 0):
-            dockerfile_commits['dockerfile_commit_count'] = 0
-            dockerfile_commits['dockerfile_commit_date'] = []
-            dockerfile_commits['dockerfile_commit_sha'] = []
-            dockerfile_commits['dockerfile_commit_message'] = []
-            return dockerfile_commits
-        else:
-            dockerfile_commits[
-                'dockerfile_commit_count'] = dockerfile_commit_count
-            dockerfile_commit_date = []
-            dockerfile_commit_sha = []
-            dockerfile_commit_message = []
-            for i in range(dockerfile_commit_count):
-                dockerfile_commit_date.append(
-                    json_data[i]['commit']['committer']['date'])
-                dockerfile_commit_sha.append(json_data[i]['sha'])
-                dockerfile_commit_message.append(
-                    json_data[i]['commit']['message'])
-            dockerfile_commits[
-                'dockerfile_commit_date'] = dockerfile_commit_date
-            dockerfile_commits['dockerfile_commit_sha'] = dockerfile_commit_sha
-            dockerfile_commits[
-                'dockerfile_commit_message'] = dockerfile_commit_message
-            return dockerfile_commits
+        return parse_dockerfile_commits(req.json())
 
     # Get Docker image description, star_count and pull_count from DockerHub
     def get_docker_image_info(self, image_name):
         url = 'https://hub.docker.com/v2/repositories/{}/'.format(image_name)
-        req = requests.get(url)
+        req = self.get(url)
         try:
             json_data = req.json()
         except:
             return None
-        results = {}
-        try:
-            results['image_description'] = json_data['description']
-        except:
-            pass
-        try:
-            results['image_star_count'] = json_data['star_count']
-        except:
-            pass
+        return parse_docker_image_info(json_data)
+
+    def get_docker_image_tag_page(self, image_name, page, ordered=False):
         try:
-            results['image_pull_count'] = json_data['pull_count']
+            return self.get(docker_image_tags_url(image_name, page, ordered)).json()
         except:
-            pass
-        return results
+            return None
 
-    def get_docker_image_tag(self, image_name):
-        url = 'https://hub.docker.com/v2/repositories/{}/tags/'.format(
-            image_name)
-        j = {}
-        tags_name = []
-        image_size = []
-        image_updated_at = []
-        req = requests.get(url)
+    # Get all the tags of an image, or only those updated after since (incremental mode)
+    def get_docker_image_tag(self, image_name, since=None):
+        j = {'tags_name': [], 'image_size': [], 'image_updated_at': []}
+        json_data = self.get_docker_image_tag_page(image_name, 1, since != None)
         try:
-            json_data = req.json()
-            tags_count = json_data['count']
+            j['tags_count'] = json_data['count']
         except:
             return {'tags_count': -1}
-        j['tags_count'] = tags_count
-        next_url = json_data['next']
-        for i in range(len(json_data['results'])):
-            tags_name.append(json_data['results'][i]['name'])
-            image_size.append(json_data['results'][i]['full_size'])
-            image_updated_at.append(json_data['results'][i]['last_updated'])
-        while(next_url != None):
-            time.sleep(0.5)
-            req = requests.get(next_url)
-            json_data = req.json()
-            try:
-                json_data['count']
-            except:
-                break
-            next_url = json_data['next']
-            for i in range(len(json_data['results'])):
-                tags_name.append(json_data['results'][i]['name'])
-                image_size.append(json_data['results'][i]['full_size'])
-                image_updated_at.append(
-                    json_data['results'][i]['last_updated'])
-        j['tags_name'] = tags_name
-        j['image_size'] = image_size
-        j['image_updated_at'] = image_updated_at
+        page_count = tag_page_count(j['tags_count'])
+        if(since != None):  # Page until reaching the tags already crawled
+            j['tags_incremental'] = True
+            page = 1
+            while(not parse_docker_image_tag_page(json_data, j, since) and page < page_count):
+                page += 1
+                json_data = self.get_docker_image_tag_page(image_name, page, True)
+            return j
+        parse_docker_image_tag_page(json_data, j)
+        # The remaining pages are known from the tags count, so fetch them concurrently
+        with ThreadPoolExecutor(TAG_PAGE_WORKERS) as executor:
+            for json_data in executor.map(lambda page: self.get_docker_image_tag_page(image_name, page),
+                                          range(2, page_count + 1)):
+                parse_docker_image_tag_page(json_data, j)
         return j
 
+    # The latest tag update time already crawled for an image, in incremental mode
+    def tags_since(self, task_json):
+        if(self.incremental_tags):
+            return task_json.get('latest_tag_updated_at')
+        return None
+
     def get_source_repo_name_task(self):
-        while True:
-            task_json = requests.get(
-                self.url + '/get_source_repo_name_task/').json()
+        for task_json in self.lease_tasks('reponame'):
             source_repo_name = self.get_source_repo_name(
                 task_json['image_name'])
             results = {'pk': task_json['pk'], 'reponame_task': True}
             if source_repo_name != None:
                 results['source_repo_name'] = source_repo_name
-            r = requests.post(self.url + '/dockerimage/', json=results)
-            time.sleep(0.5)
+            self.post_result(results)
 
     def docker_image_info_crawler_task(self):
-        while True:
-            task_json = requests.get(
-                self.url + '/docker_image_info_crawler_task/').json()
-            try:
-                if(task_json['code'] == 400):  # No more images left
-                    time.sleep(60)  # Try again one min later
-                    continue
-            except:
-                pass
+        for task_json in self.lease_tasks('imageinfo'):
             image_name = task_json['image_name']
             source_repo_name = task_json['source_repo_name']
             if(source_repo_name == 'None'):
                 continue  # Do nothing if the image does not have a source repo
             results = {'pk': task_json['pk'], 'imageinfo_task': True}
-            repo_res = self.call_github_api(
-                'https://api.github.com/repos/' + source_repo_name).json()
-            if(self.authEnabled):
-                repo_res = self.session.get(
-                    'https://api.github.com/repos/' + source_repo_name).json()
-            else:
-                repo_res = requests.get(
-                    'https://api.github.com/repos/' + source_repo_name).json()
-            try:  # To check whether the repo exists on GitHub
-                try_repo_name = repo_res['full_name']
-            except:  # if the repo does not exist, return pk only
-                r = requests.post(self.url + '/dockerimage/', json=results)
+            repo_res = self.get_repo(source_repo_name)
+            if(not repo_exists(repo_res)):  # if the repo does not exist, return pk only
+                self.post_result(results)
                 continue
-            try:
-                results['repo_size'] = repo_res['size']
-            except:
-                pass
-            try:
-                results['license'] = repo_res['license']['key']
-            except:
-                pass
-            keys = ['language', 'forks_count', 'stargazers_count', 'watchers_count', 'default_branch', 'open_issues_count', 'topics', 'has_issues', 'has_projects',
-                    'has_wiki', 'has_pages', 'has_downloads', 'archived', 'pushed_at', 'created_at', 'updated_at', 'subscribers_count', 'network_count']
-            for key in keys:
-                try:
-                    results[key] = repo_res[key]
-                except:
-                    pass
+            results.update(parse_repo_info(repo_res))
 
             latest_dockerfile = self.get_dockerfile(source_repo_name)
             if(latest_dockerfile != 404):
                 results['latest_dockerfile'] = latest_dockerfile
                 results['repo_commits_count'] = self.get_all_commits_count(
                     source_repo_name)
-                # time.sleep(self.get_interval)
-                dockerfile_commits = self.get_dockerfile_commits(
-                    source_repo_name)
-                # time.sleep(self.get_interval)
-                results['dockerfile_commit_sha'] = dockerfile_commits[
-                    'dockerfile_commit_sha']
-                results['dockerfile_commit_date'] = dockerfile_commits[
-                    'dockerfile_commit_date']
-                results['dockerfile_commit_message'] = dockerfile_commits[
-                    'dockerfile_commit_message']
-
-            docker_image_tag = self.get_docker_image_tag(image_name)
-            if(docker_image_tag['tags_count'] != -1):
-                results['tags_count'] = docker_image_tag['tags_count']
-                results['tags_name'] = docker_image_tag['tags_name']
-                results['image_size'] = docker_image_tag['image_size']
-                results['image_updated_at'] = docker_image_tag[
-                    'image_updated_at']
-            r = requests.post(self.url + '/dockerimage/', json=results)
-            time.sleep(self.get_interval)
+                results.update(dockerfile_commits_results(
+                    self.get_dockerfile_commits(source_repo_name)))
+
+            results.update(docker_image_tag_results(
+                self.get_docker_image_tag(image_name, self.tags_since(task_json))))
+            self.post_result(results)
 
     # Identifier: imageinfo_task
-    def crawl_all_images_info_task(self):
-        while True:
-            task_json = requests.get(
-                self.url + '/crawl_all_images_info_task/').json()
-            try:
-                if(task_json['code'] == 400):  # No more images left
-                    time.sleep(60)  # Try again one min later
-                    continue
-            except:
-                pass
+    # queue: 'allimageinfo' for images not crawled yet, 'refresh' to recrawl the most stale images first
+    def crawl_all_images_info_task(self, queue='allimageinfo'):
+        for task_json in self.lease_tasks(queue):
             image_name = task_json['image_name']
             results = {'pk': task_json['pk'], 'imageinfo_task': True}
             source_repo_name = self.get_source_repo_name(image_name)
             if (source_repo_name != None):
                 results['source_repo_name'] = source_repo_name
-                repo_res = self.call_github_api(
-                    'https://api.github.com/repos/' + source_repo_name).json()
-                if(self.authEnabled):
-                    repo_res = self.session.get(
-                        'https://api.github.com/repos/' + source_repo_name).json()
-                else:
-                    repo_res = requests.get(
-                        'https://api.github.com/repos/' + source_repo_name).json()
-                try_repo_name = False
-                try:  # To check whether the repo exists on GitHub
-                    try_repo_name = repo_res['full_name']
-                    try_repo_name = True
-                except:  # if the repo does not exist
-                    try_repo_name = False
-                if(try_repo_name):  # if the repo exists
-                    try:
-                        results['repo_size'] = repo_res['size']
-                    except:
-                        pass
-                    try:
-                        results['license'] = repo_res['license']['key']
-                    except:
-                        pass
-                    keys = ['language', 'forks_count', 'stargazers_count', 'watchers_count', 'default_branch', 'open_issues_count', 'topics', 'has_issues', 'has_projects',
-                            'has_wiki', 'has_pages', 'has_downloads', 'archived', 'pushed_at', 'created_at', 'updated_at', 'subscribers_count', 'network_count']
-                    for key in keys:
-                        try:
-                            results[key] = repo_res[key]
-                        except:
-                            pass
+                repo_res = self.get_repo(source_repo_name)
+                if(repo_exists(repo_res)):  # if the repo exists
+                    results.update(parse_repo_info(repo_res))
                     latest_dockerfile = self.get_dockerfile(source_repo_name)
                     if(latest_dockerfile != 404):  # crawl the latest dockerfile from github source repo
                         results['dockerfile_source'] = 'GitHub'
                         results['latest_dockerfile'] = latest_dockerfile
                         results['repo_commits_count'] = self.get_all_commits_count(
                             source_repo_name)
-                        # time.sleep(self.get_interval)
-                        dockerfile_commits = self.get_dockerfile_commits(
-                            source_repo_name)
-                        # time.sleep(self.get_interval)
-                        results['dockerfile_commit_sha'] = dockerfile_commits[
-                            'dockerfile_commit_sha']
-                        results['dockerfile_commit_date'] = dockerfile_commits[
-                            'dockerfile_commit_date']
-                        results['dockerfile_commit_message'] = dockerfile_commits[
-                            'dockerfile_commit_message']
+                        results.update(dockerfile_commits_results(
+                            self.get_dockerfile_commits(source_repo_name)))
                     else:
                         # If the crawler can not get the latest dockerfile from
                         # GitHub, try to get it from DockerHub
@@ -357,51 +469,23 @@ class DockerImageCrawler():
                     results['dockerfile_source'] = 'DockerHub'
 
             # Get Docker image tags
-            docker_image_tag = self.get_docker_image_tag(image_name)
-            if(docker_image_tag['tags_count'] != -1):
-                results['tags_count'] = docker_image_tag['tags_count']
-                results['tags_name'] = docker_image_tag['tags_name']
-                results['image_size'] = docker_image_tag['image_size']
-                results['image_updated_at'] = docker_image_tag[
-                    'image_updated_at']
+            results.update(docker_image_tag_results(
+                self.get_docker_image_tag(image_name, self.tags_since(task_json))))
 
             # Get Docker image description, star count and pull count
             docker_image_info = self.get_docker_image_info(image_name)
             if(docker_image_info != None):
-                for key in docker_image_info.keys():
-                    results[key] = docker_image_info[key]
-            r = requests.post(self.url + '/dockerimage/', json=results)
-            time.sleep(self.get_interval)
+                results.update(docker_image_info)
+            self.post_result(results)
 
     # Identifier: imageinfo_task
     def crawl_repo_by_name_match_task(self):
-        while True:
-            task_json = requests.get(
-                self.url + '/crawl_all_images_info_task/').json()
-            try:
-                if(task_json['code'] == 400):  # No more images left
-                    time.sleep(60)  # Try again one min later
-                    continue
-            except:
-                pass
+        for task_json in self.lease_tasks('allimageinfo'):
             image_name = task_json['image_name']
             results = {'pk': task_json['pk'], 'imageinfo_task': True}
             source_repo_name = image_name  # NameMatch
-            repo_res = self.call_github_api(
-                'https://api.github.com/repos/' + source_repo_name).json()
-            if(self.authEnabled):
-                repo_res = self.session.get(
-                    'https://api.github.com/repos/' + source_repo_name).json()
-            else:
-                repo_res = requests.get(
-                    'https://api.github.com/repos/' + source_repo_name).json()
-            try_repo_name = False
-            try:  # To check whether the repo exists on GitHub
-                try_repo_name = repo_res['full_name']
-                try_repo_name = True
-            except:  # if the repo does not exist
-                try_repo_name = False
-            if(try_repo_name):  # if the repo exists, try to get the latest dockerfile and relevant info from the GitHub repo
+            repo_res = self.get_repo(source_repo_name)
+            if(repo_exists(repo_res)):  # if the repo exists, try to get the latest dockerfile and relevant info from the GitHub repo
                 latest_dockerfile = self.get_dockerfile(source_repo_name)
                 if(latest_dockerfile != 404):  # crawl the latest dockerfile from github source repo
                     results['dockerfile_source'] = 'NameMatch'
@@ -409,50 +493,42 @@ class DockerImageCrawler():
                     results['latest_dockerfile'] = latest_dockerfile
                     results['repo_commits_count'] = self.get_all_commits_count(
                         source_repo_name)
-                    time.sleep(self.get_interval)
-                    dockerfile_commits = self.get_dockerfile_commits(
-                        source_repo_name)
-                    time.sleep(self.get_interval)
-                    results['dockerfile_commit_sha'] = dockerfile_commits[
-                        'dockerfile_commit_sha']
-                    results['dockerfile_commit_date'] = dockerfile_commits[
-                        'dockerfile_commit_date']
-                    results['dockerfile_commit_message'] = dockerfile_commits[
-                        'dockerfile_commit_message']
-                    try:
-                        results['repo_size'] = repo_res['size']
-                    except:
-                        pass
-                    try:
-                        results['license'] = repo_res['license']['key']
-                    except:
-                        pass
-                    keys = ['language', 'forks_count', 'stargazers_count', 'watchers_count', 'default_branch', 'open_issues_count', 'topics', 'has_issues',
-                            'has_projects', 'has_wiki', 'has_pages', 'has_downloads', 'archived', 'pushed_at', 'created_at', 'updated_at', 'subscribers_count', 'network_count']
-                    for key in keys:
-                        try:
-                            results[key] = repo_res[key]
-                        except:
-                            pass
+                    results.update(dockerfile_commits_results(
+                        self.get_dockerfile_commits(source_repo_name)))
+                    results.update(parse_repo_info(repo_res))
             else:  # If the repo does not exist, do nothing
                 pass
-            r = requests.post(self.url + '/dockerimage/', json=results)
-            time.sleep(self.get_interval)
+            self.post_result(results)
 
 if __name__ == '__main__':
     url = os.getenv('POSTURL')
     username = os.getenv('USERNAME')
     password = os.getenv('PASSWORD')
-    task = os.getenv('TASK')  # RepoName / ImageInfo / AllIMageInfo / NameMatch
+    github_tokens = load_tokens(os.getenv('GITHUB_TOKENS'), os.getenv('GITHUB_TOKENS_FILE'))
+    cache_dir = os.getenv('HTTP_CACHE_DIR')
+    lease_count = int(os.getenv('LEASE_COUNT', 10))
+    flush_count = int(os.getenv('FLUSH_COUNT', 50))
+    incremental_tags = os.getenv('INCREMENTAL_TAGS') == '1'
+    task = os.getenv('TASK')  # RepoName / ImageInfo / AllIMageInfo / AsyncAllImageInfo / Refresh / AsyncRefresh / NameMatch
     if(url == None):
         url = 'http://127.0.0.1:8000'
-    crawler = DockerImageCrawler(url, username, password)
-    if(task == 'RepoName'):
+    crawler = DockerImageCrawler(url, username, password, lease_count, flush_count, github_tokens=github_tokens,
+                                 cache_dir=cache_dir, incremental_tags=incremental_tags)
+    if(task == 'AsyncAllImageInfo' or task == 'AsyncRefresh'):
+        from async_crawler import AsyncDockerImageCrawler
+        concurrency = int(os.getenv('CONCURRENCY', 20))
+        crawler = AsyncDockerImageCrawler(url, username, password, lease_count, flush_count, concurrency,
+                                          github_tokens=github_tokens, cache_dir=cache_dir,
+                                          incremental_tags=incremental_tags)
+        crawler.crawl_all_images_info_task('refresh' if task == 'AsyncRefresh' else 'allimageinfo')
+    elif(task == 'RepoName'):
         crawler.get_source_repo_name_task()
     elif(task == 'ImageInfo'):
         crawler.docker_image_info_crawler_task()
     elif(task == 'AllImageInfo'):
         crawler.crawl_all_images_info_task()
+    elif(task == 'Refresh'):  # Run the score_refresh_priority command of the webapp periodically
+        crawler.crawl_all_images_info_task('refresh')
     elif(task == 'NameMatch'):  # Use issue3.sql to initialize the db
         crawler.crawl_repo_by_name_match_task()
     else:
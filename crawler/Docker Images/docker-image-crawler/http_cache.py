@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+from requests.structures import CaseInsensitiveDict
+
+
+# Stand-in for requests.Response, for cached or asyncio responses
+class Response():
+
+    def __init__(self, status, headers, text):
+        self.status = status
+        self.headers = CaseInsensitiveDict(headers)
+        self.text = text
+
+    @property
+    def status_code(self):
+        return self.status
+
+    def json(self):
+        return json.loads(self.text)
+
+
+# On-disk cache of the 200 responses with an ETag or Last-Modified, revalidated with conditional requests
+class HTTPCache():
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, url):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest[2:4], digest + '.json.gz')
+
+    def load(self, url):
+        try:
+            with gzip.open(self.path(url), 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if(entry.get('url') != url):
+            return None
+        entry['headers'] = CaseInsensitiveDict(entry['headers'])
+        return entry
+
+    def store(self, url, headers, text):
+        headers = CaseInsensitiveDict(headers)
+        if(not headers.get('ETag') and not headers.get('Last-Modified')):
+            return
+        entry = {'url': url, 'headers': dict(headers), 'text': text}
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first, so that a crash never leaves a truncated entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            os.remove(tmp_path)
+
+    # Headers to add to the request of url, given its cached entry
+    def conditional_headers(self, entry):
+        headers = {}
+        if(entry != None):
+            if(entry['headers'].get('ETag')):
+                headers['If-None-Match'] = entry['headers']['ETag']
+            if(entry['headers'].get('Last-Modified')):
+                headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+        return headers
+
+    # Turn the response to a conditional request of url into a full response
+    def response(self, url, entry, status, headers, text):
+        if(status == 304 and entry != None):
+            # The fresh headers (e.g. rate limits) take precedence over the cached ones
+            merged = CaseInsensitiveDict(entry['headers'])
+            merged.update(headers)
+            return Response(200, merged, entry['text'])
+        if(status == 200):
+            self.store(url, headers, text)
+        return None
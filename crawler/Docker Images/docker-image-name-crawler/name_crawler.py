@@ -1,57 +1,112 @@
-import selenium as se
-from selenium import webdriver
+import atexit
 import time
 import requests
 import os
+from concurrent.futures import ThreadPoolExecutor
+from rate_limiter import RateLimiter
+try:
+    from selenium import webdriver
+except ImportError:  # The browser is only a fallback for getting the DockerHub cookies
+    webdriver = None
+
+
+HEADERS = {'Host': 'hub.docker.com','Search-Version': 'v3','Accept': 'application/json','User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_13_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/73.0.3683.103 Safari/537.36','Referer': 'https://hub.docker.com/search/?q=&type=image&sort=updated_at&order=desc&page=16' ,'Accept-Language': 'en,zh-CN;q=0.9,zh;q=0.8,ceb;q=0.7'}
+# Number of pages crawled before getting new cookies
+MAX_COOKIE_AGE = 100
+# Seconds waited before retrying to get the cookies, doubled after each failure
+MIN_COOKIE_BACKOFF = 10
+MAX_COOKIE_BACKOFF = 600
+
+# Headless Chrome, started on first use and shared by all the crawlers of the process
+_browser = None
+
+
+def get_browser():
+    global _browser
+    if(_browser == None):
+        if(webdriver == None):
+            raise RuntimeError('selenium is required to get the DockerHub cookies with a browser')
+        options = webdriver.ChromeOptions()
+        options.add_argument('--headless')
+        options.add_argument('--no-sandbox')
+        _browser = webdriver.Chrome(options=options)
+        _browser.set_page_load_timeout(10)
+        atexit.register(_browser.quit)
+    return _browser
 
 
 class DockerImageNameCrawler():
 
-    def __init__(self, url='http://10.0.0.15:8000', order='desc', **config_options):
+    def __init__(self, url='http://10.0.0.15:8000', order='desc', lease_count=20, concurrency=4, **config_options):
         self.url = url
         self.order=order
+        self.lease_count = lease_count
+        self.concurrency = concurrency
         self.order_par=0 if order=='desc' else 10000000
-        self.options = se.webdriver.ChromeOptions()
-        self.options.add_argument('--headless')
-        self.options.add_argument('--no-sandbox')
-        self.driver = se.webdriver.Chrome(options=self.options)
         self.docker_hub_base_URL = 'https://hub.docker.com/search/?q=&type=image&operating_system=linux&architecture=amd64&page='
         self.docker_image_base_URL = 'https://hub.docker.com/r/'
         self.docker_hub_explore_URL='https://hub.docker.com/api/content/v1/products/search?q=&type=image&sort=updated_at&order={}&architecture=amd64&page='.format(self.order)
         self.__dict__.update(**config_options)
-        self.session = requests.Session()
-        self.cookie=self.get_cookie()
-        self.update_cookie()
-        self.session.headers=headers={'Host': 'hub.docker.com','Search-Version': 'v3','Accept': 'application/json','User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_13_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/73.0.3683.103 Safari/537.36','Referer': 'https://hub.docker.com/search/?q=&type=image&sort=updated_at&order=desc&page=16' ,'Accept-Language': 'en,zh-CN;q=0.9,zh;q=0.8,ceb;q=0.7'}
-        self.cookie_age=0
-        
+        self.rate_limiter = RateLimiter()
+        self.refresh_cookie()
+
+    # A keep-alive session with a connection for each concurrent page
+    def new_session(self):
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=self.concurrency))
+        return session
+
+    # Get the cookies of the DockerHub search page with plain HTTP, and check that the search API accepts them
+    def warm_up_session(self):
+        session = self.new_session()
+        try:
+            self.rate_limiter.get(session, self.docker_hub_base_URL, headers={'Accept': 'text/html'})
+            res = self.rate_limiter.get(session, self.docker_hub_explore_URL + '1')
+            if('summaries' in res.json().keys()):
+                return session
+        except:
+            pass
+        return None
+
+    # Get the cookies with the browser, only if the plain HTTP warm-up failed
     def get_cookie(self):
-        self.driver = se.webdriver.Chrome(options=self.options)
-        self.driver.get(self.docker_hub_base_URL)
-        self.driver.set_page_load_timeout(10)
-        cookie=self.driver.get_cookies()
-        self.driver.close()
-        return cookie
-    
+        browser = get_browser()
+        browser.delete_all_cookies()
+        browser.get(self.docker_hub_base_URL)
+        return browser.get_cookies()
+
     def update_cookie(self):
         c=requests.cookies.RequestsCookieJar()
         for item in self.cookie:
             c.set(item['name'],item['value'])
         self.session.cookies.update(c)
-    
+
+    # Get the cookies with plain HTTP, else with the browser when there is one, retrying both after a backoff
     def refresh_cookie(self):
-        self.session = requests.Session()
-        self.cookie=self.get_cookie()
-        self.update_cookie()
+        backoff = MIN_COOKIE_BACKOFF
+        while True:
+            self.session = self.warm_up_session()
+            if(self.session != None):
+                break
+            self.session = self.new_session()
+            try:
+                self.cookie=self.get_cookie()
+                self.update_cookie()
+                break
+            except Exception as e:  # No selenium or chromedriver (built without WITH_BROWSER=1), or the browser failed
+                print('Could not get the DockerHub cookies, retrying in {}s: {!r}'.format(backoff, e))
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_COOKIE_BACKOFF)
         self.cookie_age=0
-        
+
     def get(self,url):
-        res=self.session.get(url).json()
+        res=self.rate_limiter.get(self.session,url).json()
         return res
 
     def crawl_image_name(self, pageNumber):
         docker_hub_URL = self.docker_hub_explore_URL + str(pageNumber)
-        res=self.session.get(docker_hub_URL).json()
+        res=self.get(docker_hub_URL)
         image_dict={}
         if(not 'summaries' in res.keys()):
             return {}
@@ -60,25 +115,51 @@ class DockerImageNameCrawler():
             image_dict[original_id] = res['summaries'][i]['name']
         return image_dict
 
+    def try_crawl_image_name(self, pageNumber):
+        try:
+            return self.crawl_image_name(pageNumber)
+        except:
+            return None
+
+    # Lease a batch of pages, crawl them concurrently and post all their names at once, returning the pages leased
+    def crawl_image_name_batch(self):
+        pages = requests.get(self.url + '/lease_pages/', params={'count': self.lease_count}).json()['pages']
+        if(len(pages) == 0):
+            return pages
+        image_dict = {}
+        done_pages = []
+        failed = False
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            for page, page_image_dict in zip(pages, executor.map(self.try_crawl_image_name, pages)):
+                if(page_image_dict == None):
+                    failed = True
+                else:  # Pages without images are done too, as they were before leasing
+                    image_dict.update(page_image_dict)
+                    done_pages.append(page)
+        # Counted here rather than by each thread
+        self.cookie_age += len(pages)
+        if(len(done_pages) > 0):
+            requests.post(self.url + '/image_names/', json={'image_list': image_dict, 'pages': done_pages})
+        if(failed):  # The cookies may have expired, the failed pages are leased again once their lease expires
+            time.sleep(10)
+            self.refresh_cookie()
+        elif(self.cookie_age>=MAX_COOKIE_AGE):
+            self.refresh_cookie()
+        return pages
+
     def crawl_image_name_task(self):
         while True:
-            task_json = requests.get(self.url + '/get_image_name_task/').json()
-            try:
-                image_dict = self.crawl_image_name(task_json['page'])
-            except:
-                time.sleep(10)
-            r = requests.post(self.url + '/image_name/',
-                              json={'image_list': image_dict, 'page': task_json['page']})
-            time.sleep(1)
-            if(self.cookie_age>=100):
-                self.refresh_cookie()
+            if(len(self.crawl_image_name_batch()) == 0):  # No more pages left
+                time.sleep(60)  # Try again one min later
 
 if __name__ == '__main__':
     posturl = os.getenv('POSTURL')
     order = os.getenv('ORDER')
+    lease_count = int(os.getenv('LEASE_COUNT', 20))
+    concurrency = int(os.getenv('CONCURRENCY', 4))
     if(posturl == None):
         posturl = 'http://162.246.157.111:8000'
     if(order == None):
         order = 'desc'
-    crawler = DockerImageNameCrawler(posturl,order)
+    crawler = DockerImageNameCrawler(posturl,order,lease_count,concurrency)
     crawler.crawl_image_name_task()
@@ -0,0 +1,29 @@
+import os
+import sys
+import time
+
+import pytest
+
+
+# The crawlers import each other's modules and those of common, which their Docker images copy side by side
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ['common', 'docker-image-crawler', 'docker-image-name-crawler']:
+    sys.path.insert(0, os.path.join(ROOT, directory))
+
+
+class Clock():
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Drive the clocks of the rate limiters and the credential pools by hand, so that no test sleeps
+    clock = Clock()
+    monkeypatch.setattr(time, 'monotonic', clock)
+    monkeypatch.setattr(time, 'time', clock)
+    return clock
@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import pytest
+
+from async_crawler import AsyncDockerImageCrawler
+from credential_pool import CredentialsRejected
+from docker_image_crawler import docker_image_tags_url
+
+
+class FakeResponse():
+
+    def __init__(self, status, text, headers):
+        self.status = status
+        self.headers = headers
+        self._text = text
+
+    async def text(self):
+        return self._text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+# An aiohttp session answering from routes, {url: (status, body[, headers])} or a list of those in turn
+class FakeHTTP():
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append((url, headers or {}))
+        answer = self.routes.get(url, (404, '404: Not Found\n'))
+        if(isinstance(answer, list)):
+            answer = answer.pop(0)
+        body = answer[1] if isinstance(answer[1], str) else json.dumps(answer[1])
+        return FakeResponse(answer[0], body, answer[2] if len(answer) > 2 else {})
+
+
+def crawler():
+    return AsyncDockerImageCrawler('http://webapp')
+
+
+def image_routes(image_name, repo_name):
+    return {
+        'https://hub.docker.com/api/build/v1/source/?image=' + image_name: (200, {'objects': [
+            {'provider': 'Github', 'owner': repo_name.split('/')[0], 'repository': repo_name.split('/')[1]}]}),
+        'https://api.github.com/repos/' + repo_name: (200, {'full_name': repo_name, 'language': 'Shell'}),
+        'https://raw.githubusercontent.com/{}/master/Dockerfile'.format(repo_name): (200, 'FROM alpine\n'),
+        'https://api.github.com/repos/{}/contributors'.format(repo_name): (200, [{'contributions': 7}]),
+        'https://api.github.com/repos/{}/commits?path=Dockerfile'.format(repo_name): (200, [
+            {'sha': 'abc', 'commit': {'committer': {'date': '2019-02-14T09:57:18Z'}, 'message': 'Add Dockerfile'}}]),
+        docker_image_tags_url(image_name, 1): (200, {'count': 2, 'results': [
+            {'name': 'latest', 'full_size': 10, 'last_updated': '2019-02-14T09:57:18Z'},
+            {'name': 'v1', 'full_size': 9, 'last_updated': '2019-01-01T00:00:00Z'}]}),
+        'https://hub.docker.com/v2/repositories/{}/'.format(image_name): (200, {
+            'description': 'An image', 'star_count': 3, 'pull_count': 100}),
+    }
+
+
+def test_crawl_image_with_github_repo():
+    http = FakeHTTP(image_routes('user/image', 'user/repo'))
+    results = asyncio.run(crawler().crawl_image_async(http, {'pk': 1, 'image_name': 'user/image'}))
+    assert results['pk'] == 1 and results['imageinfo_task']
+    assert results['source_repo_name'] == 'user/repo'
+    assert results['language'] == 'Shell'
+    assert results['dockerfile_source'] == 'GitHub'
+    assert results['latest_dockerfile'] == 'FROM alpine\n'
+    assert results['repo_commits_count'] == 7
+    assert results['dockerfile_commit_sha'] == ['abc']
+    assert results['tags_count'] == 2
+    assert results['tags_name'] == ['latest', 'v1']
+    assert results['image_size'] == [10, 9]
+    assert results['image_pull_count'] == 100
+    assert not 'tags_incremental' in results
+
+
+def test_crawl_image_falls_back_to_dockerhub_dockerfile():
+    routes = image_routes('user/image', 'user/repo')
+    del routes['https://raw.githubusercontent.com/user/repo/master/Dockerfile']
+    routes['https://hub.docker.com/v2/repositories/user/image/dockerfile/'] = (200, {'contents': 'FROM debian\n'})
+    results = asyncio.run(crawler().crawl_image_async(FakeHTTP(routes), {'pk': 1, 'image_name': 'user/image'}))
+    assert results['source_repo_name'] == 'user/repo'
+    assert results['dockerfile_source'] == 'DockerHub'
+    assert results['latest_dockerfile'] == 'FROM debian\n'
+    assert not 'dockerfile_commit_sha' in results
+
+
+def test_crawl_image_without_dockerfile():
+    http = FakeHTTP({'https://hub.docker.com/api/build/v1/source/?image=user/image': (200, {'objects': []})})
+    results = asyncio.run(crawler().crawl_image_async(http, {'pk': 1, 'image_name': 'user/image'}))
+    assert results == {'pk': 1, 'imageinfo_task': True}
+
+
+def test_get_retries_rate_limited_responses():
+    url = 'https://hub.docker.com/v2/repositories/user/image/'
+    http = FakeHTTP({url: [(429, '', {'Retry-After': '0'}), (200, {'pull_count': 1})]})
+    res = asyncio.run(crawler().get(http, url))
+    assert res.status == 200
+    assert res.json() == {'pull_count': 1}
+    assert len(http.requests) == 2
+
+
+def test_get_revalidates_cached_responses(tmp_path):
+    url = 'https://hub.docker.com/v2/repositories/user/image/'
+    http = FakeHTTP({url: [(200, {'pull_count': 1}, {'ETag': '"v1"'}), (304, '', {})]})
+    crawler = AsyncDockerImageCrawler('http://webapp', cache_dir=str(tmp_path))
+
+    async def get_twice():
+        return [await crawler.get(http, url) for i in range(2)]
+    first, second = asyncio.run(get_twice())
+    assert first.json() == second.json() == {'pull_count': 1}
+    assert second.status == 200
+    assert http.requests[1][1]['If-None-Match'] == '"v1"'
+
+
+def test_incremental_tags_are_ordered():
+    routes = image_routes('user/image', 'user/repo')
+    routes[docker_image_tags_url('user/image', 1, True)] = routes.pop(docker_image_tags_url('user/image', 1))
+    crawler = AsyncDockerImageCrawler('http://webapp', incremental_tags=True)
+    results = asyncio.run(crawler.crawl_image_async(FakeHTTP(routes), {
+        'pk': 1, 'image_name': 'user/image', 'latest_tag_updated_at': '2019-02-01T00:00:00.000001Z'}))
+    assert results['tags_incremental'] and results['tags_name'] == ['latest']
+
+
+def test_crawl_stops_once_all_github_credentials_are_rejected():
+    url = 'https://api.github.com/repos/user/repo'
+    http = FakeHTTP({url: (401, {'message': 'Bad credentials'})})
+    with pytest.raises(CredentialsRejected):
+        asyncio.run(AsyncDockerImageCrawler('http://webapp', github_tokens=['a', 'b']).get(http, url, github=True))
+    assert [headers['Authorization'] for url, headers in http.requests] == ['token a', 'token b']
+
+    # Rather than failing each image in turn
+    async def crawl():
+        crawler = AsyncDockerImageCrawler('http://webapp', github_tokens=['a'])
+        queue = asyncio.Queue()
+        await queue.put({'pk': 1, 'image_name': 'user/image'})
+        await crawler.crawl_worker(FakeHTTP(dict(image_routes('user/image', 'user/repo'), **{url: (401, {})})),
+                                   queue)
+    with pytest.raises(CredentialsRejected):
+        asyncio.run(crawl())
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from credential_pool import DEFAULT_BENCH_SECONDS, DEFAULT_LIMIT, CredentialsRejected, GitHubTokenPool, load_tokens
+from rate_limiter import RateLimiter
+
+
+def pool(*tokens):
+    return GitHubTokenPool.from_tokens(list(tokens))
+
+
+def test_load_tokens(tmp_path):
+    tokens_file = tmp_path / 'tokens'
+    tokens_file.write_text('# Comment\nb\n\nc\n')
+    assert load_tokens(' a, b,,', str(tokens_file)) == ['a', 'b', 'c']
+
+
+def test_empty_pool_calls_anonymously():
+    assert pool().acquire() == None
+
+
+def test_calls_go_to_the_most_remaining_quota(clock):
+    tokens = pool('a', 'b')
+    a, b = tokens.credentials
+    tokens.update(a, 200, {'X-RateLimit-Remaining': '10', 'X-RateLimit-Reset': str(clock.now + 600)})
+    tokens.update(b, 200, {'X-RateLimit-Remaining': '12', 'X-RateLimit-Reset': str(clock.now + 600)})
+    assert [tokens.acquire().token for i in range(4)] == ['b', 'b', 'a', 'b']
+
+
+def test_rejected_credentials_are_disabled(clock):
+    tokens = pool('a', 'b')
+    a, b = tokens.credentials
+    tokens.update(a, 401, {})
+    assert a.disabled
+    assert [tokens.acquire() for i in range(3)] == [b, b, b]
+
+
+def test_pool_fails_once_all_credentials_are_rejected(clock):
+    tokens = pool('a', 'b')
+    for credential in tokens.credentials:
+        tokens.update(credential, 401, {})
+    with pytest.raises(CredentialsRejected, match='2 GitHub credentials'):
+        tokens.acquire()
+    with pytest.raises(CredentialsRejected):
+        asyncio.run(tokens.acquire_async())
+
+
+def test_exhausted_credentials_are_benched_until_the_reset(clock):
+    tokens = pool('a', 'b')
+    a, b = tokens.credentials
+    tokens.update(a, 403, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(clock.now + 30)})
+    assert a.benched_until == clock.now + 30
+    assert [tokens.acquire() for i in range(2)] == [b, b]
+    tokens.update(b, 200, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(clock.now + 60)})
+    assert tokens._take() == (None, 30)
+    # Back with a full quota after its reset
+    clock.now += 30
+    assert tokens.acquire() is a and a.remaining == DEFAULT_LIMIT - 1
+
+
+def test_credentials_are_benched_after_retry_after_or_by_default(clock):
+    tokens = pool('a', 'b')
+    a, b = tokens.credentials
+    tokens.update(a, 429, {'Retry-After': '5'})
+    tokens.update(b, 429, {})
+    assert a.benched_until == clock.now + 5
+    assert b.benched_until == clock.now + DEFAULT_BENCH_SECONDS
+
+
+def test_not_modified_github_responses_are_refunded(clock):
+    limiter = RateLimiter()
+    github = limiter.bucket('https://api.github.com/repos/user/repo', key='a')
+    docker_hub = limiter.bucket('https://hub.docker.com/v2/repositories/user/image/')
+    for bucket in [github, docker_hub]:
+        bucket._take()
+    limiter.update('https://api.github.com/repos/user/repo', 304, {}, key='a')
+    limiter.update('https://hub.docker.com/v2/repositories/user/image/', 304, {})
+    assert github.tokens == github.capacity
+    assert docker_hub.tokens == docker_hub.capacity - 1
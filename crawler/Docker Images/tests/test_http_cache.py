@@ -0,0 +1,58 @@
+from http_cache import HTTPCache
+from rate_limiter import RateLimiter
+
+
+URL = 'https://api.github.com/repos/user/repo'
+
+
+def test_store_and_load(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    cache.store(URL, {'ETag': '"v1"', 'Content-Type': 'application/json'}, '{"a": 1}')
+    entry = cache.load(URL)
+    assert entry['text'] == '{"a": 1}'
+    assert entry['headers']['etag'] == '"v1"'
+    assert cache.load(URL + '/other') is None
+
+
+def test_responses_without_validators_are_not_stored(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    cache.store(URL, {'Content-Type': 'application/json'}, '{}')
+    assert cache.load(URL) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_conditional_headers(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    assert cache.conditional_headers(None) == {}
+    cache.store(URL, {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jul 2019 00:00:00 GMT'}, '{}')
+    assert cache.conditional_headers(cache.load(URL)) == {
+        'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 01 Jul 2019 00:00:00 GMT'}
+
+
+def test_not_modified_is_served_from_the_cache_with_fresh_headers(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    cache.store(URL, {'ETag': '"v1"', 'X-RateLimit-Remaining': '10'}, '{"a": 1}')
+    response = cache.response(URL, cache.load(URL), 304, {'X-RateLimit-Remaining': '9'}, '')
+    assert response.status_code == 200
+    assert response.json() == {'a': 1}
+    assert response.headers['X-RateLimit-Remaining'] == '9'
+
+
+def test_modified_responses_replace_the_cached_ones(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    cache.store(URL, {'ETag': '"v1"'}, '{"a": 1}')
+    assert cache.response(URL, cache.load(URL), 200, {'ETag': '"v2"'}, '{"a": 2}') is None
+    assert cache.load(URL)['text'] == '{"a": 2}'
+
+
+def test_free_revalidations_give_their_token_back():
+    limiter = RateLimiter()
+    github = limiter.bucket(URL)
+    github._take()
+    limiter.update(URL, 304, {})
+    assert github.tokens == github.capacity
+    dockerhub_url = 'https://hub.docker.com/v2/repositories/user/image/'
+    dockerhub = limiter.bucket(dockerhub_url)
+    dockerhub._take()
+    limiter.update(dockerhub_url, 304, {})
+    assert dockerhub.tokens < dockerhub.capacity
@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+
+from docker_image_crawler import (TAG_PAGE_SIZE, DockerImageCrawler, docker_image_tags_url, parse_date,
+                                  parse_docker_image_tag_page)
+
+
+def test_tags_ordered_only_for_incremental_crawls():
+    assert docker_image_tags_url('user/image', 2) == (
+        'https://hub.docker.com/v2/repositories/user/image/tags/?page_size={}&page=2'.format(TAG_PAGE_SIZE))
+    assert docker_image_tags_url('user/image', 2, True) == docker_image_tags_url('user/image', 2) + '&ordering=last_updated'
+
+
+def test_parse_date():
+    assert parse_date('2019-06-20T10:00:00.123Z') == datetime(2019, 6, 20, 10, 0, 0, 123000, timezone.utc)
+    assert parse_date('2019-06-20T10:00:00.123456789Z') == datetime(2019, 6, 20, 10, 0, 0, 123456, timezone.utc)
+    assert parse_date('2019-06-20 10:00:00') == datetime(2019, 6, 20, 10, 0, 0, 0, timezone.utc)
+    assert parse_date('2019-06-20T12:30:00+02:30') == parse_date('2019-06-20T08:00:00-02:00') == datetime(
+        2019, 6, 20, 10, 0, 0, 0, timezone.utc)
+    for value in [None, '', 'yesterday', '2019-02-30T00:00:00Z', '2019-06-20T10:00:00Zjunk']:
+        assert parse_date(value) == None
+
+
+def tags(*times):
+    return {'results': [{'name': 'v%d' % i, 'full_size': i, 'last_updated': time} for i, time in enumerate(times)]}
+
+
+def test_incremental_page_stops_at_crawled_tags():
+    j = {'tags_name': [], 'image_size': [], 'image_updated_at': []}
+    # The webapp sends the time at full precision, which the first tag is newer than within the same second
+    page = tags('2019-06-20T10:00:00.500Z', None, '2019-06-20T10:00:00.123Z', '2019-01-01T00:00:00Z')
+    assert parse_docker_image_tag_page(page, j, '2019-06-20T10:00:00.123000Z')
+    assert j['tags_name'] == ['v0', 'v1']
+    # A time given with an offset is the same time
+    j = {'tags_name': [], 'image_size': [], 'image_updated_at': []}
+    assert parse_docker_image_tag_page(page, j, '2019-06-20T12:00:00.400+02:00')
+    assert j['tags_name'] == ['v0', 'v1']
+    assert not parse_docker_image_tag_page(page, j)
+    assert not parse_docker_image_tag_page(None, j, '2019-06-20T10:00:00Z')
+
+
+class FakeResponse():
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+def crawler(pages):
+    # A crawler answering the tag pages from {url: json}
+    crawler = DockerImageCrawler('http://webapp')
+    crawler.requested = []
+
+    def get(url):
+        crawler.requested.append(url)
+        return FakeResponse(pages[url])
+    crawler.get = get
+    return crawler
+
+
+def test_get_tags():
+    pages = {docker_image_tags_url('user/image', page): dict(tags('2019-01-0%dT00:00:00Z' % page), count=101)
+             for page in [1, 2]}
+    assert crawler(pages).get_docker_image_tag('user/image') == {
+        'tags_count': 101, 'tags_name': ['v0', 'v0'], 'image_size': [0, 0],
+        'image_updated_at': ['2019-01-01T00:00:00Z', '2019-01-02T00:00:00Z']}
+
+
+def test_get_tags_since():
+    pages = {docker_image_tags_url('user/image', 1, True): dict(tags('2019-06-03T00:00:00Z', '2019-06-02T00:00:00Z'),
+                                                                count=2 * TAG_PAGE_SIZE + 1),
+             docker_image_tags_url('user/image', 2, True): dict(tags('2019-06-01T12:00:00Z', '2019-06-01T00:00:00Z'),
+                                                                count=2 * TAG_PAGE_SIZE + 1)}
+    incremental = crawler(pages)
+    j = incremental.get_docker_image_tag('user/image', '2019-06-01T06:00:00Z')
+    assert j['tags_incremental'] and j['image_updated_at'] == ['2019-06-03T00:00:00Z', '2019-06-02T00:00:00Z',
+                                                               '2019-06-01T12:00:00Z']
+    # The third page is not fetched, as the second reaches the tags already crawled
+    assert incremental.requested == list(pages.keys())
@@ -0,0 +1,81 @@
+import name_crawler
+from name_crawler import MAX_COOKIE_AGE, DockerImageNameCrawler
+
+
+class FakeWebapp():
+    # The lease and post endpoints of the web application, leasing the given batches in turn
+    def __init__(self, batches):
+        self.batches = batches
+        self.posted = []
+
+    def get(self, url, params=None):
+        assert url == 'http://webapp/lease_pages/' and params == {'count': 3}
+        return FakeJSON({'pages': self.batches.pop(0) if len(self.batches) > 0 else []})
+
+    def post(self, url, json=None):
+        assert url == 'http://webapp/image_names/'
+        self.posted.append(json)
+
+
+class FakeJSON():
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+def fake_crawler(monkeypatch, batches, search_results):
+    # A crawler answering the DockerHub search from {page: json}, an exception for the pages not in it
+    webapp = FakeWebapp(batches)
+    monkeypatch.setattr(name_crawler, 'requests', webapp)
+    monkeypatch.setattr(name_crawler.time, 'sleep', lambda seconds: None)
+    refreshes = []
+
+    def refresh_cookie(self):
+        refreshes.append(self.cookie_age if hasattr(self, 'cookie_age') else None)
+        self.cookie_age = 0
+    monkeypatch.setattr(DockerImageNameCrawler, 'refresh_cookie', refresh_cookie)
+    crawler = DockerImageNameCrawler('http://webapp', lease_count=3, concurrency=2)
+    crawler.get = lambda url: search_results[int(url.rsplit('=', 1)[1])]
+    return crawler, webapp, refreshes
+
+
+def summaries(*names):
+    return {'summaries': [{'name': name} for name in names]}
+
+
+def test_batch_posts_the_names_and_empty_pages(monkeypatch):
+    batches = [[1, 2, 3], [4]]
+    crawler, webapp, refreshes = fake_crawler(monkeypatch, batches, {1: summaries('a', 'b'), 2: {}, 3: summaries(),
+                                                                     4: summaries('c')})
+    assert crawler.crawl_image_name_batch() == [1, 2, 3]
+    # Pages without results are posted as done, rather than leased again forever
+    assert webapp.posted == [{'image_list': {1: 'a', 2: 'b'}, 'pages': [1, 2, 3]}]
+    assert crawler.crawl_image_name_batch() == [4]
+    assert webapp.posted[1] == {'image_list': {76: 'c'}, 'pages': [4]}
+    assert crawler.crawl_image_name_batch() == []
+    assert crawler.cookie_age == 4 and refreshes == [None]
+
+
+def test_failed_pages_refresh_the_cookies(monkeypatch):
+    crawler, webapp, refreshes = fake_crawler(monkeypatch, [[1, 2], [2]], {1: summaries('a')})
+    crawler.crawl_image_name_batch()
+    # The failed page is not posted, and is leased again once its lease expires
+    assert webapp.posted == [{'image_list': {1: 'a'}, 'pages': [1]}]
+    assert refreshes == [None, 2] and crawler.cookie_age == 0
+    crawler.crawl_image_name_batch()
+    assert len(webapp.posted) == 1 and refreshes == [None, 2, 1]
+
+
+def test_cookies_refreshed_after_max_age(monkeypatch):
+    pages = list(range(1, MAX_COOKIE_AGE + 2))
+    batches = [pages[i:i + 3] for i in range(0, len(pages), 3)]
+    crawler, webapp, refreshes = fake_crawler(monkeypatch, batches, dict((page, summaries()) for page in pages))
+    while(len(crawler.crawl_image_name_batch()) > 0):
+        pass
+    # Once, in the batch reaching the maximum age
+    assert len(refreshes) == 2 and MAX_COOKIE_AGE <= refreshes[1] < MAX_COOKIE_AGE + 3
+    assert sum(len(posted['pages']) for posted in webapp.posted) == len(pages)
+
@@ -0,0 +1,84 @@
+import email.utils
+
+import pytest
+
+import rate_limiter
+from rate_limiter import MAX_BACKOFF, MIN_BACKOFF, RateLimiter, TokenBucket, header_number, is_rate_limited
+
+
+def test_bucket_hands_out_its_capacity_then_paces_requests(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    assert [bucket._take() for i in range(3)] == [0, 0, 0]
+    assert bucket._take() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket._take() == 0
+
+
+def test_bucket_refills_up_to_its_capacity(clock):
+    bucket = TokenBucket(rate=1.0, capacity=2)
+    bucket._take()
+    bucket._take()
+    clock.now += 100
+    assert [bucket._take() for i in range(2)] == [0, 0]
+    assert bucket._take() == pytest.approx(1.0)
+
+
+def test_bucket_spreads_the_remaining_quota_until_the_reset(clock):
+    bucket = TokenBucket(rate=1.0, capacity=10)
+    bucket.update(200, {'X-RateLimit-Remaining': '100', 'X-RateLimit-Reset': str(clock.now + 50)})
+    assert bucket.rate == pytest.approx(2.0)
+    bucket.update(200, {'X-RateLimit-Remaining': '1', 'X-RateLimit-Reset': str(clock.now + 50)})
+    assert bucket.tokens == 1
+
+
+def test_bucket_blocks_until_the_reset_when_the_quota_is_exhausted(clock):
+    bucket = TokenBucket(rate=1.0, capacity=10)
+    bucket.update(200, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(clock.now + 30)})
+    assert bucket._take() == pytest.approx(30)
+    clock.now += 30
+    assert bucket._take() == 0
+
+
+def test_bucket_backs_off_exponentially_without_retry_after(clock):
+    bucket = TokenBucket()
+    waits = []
+    for i in range(12):
+        bucket.update(429, {})
+        waits.append(bucket._take())
+        clock.now += waits[-1]
+    assert waits[:3] == [MIN_BACKOFF, MIN_BACKOFF * 2, MIN_BACKOFF * 4]
+    assert max(waits) == MAX_BACKOFF
+    bucket.update(200, {})
+    assert bucket.backoff == MIN_BACKOFF
+
+
+def test_bucket_follows_retry_after(clock):
+    bucket = TokenBucket()
+    bucket.update(429, {'Retry-After': '12'})
+    assert bucket._take() == pytest.approx(12)
+    clock.now += 12
+    bucket.update(403, {'Retry-After': email.utils.formatdate(clock.now + 60, usegmt=True)})
+    assert bucket._take() == pytest.approx(60, abs=1)
+
+
+def test_rate_limited_responses():
+    assert is_rate_limited(429, {})
+    assert is_rate_limited(403, {'X-RateLimit-Remaining': '0'})
+    assert is_rate_limited(403, {'Retry-After': '1'})
+    assert not is_rate_limited(403, {'X-RateLimit-Remaining': '10'})
+    assert not is_rate_limited(200, {'X-RateLimit-Remaining': '0'})
+
+
+def test_header_number_ignores_the_window():
+    assert header_number({'X-RateLimit-Remaining': '180;w=21600'}, 'X-RateLimit-Remaining') == 180
+    assert header_number({'X-RateLimit-Remaining': 'many'}, 'X-RateLimit-Remaining') is None
+    assert header_number({}, 'X-RateLimit-Remaining') is None
+
+
+def test_rate_limiter_has_a_bucket_per_host_and_key():
+    limiter = RateLimiter(rates={'example.com': 5.0})
+    bucket = limiter.bucket('https://example.com/a')
+    assert limiter.bucket('https://example.com/b') is bucket
+    assert limiter.bucket('https://example.com/a', key='token') is not bucket
+    assert limiter.bucket('https://api.github.com/repos').rate == rate_limiter.DEFAULT_RATES['api.github.com']
+    assert bucket.rate == 5.0
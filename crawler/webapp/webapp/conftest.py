@@ -0,0 +1,31 @@
+import os
+
+import django
+import pytest
+
+
+# Most tests only build rows and query expressions, and never connect to the database
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webapp.settings')
+django.setup()
+
+
+@pytest.fixture(scope='session')
+def test_database():
+    # A test database migrated on the PostgreSQL server of the settings, which the environment must name
+    if(os.getenv('POSTGRES_HOST') == None and not 'TRAVIS' in os.environ):
+        pytest.skip('needs a PostgreSQL server, set POSTGRES_HOST')
+    from django.test.utils import setup_databases, teardown_databases
+    old_config = setup_databases(verbosity=0, interactive=False)
+    yield
+    teardown_databases(old_config, verbosity=0)
+
+
+@pytest.fixture
+def db(test_database):
+    # The tables of dockerstudy, emptied after each test
+    from django.apps import apps
+    from django.db import connection
+    yield
+    tables = [model._meta.db_table for model in apps.get_app_config('dockerstudy').get_models()]
+    with connection.cursor() as cursor:
+        cursor.execute('TRUNCATE {} RESTART IDENTITY CASCADE'.format(', '.join(tables)))
@@ -17,94 +17,13 @@ try:
 except Exception:
     print("Admin already exists!")
 
-from dockerstudy import models
-import pandas as pd
+from django.core.management import call_command
 
 # Delete all if necessary
-try:
-    models.Page.objects.all().delete()
-    models.DockerImage.objects.all().delete()
-except:
-    print('nothing to delete')
-
-
-print('Loading the data from file...')
-
-# data_file_name = '../data/mytable.csv'
-# df=pd.DataFrame()
-# df['page']=pd.RangeIndex(1,40001)
-# df['last_sent']=pd.Series()
-# df['tag']=pd.Series()
-# print('Loading models onto the db...')
-data_file_name = '../data/tags_init.csv'
-df=pd.read_csv(data_file_name)
-# max_num_rows = min(1000, df.shape[0])
-max_num_rows = df.shape[0]
-
-print('num of rows:', max_num_rows)
-
-# all_pg = []
-# for i in range(max_num_rows):
-#     row = df.iloc[i, :]
-#     pg = models.Page()
-#     pg.page = row['page']
-#     all_pg.append(pg)
-
-all_di = []
-# for i in range(max_num_rows):
-#     row = df.iloc[i, :]
-#     di = models.DockerImageInfo()
-#     di.image_name = row['image_name']
-#     all_di.append(di)
-
-# for i in range(max_num_rows):
-#     row = df.iloc[i, :]
-#     di = models.DockerImageGitHubInfo()
-#     di.image_name = row['image_name']
-#     all_di.append(di)
-
-
-# for i in range(max_num_rows):
-#     row = df.iloc[i, :]
-#     di = models.DockerfileInfo()
-#     di.original_id = row['original_id']
-#     di.repo_name = row['repo_name']
-#     all_di.append(di)
-
-# for i in range(max_num_rows):
-#     row = df.iloc[i, :]
-#     di = models.DockerImageTags()
-#     di.original_id = row['original_id']
-#     di.image_name = row['image_name']
-#     all_di.append(di)
-
-for i in range(max_num_rows):
-    row = df.iloc[i, :]
-    di = models.DockerImagePullCounts()
-    di.original_id = row['original_id']
-    di.image_name = row['image_name']
-    all_di.append(di)
-
-
-    # if row['Id'] == 210207849:
-    #     ps = models.PythonSnippet()
-    #     ps.original_id = row['Id']
-    #     ps.post_id = row['PostId']
-    #     ps.pred_post_block_version_id = row['PredPostBlockVersionId']
-    #     ps.root_post_block_version_id = row['RootPostBlockVersionId']
-    #     ps.length = row['Length']
-    #     ps.line_count = row['LineCount']
-    #     ps.tags = row['Tags']
-    #     ps.content = row['Content']
-    #     ps.save()
-
-
-    
-    # try:
-    # ps.save()
-    # except Exception:
-    #     pass
-
-print('Bulk Saving...')
+call_command('load_table', 'Page', truncate=True)
+call_command('load_table', 'DockerImage', truncate=True)
 
-models.DockerImagePullCounts.objects.bulk_create(all_di, batch_size=999)
+# Stream the file into the db with COPY. The DockerImagePullCounts model it was loaded into no longer
+# exists, its original_id and image_name columns are those of DockerImageName.
+call_command('load_table', 'DockerImageName', '../data/tags_init.csv', columns='original_id,image_name',
+             mode='skip', key='original_id')
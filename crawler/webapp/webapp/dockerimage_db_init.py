@@ -3,6 +3,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webapp.settings')
 import django
 django.setup()
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 User = get_user_model()
 
 # Delete all if necessary
@@ -12,32 +13,6 @@ try:
 except Exception:
     print("Admin already exists!")
 
-from dockerstudy import models
-import pandas as pd
-
-# Delete all if necessary
-try:
-    print('Delete DockerImage')
-    models.DockerImage.objects.all().delete()
-except:
-    print('nothing to delete')
-
-data_file_name = '../data/docker_image_name.csv'
-print("Loading data from {} ....".format(data_file_name))
-df = pd.read_csv(data_file_name, error_bad_lines=False, warn_bad_lines=False)
-max_num_rows = df.shape[0]
-
-print('num of rows to be added:', max_num_rows)
-
-all_data = []
-
-for i in range(max_num_rows):
-    row = df.iloc[i, :]
-    image = models.DockerImage()
-    image.image_name = row['image_name']
-    all_data.append(image)
-    print(i,end='\r')
-
-print('Bulk Saving...')
-
-models.DockerImage.objects.bulk_create(all_data, batch_size=999)
+# Replace all the images with those of the file, streamed into the db with COPY
+# (see `python3 manage.py load_table --help` for loading Parquet files or skipping existing images)
+call_command('load_table', 'DockerImage', '../data/docker_image_name.csv', columns='image_name', truncate=True)
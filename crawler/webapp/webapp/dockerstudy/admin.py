@@ -10,10 +10,26 @@ class PageAdmin(admin.ModelAdmin):
     list_display = ['__str__', 'page', 'last_sent', 'tag']
 
 class DockerImageAdmin(admin.ModelAdmin):
-    list_display = ['__str__', 'image_name', 'source_repo_name', 'last_sent', 'reponame_task', 'imageinfo_task', 'latest_dockerfile', 'dockerfile_source', 'tags_count', 'tags_name', 'image_size', 'image_updated_at', 'image_pull_count', 'image_star_count', 'repo_commits_count', 'dockerfile_commit_sha', 'dockerfile_commit_date',
-                    'dockerfile_commit_message', 'language', 'forks_count', 'stargazers_count', 'watchers_count', 'repo_size', 'default_branch', 'open_issues_count', 'topics', 'has_issues', 'has_projects', 'has_wiki', 'has_pages', 'has_downloads', 'archived', 'pushed_at', 'created_at', 'updated_at', 'subscribers_count', 'network_count', 'license', 'image_description']
+    # Slim columns, without the Dockerfiles and descriptions, and no COUNT(*) of the whole table on each page
+    list_display = ['__str__', 'image_name', 'source_repo_name', 'status', 'dockerfile_source', 'tags_count', 'image_pull_count', 'image_star_count', 'crawled_at']
+    show_full_result_count = False
+    raw_id_fields = ['dockerfile']
+
+class DockerfileAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'sha256']
+
+class ImageTagAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'image', 'name', 'full_size', 'last_updated']
+    raw_id_fields = ['image']
+
+class DockerfileCommitAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'image', 'sha', 'date', 'message']
+    raw_id_fields = ['image']
 
 
 admin.site.register(models.DockerImageName, DockerImageNameAdmin)
 admin.site.register(models.Page, PageAdmin)
-admin.site.register(models.DockerImage, DockerImageAdmin)
\ No newline at end of file
+admin.site.register(models.DockerImage, DockerImageAdmin)
+admin.site.register(models.Dockerfile, DockerfileAdmin)
+admin.site.register(models.ImageTag, ImageTagAdmin)
+admin.site.register(models.DockerfileCommit, DockerfileCommitAdmin)
@@ -0,0 +1,60 @@
+import hashlib
+
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Dockerfile
+
+
+BULK_CREATE_BATCH_SIZE = 1000
+
+
+def dockerfile_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+# Store each distinct content once, with the models of apps, and return {sha256: Dockerfile id}.
+# Call it in a transaction.
+def store_dockerfiles(contents, apps=django_apps):
+    Dockerfile = apps.get_model('dockerstudy', 'Dockerfile')
+    contents = dict((dockerfile_hash(content), content) for content in contents if isinstance(content, str))
+    if(len(contents) == 0):
+        return {}
+    # Contents already stored, e.g. by another image built from the same Dockerfile, are skipped
+    Dockerfile.objects.bulk_create([Dockerfile(sha256=sha256, content=content) for sha256, content in contents.items()],
+                                   batch_size=BULK_CREATE_BATCH_SIZE, ignore_conflicts=True)
+    return dict(Dockerfile.objects.filter(sha256__in=list(contents.keys())).values_list('sha256', 'id'))
+
+
+# Replace the latest_dockerfile of crawled results by a reference to its Dockerfile row,
+# so that DockerImage does not store its own copy. Call it in a transaction.
+def with_dockerfiles(results):
+    ids = store_dockerfiles(result.get('latest_dockerfile') for result in results)
+    stored = []
+    for result in results:
+        if('latest_dockerfile' in result):
+            content = result['latest_dockerfile']
+            dockerfile_id = ids[dockerfile_hash(content)] if isinstance(content, str) else None
+            result = dict(result, latest_dockerfile=None,
+                          dockerfile=Dockerfile(id=dockerfile_id) if dockerfile_id != None else None)
+        stored.append(result)
+    return stored
+
+
+# Move the latest_dockerfile of DockerImage rows into Dockerfile by id ranges, with the models of apps (the
+# historical models in a migration), yielding the number of images moved so far after each range
+def move_dockerfiles(apps=django_apps, batch_size=10000):
+    DockerImage = apps.get_model('dockerstudy', 'DockerImage')
+    max_id = DockerImage.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    images = DockerImage.objects.filter(latest_dockerfile__isnull=False)
+    moved = 0
+    for start in range(0, max_id + 1, batch_size):
+        with transaction.atomic():
+            rows = list(images.filter(id__gte=start, id__lt=start + batch_size).values_list('id', 'latest_dockerfile'))
+            ids = store_dockerfiles((content for pk, content in rows), apps)
+            updated = [DockerImage(id=pk, dockerfile_id=ids[dockerfile_hash(content)], latest_dockerfile=None)
+                       for pk, content in rows]
+            DockerImage.objects.bulk_update(updated, ['dockerfile', 'latest_dockerfile'], batch_size=1000)
+        moved += len(rows)
+        yield moved
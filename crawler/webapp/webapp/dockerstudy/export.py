@@ -0,0 +1,189 @@
+import csv
+import gzip
+import io
+
+from django.db import models
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import DockerImage
+
+
+# Columns of docker_image_dataset.csv, as described in the README
+DATASET_COLUMNS = [
+    'image_name', 'source_repo_name', 'latest_dockerfile', 'tags_count', 'tags_name', 'image_size',
+    'image_updated_at', 'image_pull_count', 'image_star_count', 'image_description', 'repo_commits_count',
+    'dockerfile_commit_sha', 'dockerfile_commit_date', 'dockerfile_commit_message', 'language', 'forks_count',
+    'stargazers_count', 'watchers_count', 'repo_size', 'default_branch', 'open_issues_count', 'has_issues',
+    'has_projects', 'has_wiki', 'has_pages', 'has_downloads', 'archived', 'pushed_at', 'created_at', 'updated_at',
+    'subscribers_count', 'network_count', 'license', 'collection_method',
+]
+FORMATS = ['csv.gz', 'parquet']
+EXPORT_CHUNK_SIZE = 10000
+# collection_method of the images matching each condition, in order, null otherwise (NA in CSV files). The source repo
+# names are only those of GitHub, so Dockerfiles fetched from DockerHub come from Bitbucket for images
+# without one, and from GitHub for images whose Dockerfile could not be fetched from their GitHub repo.
+COLLECTION_METHODS = [
+    (Q(dockerfile_source='GitHub'), 'GitHubCI'),
+    (Q(dockerfile_source='DockerHub', source_repo_name__isnull=False), 'GitHubCI'),
+    (Q(dockerfile_source='DockerHub'), 'BitbucketCI'),
+    (Q(dockerfile_source='NameMatch'), 'NameMatch'),
+]
+# Exported columns read from the Dockerfile table, where crawled Dockerfiles are stored once per content.
+# dockerfile_sha256 is not in the published dataset, but can be exported to process each Dockerfile once.
+DOCKERFILE_COLUMNS = {
+    'latest_dockerfile': lambda: Coalesce(F('dockerfile__content'), F('latest_dockerfile')),
+    'dockerfile_sha256': lambda: F('dockerfile__sha256'),
+}
+# Booleans crawled from GitHub, stored as text
+BOOLEAN_TEXT_COLUMNS = ['has_issues', 'has_projects', 'has_wiki', 'has_pages', 'has_downloads', 'archived']
+
+
+def dataset_rows(columns, chunk_size):
+    collection_method = Case(
+        *[When(condition, then=Value(method)) for condition, method in COLLECTION_METHODS],
+        default=None, output_field=models.CharField())
+    queryset = DockerImage.objects.annotate(collection_method=collection_method).order_by('id')
+    fields = [DOCKERFILE_COLUMNS[column]() if column in DOCKERFILE_COLUMNS else column for column in columns]
+    # A server-side cursor, so that only one chunk of rows is in memory at a time
+    return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def parquet_schema(columns):
+    import pyarrow as pa
+    types = {
+        models.IntegerField: pa.int64(),
+        models.FloatField: pa.float64(),
+        models.BooleanField: pa.bool_(),
+        models.DateTimeField: pa.timestamp('us', tz='UTC'),
+    }
+    fields = []
+    for column in columns:
+        field_type = pa.string()
+        if(column in BOOLEAN_TEXT_COLUMNS):
+            field_type = pa.bool_()
+        elif(column != 'collection_method' and column not in DOCKERFILE_COLUMNS):
+            for model_field, arrow_type in types.items():
+                if(isinstance(DockerImage._meta.get_field(column), model_field)):
+                    field_type = arrow_type
+        fields.append(pa.field(column, field_type))
+    return pa.schema(fields)
+
+
+def parse_boolean_text(value):
+    if(value == None):
+        return None
+    return value.lower() == 'true'
+
+
+def export_csv(fileobj, columns, chunk_size):
+    with io.TextIOWrapper(gzip.GzipFile(fileobj=fileobj, mode='wb'), encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        # The published dataset spells a missing collection method NA
+        collection_method = columns.index('collection_method') if 'collection_method' in columns else None
+        for i, row in enumerate(dataset_rows(columns, chunk_size)):
+            if(collection_method != None and row[collection_method] == None):
+                row = row[:collection_method] + ('NA',) + row[collection_method + 1:]
+            writer.writerow(row)
+            if((i + 1) % chunk_size == 0):
+                f.flush()
+                yield i + 1
+
+
+def export_parquet(fileobj, columns, chunk_size):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = parquet_schema(columns)
+    boolean_columns = [i for i, column in enumerate(columns) if column in BOOLEAN_TEXT_COLUMNS]
+    writer = pq.ParquetWriter(pa.PythonFile(fileobj, mode='w'), schema)
+    rows = []
+    count = 0
+    # One row group per chunk
+    for row in dataset_rows(columns, chunk_size):
+        rows.append(row)
+        if(len(rows) == chunk_size):
+            count += len(rows)
+            writer.write_table(parquet_table(rows, schema, boolean_columns))
+            rows = []
+            yield count
+    if(len(rows) > 0):
+        writer.write_table(parquet_table(rows, schema, boolean_columns))
+    writer.close()
+
+
+def parquet_table(rows, schema, boolean_columns):
+    import pyarrow as pa
+    arrays = []
+    for i, column in enumerate(zip(*rows)):
+        if(i in boolean_columns):
+            column = [parse_boolean_text(value) for value in column]
+        arrays.append(pa.array(column, type=schema.field(i).type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+# Write the dataset to fileobj chunk by chunk, yielding the number of rows written after each
+def export_dataset(fileobj, format='csv.gz', columns=None, chunk_size=EXPORT_CHUNK_SIZE):
+    columns = columns or DATASET_COLUMNS
+    if(format not in FORMATS):
+        raise ValueError('Unknown format {}'.format(format))
+    for column in columns:
+        if(column != 'collection_method' and column not in DOCKERFILE_COLUMNS):
+            DockerImage._meta.get_field(column)
+    if(format == 'parquet'):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError('pyarrow is required to export Parquet files')
+        return export_parquet(fileobj, columns, chunk_size)
+    return export_csv(fileobj, columns, chunk_size)
+
+
+# Write-only file handing out the bytes written to it, for streaming responses
+class StreamBuffer():
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def readable(self):
+        return False
+
+    # Return and forget the bytes written since the last call
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+# Return an iterator over the bytes of the exported dataset. Invalid arguments raise right away.
+def stream_dataset(format='csv.gz', columns=None, chunk_size=EXPORT_CHUNK_SIZE):
+    buffer = StreamBuffer()
+    return drain(buffer, export_dataset(buffer, format, columns, chunk_size))
+
+
+def drain(buffer, export):
+    for count in export:
+        yield buffer.pop()
+    yield buffer.pop()
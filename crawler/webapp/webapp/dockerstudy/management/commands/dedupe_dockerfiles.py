@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from dockerstudy.dockerfiles import move_dockerfiles
+from dockerstudy.models import Dockerfile
+
+
+class Command(BaseCommand):
+    help = ('Move the latest_dockerfile of DockerImage rows into the Dockerfile table, storing each distinct '
+            'Dockerfile once, e.g. after loading the published dataset')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        moved = 0
+        for moved in move_dockerfiles(batch_size=options['batch_size']):
+            self.stdout.write('{} Dockerfiles moved'.format(moved), ending='\r')
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('Moved the Dockerfiles of {} images, {} distinct Dockerfiles stored'.format(
+            moved, Dockerfile.objects.count())))
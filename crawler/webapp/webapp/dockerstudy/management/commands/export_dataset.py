@@ -0,0 +1,29 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+
+from dockerstudy.export import EXPORT_CHUNK_SIZE, FORMATS, export_dataset
+
+
+class Command(BaseCommand):
+    help = 'Export the DockerImage table as docker_image_dataset.csv.gz or a Parquet file, in constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='e.g. docker_image_dataset.csv.gz or docker_image_dataset.parquet')
+        parser.add_argument('--format', choices=FORMATS, help='guessed from the path by default')
+        parser.add_argument('--columns', help='comma separated columns, those of the published dataset by default')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or ('parquet' if path.endswith('.parquet') else 'csv.gz')
+        columns = options['columns'].split(',') if options['columns'] else None
+        with open(path, 'wb') as f:
+            try:
+                export = export_dataset(f, format, columns, options['chunk_size'])
+            except (ValueError, FieldDoesNotExist) as e:
+                raise CommandError(e)
+            count = 0
+            for count in export:
+                self.stdout.write('{} rows exported'.format(count), ending='\r')
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('Exported the dataset to {}'.format(path)))
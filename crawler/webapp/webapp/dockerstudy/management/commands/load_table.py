@@ -0,0 +1,128 @@
+import io
+import time
+
+import pandas as pd
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+
+
+MODES = ['insert', 'skip', 'upsert']
+
+
+def read_chunks(path, columns, chunk_size):
+    if(path.endswith('.parquet')):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise CommandError('pyarrow is required to load Parquet files')
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+        return
+    try:  # Skip malformed lines, as the crawled CSV files contain a few
+        reader = pd.read_csv(path, usecols=columns, chunksize=chunk_size, on_bad_lines='skip')
+    except TypeError:  # pandas < 1.3
+        reader = pd.read_csv(path, usecols=columns, chunksize=chunk_size, error_bad_lines=False,
+                             warn_bad_lines=False)
+    for chunk in reader:
+        yield chunk
+
+
+# Django defaults are not database defaults, so add the defaults of the required columns missing from the file
+def with_defaults(df, model):
+    for field in model._meta.concrete_fields:
+        if(field.primary_key or field.column in df.columns or field.null or not field.has_default()):
+            continue
+        df[field.column] = field.get_default()
+    for field in model._meta.concrete_fields:
+        # Integer columns with missing values are read as floats
+        if(isinstance(field, models.IntegerField) and field.column in df.columns and df[field.column].dtype.kind == 'f'):
+            df[field.column] = df[field.column].astype('Int64')
+    return df
+
+
+def copy_chunk(cursor, table, df):
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor.copy_expert('COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+        table, ', '.join(connection.ops.quote_name(column) for column in df.columns)), buffer)
+
+
+# Insert the rows of a chunk, skipping or updating the rows whose key already exists
+def merge_chunk(cursor, table, df, key, mode):
+    qn = connection.ops.quote_name
+    columns = [qn(column) for column in df.columns]
+    cursor.execute('CREATE TEMP TABLE load_table_chunk ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA'.format(
+        ', '.join(columns), table))
+    copy_chunk(cursor, 'load_table_chunk', df)
+    assignments = ['{0} = s.{0}'.format(column) for column in columns if column != qn(key)]
+    if(mode == 'upsert' and len(assignments) > 0):
+        cursor.execute('UPDATE {table} t SET {assignments} FROM load_table_chunk s WHERE t.{key} = s.{key}'.format(
+            table=table, key=qn(key), assignments=', '.join(assignments)))
+    cursor.execute(
+        'INSERT INTO {table} ({columns}) SELECT DISTINCT ON (s.{key}) {source_columns} FROM load_table_chunk s '
+        'WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE t.{key} = s.{key})'.format(
+            table=table, key=qn(key), columns=', '.join(columns),
+            source_columns=', '.join('s.' + column for column in columns)))
+
+
+class Command(BaseCommand):
+    help = ('Stream a CSV or Parquet file into a table of the dockerstudy app with COPY, chunk by chunk, '
+            'or create the pages of the DockerHub search results with --pages')
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='e.g. DockerImage, DockerImageName or Page')
+        parser.add_argument('path', nargs='?', help='a .csv or .parquet file')
+        parser.add_argument('--columns', help='comma separated columns of the file to load, all by default')
+        parser.add_argument('--chunk-size', type=int, default=100000)
+        parser.add_argument('--mode', choices=MODES, default='insert',
+                            help='insert all rows, skip the rows whose key exists, or update them (upsert)')
+        parser.add_argument('--key', help='column identifying a row, for the skip and upsert modes')
+        parser.add_argument('--truncate', action='store_true', help='delete all the rows of the table first')
+        parser.add_argument('--pages', type=int, help='create pages 1 to PAGES instead of loading a file')
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model('dockerstudy', options['model'])
+        except LookupError as e:
+            raise CommandError(e)
+        table = connection.ops.quote_name(model._meta.db_table)
+        if(options['mode'] != 'insert' and not options['key']):
+            raise CommandError('--key is required with --mode {}'.format(options['mode']))
+        if(options['truncate']):
+            with connection.cursor() as cursor:
+                cursor.execute('TRUNCATE {} RESTART IDENTITY CASCADE'.format(table))
+        if(options['pages']):
+            self.create_pages(model, table, options['pages'])
+        elif(options['path']):
+            columns = options['columns'].split(',') if options['columns'] else None
+            self.load(model, table, options['path'], columns, options['chunk_size'], options['mode'], options['key'])
+        elif(not options['truncate']):
+            raise CommandError('Give a file to load, or --pages')
+
+    def create_pages(self, model, table, pages):
+        if(model._meta.model_name != 'page'):
+            raise CommandError('--pages only applies to Page')
+        with connection.cursor() as cursor:
+            cursor.execute('INSERT INTO {} (page) SELECT generate_series(1, %s) ON CONFLICT (page) DO NOTHING'.format(
+                table), [pages])
+            created = cursor.rowcount
+        self.stdout.write(self.style.SUCCESS('Created {} pages'.format(created)))
+
+    def load(self, model, table, path, columns, chunk_size, mode, key):
+        loaded = 0
+        start = time.time()
+        for chunk in read_chunks(path, columns, chunk_size):
+            chunk = with_defaults(chunk, model)
+            # One transaction per chunk, so that an interrupted load can be resumed with --mode skip
+            with transaction.atomic(), connection.cursor() as cursor:
+                if(mode == 'insert'):
+                    copy_chunk(cursor, table, chunk)
+                else:
+                    merge_chunk(cursor, table, chunk, key, mode)
+            loaded += len(chunk)
+            self.stdout.write('{} rows loaded ({:.0f} rows/s)'.format(loaded, loaded / max(time.time() - start, 1e-6)),
+                              ending='\r')
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('Loaded {} rows from {} into {}'.format(loaded, path, table)))
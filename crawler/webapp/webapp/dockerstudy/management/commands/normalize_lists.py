@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from dockerstudy.normalize import normalize_stored_lists
+
+
+class Command(BaseCommand):
+    help = ('Fill the ImageTag and DockerfileCommit tables from the stringified lists of DockerImage, '
+            'e.g. after loading the published dataset')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        normalized = 0
+        for normalized in normalize_stored_lists(batch_size=options['batch_size']):
+            self.stdout.write('{} images normalized'.format(normalized), ending='\r')
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('Normalized the tags and Dockerfile commits of {} images'.format(normalized)))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+from dockerstudy.models import DockerImage, STATUS_DONE
+
+
+# refresh_priority = staleness * popularity * (change rate + activity), where
+#   staleness:   days since the image was last crawled
+#   popularity:  1 + ln(1 + pull count)
+#   change rate: share of the crawls which found a change, smoothed for images crawled only a few times
+#   activity:    1 / (1 + days since the latest tag push or GitHub push)
+# Images crawled before the crawl stats existed fall back to last_sent, or are considered a year old.
+SCORE_SQL = '''
+UPDATE {table} SET refresh_priority =
+    GREATEST(EXTRACT(EPOCH FROM (%(now)s - COALESCE(crawled_at, last_sent, %(now)s - INTERVAL '365 days'))) / 86400.0, 0)
+    * (1 + LN(1 + GREATEST(COALESCE(image_pull_count, 0), 0)))
+    * ((change_count + 1.0) / (crawl_count + 2.0)
+       + COALESCE(1.0 / (1 + GREATEST(EXTRACT(EPOCH FROM (%(now)s - GREATEST(latest_tag_updated_at, pushed_at))) / 86400.0, 0)), 0))
+WHERE status = %(status)s AND id >= %(start)s AND id < %(end)s
+'''
+
+
+class Command(BaseCommand):
+    help = 'Score the refresh priority of the crawled images, which orders the refresh task queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        max_id = DockerImage.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        sql = SCORE_SQL.format(table=connection.ops.quote_name(DockerImage._meta.db_table))
+        now = timezone.now()
+        updated = 0
+        # Update in id ranges to keep each transaction short on large tables
+        for start in range(0, max_id + 1, batch_size):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, {'now': now, 'status': STATUS_DONE, 'start': start, 'end': start + batch_size})
+                updated += cursor.rowcount
+            self.stdout.write('{} images scored'.format(updated), ending='\r')
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('Scored the refresh priority of {} images'.format(updated)))
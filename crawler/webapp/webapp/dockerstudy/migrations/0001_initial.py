@@ -0,0 +1,75 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DockerImage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_name', models.CharField(max_length=2048)),
+                ('source_repo_name', models.CharField(blank=True, max_length=2048, null=True)),
+                ('last_sent', models.DateTimeField(blank=True, default=None, null=True)),
+                ('reponame_task', models.BooleanField(default=False)),
+                ('imageinfo_task', models.BooleanField(default=False)),
+                ('latest_dockerfile', models.TextField(blank=True, null=True)),
+                ('dockerfile_source', models.TextField(blank=True, null=True)),
+                ('tags_count', models.IntegerField(blank=True, null=True)),
+                ('tags_name', models.TextField(blank=True, null=True)),
+                ('image_size', models.TextField(blank=True, null=True)),
+                ('image_updated_at', models.TextField(blank=True, default=None, null=True)),
+                ('image_pull_count', models.IntegerField(blank=True, null=True)),
+                ('image_star_count', models.IntegerField(blank=True, null=True)),
+                ('repo_commits_count', models.IntegerField(blank=True, null=True)),
+                ('dockerfile_commit_sha', models.TextField(blank=True, null=True)),
+                ('dockerfile_commit_date', models.TextField(blank=True, null=True)),
+                ('dockerfile_commit_message', models.TextField(blank=True, null=True)),
+                ('language', models.TextField(blank=True, null=True)),
+                ('forks_count', models.IntegerField(blank=True, null=True)),
+                ('stargazers_count', models.IntegerField(blank=True, null=True)),
+                ('watchers_count', models.IntegerField(blank=True, null=True)),
+                ('repo_size', models.IntegerField(blank=True, null=True)),
+                ('default_branch', models.TextField(blank=True, null=True)),
+                ('open_issues_count', models.IntegerField(blank=True, null=True)),
+                ('topics', models.TextField(blank=True, null=True)),
+                ('has_issues', models.TextField(blank=True, null=True)),
+                ('has_projects', models.TextField(blank=True, null=True)),
+                ('has_wiki', models.TextField(blank=True, null=True)),
+                ('has_pages', models.TextField(blank=True, null=True)),
+                ('has_downloads', models.TextField(blank=True, null=True)),
+                ('archived', models.TextField(blank=True, null=True)),
+                ('pushed_at', models.DateTimeField(blank=True, default=None, null=True)),
+                ('created_at', models.DateTimeField(blank=True, default=None, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, default=None, null=True)),
+                ('subscribers_count', models.IntegerField(blank=True, null=True)),
+                ('network_count', models.IntegerField(blank=True, null=True)),
+                ('license', models.TextField(blank=True, null=True)),
+                ('image_description', models.TextField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DockerImageName',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.IntegerField()),
+                ('image_name', models.CharField(max_length=2048)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Page',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page', models.IntegerField(unique=True)),
+                ('last_sent', models.DateTimeField(blank=True, default=None, null=True)),
+                ('tag', models.TextField(blank=True, null=True)),
+            ],
+        ),
+    ]
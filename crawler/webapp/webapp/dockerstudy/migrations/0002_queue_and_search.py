@@ -0,0 +1,162 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:43
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dockerstudy', '0001_initial'),
+    ]
+
+    operations = [
+        # pg_trgm provides the gin_trgm_ops of the name search indexes created below
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='Dockerfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('content', models.TextField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DockerfileCommit',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha', models.CharField(max_length=40)),
+                ('date', models.DateTimeField(blank=True, default=None, null=True)),
+                ('message', models.TextField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ImageTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.TextField()),
+                ('full_size', models.BigIntegerField(blank=True, null=True)),
+                ('last_updated', models.DateTimeField(blank=True, default=None, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='dockerimage',
+            name='attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dockerimage',
+            name='change_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dockerimage',
+            name='crawl_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dockerimage',
+            name='crawled_at',
+            field=models.DateTimeField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='dockerimage',
+            name='latest_tag_updated_at',
+            field=models.DateTimeField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='dockerimage',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='dockerimage',
+            name='leased_by',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='dockerimage',
+            name='refresh_priority',
+            field=models.FloatField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='dockerimage',
+            name='status',
+            field=models.CharField(choices=[('new', 'New'), ('reponame_done', 'Source repo name crawled'), ('done', 'Image info crawled'), ('failed', 'Failed')], default='new', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, default=None, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='dockerimage',
+            index=models.Index(condition=models.Q(('status', 'new')), fields=['id'], name='dockerimage_reponame_queue'),
+        ),
+        migrations.AddIndex(
+            model_name='dockerimage',
+            index=models.Index(condition=models.Q(('source_repo_name__isnull', False), ('status__in', ['new', 'reponame_done'])), fields=['id'], name='dockerimage_imageinfo_queue'),
+        ),
+        migrations.AddIndex(
+            model_name='dockerimage',
+            index=models.Index(condition=models.Q(('status__in', ['new', 'reponame_done'])), fields=['id'], name='dockerimage_allimageinfo_queue'),
+        ),
+        migrations.AddIndex(
+            model_name='dockerimage',
+            index=models.Index(condition=models.Q(('refresh_priority__isnull', False), ('status', 'done')), fields=['-refresh_priority', 'id'], name='dockerimage_refresh_queue'),
+        ),
+        migrations.AddIndex(
+            model_name='dockerimage',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('image_description', config='english'), name='dockerimage_description_search'),
+        ),
+        migrations.AddIndex(
+            model_name='dockerimage',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['image_name'], name='dockerimage_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dockerimage',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['source_repo_name'], name='dockerimage_repo_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(condition=models.Q(('tag__isnull', True)), fields=['page'], name='page_queue'),
+        ),
+        migrations.AddField(
+            model_name='imagetag',
+            name='image',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to='dockerstudy.dockerimage'),
+        ),
+        migrations.AddField(
+            model_name='dockerfilecommit',
+            name='image',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dockerfile_commits', to='dockerstudy.dockerimage'),
+        ),
+        migrations.AddIndex(
+            model_name='dockerfile',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('content', config='simple'), name='dockerfile_content_search'),
+        ),
+        migrations.AddField(
+            model_name='dockerimage',
+            name='dockerfile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='images', to='dockerstudy.dockerfile'),
+        ),
+        migrations.AddIndex(
+            model_name='imagetag',
+            index=models.Index(fields=['last_updated'], name='imagetag_last_updated'),
+        ),
+        migrations.AddConstraint(
+            model_name='imagetag',
+            constraint=models.UniqueConstraint(fields=('image', 'name'), name='imagetag_image_name'),
+        ),
+        migrations.AddIndex(
+            model_name='dockerfilecommit',
+            index=models.Index(fields=['image', 'date'], name='dockerfilecommit_image_date'),
+        ),
+        migrations.AddIndex(
+            model_name='dockerfilecommit',
+            index=models.Index(fields=['sha'], name='dockerfilecommit_sha'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+from django.db.models import Case, Max, Value, When
+
+
+BATCH_SIZE = 50000
+
+
+# Derive the queue status of the images crawled before 0002 from their reponame_task and imageinfo_task flags
+def backfill_queue_state(apps, schema_editor):
+    DockerImage = apps.get_model('dockerstudy', 'DockerImage')
+    max_id = DockerImage.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    status = Case(
+        When(imageinfo_task=True, then=Value('done')),
+        When(reponame_task=True, then=Value('reponame_done')),
+        default=Value('new'),
+    )
+    # Update in id ranges to keep each transaction short on large tables
+    for start in range(0, max_id + 1, BATCH_SIZE):
+        DockerImage.objects.filter(id__gte=start, id__lt=start + BATCH_SIZE).update(status=status)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('dockerstudy', '0002_queue_and_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_queue_state, migrations.RunPython.noop),
+    ]
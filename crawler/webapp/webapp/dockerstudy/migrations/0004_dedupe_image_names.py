@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+# Delete the duplicate image names posted by earlier versions of the name crawler, keeping the first one of each
+# original_id, before original_id becomes unique
+def dedupe_image_names(apps, schema_editor):
+    table = schema_editor.quote_name(apps.get_model('dockerstudy', 'DockerImageName')._meta.db_table)
+    schema_editor.execute(
+        'DELETE FROM {table} a USING {table} b WHERE a.original_id = b.original_id AND a.id > b.id'.format(table=table))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dockerstudy', '0003_backfill_queue_state'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_image_names, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='dockerimagename',
+            name='original_id',
+            field=models.IntegerField(unique=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from dockerstudy.normalize import normalize_stored_lists
+
+
+# Fill ImageTag and DockerfileCommit from the stringified lists of the images crawled before 0002
+def normalize_lists(apps, schema_editor):
+    for normalized in normalize_stored_lists(apps):
+        pass
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('dockerstudy', '0004_dedupe_image_names'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_lists, migrations.RunPython.noop),
+    ]
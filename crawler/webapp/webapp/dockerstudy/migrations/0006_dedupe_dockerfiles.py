@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from dockerstudy.dockerfiles import move_dockerfiles
+
+
+# Store the Dockerfiles of the images crawled before 0002 once per content in Dockerfile
+def dedupe_dockerfiles(apps, schema_editor):
+    for moved in move_dockerfiles(apps):
+        pass
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('dockerstudy', '0005_normalize_lists'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_dockerfiles, migrations.RunPython.noop),
+    ]
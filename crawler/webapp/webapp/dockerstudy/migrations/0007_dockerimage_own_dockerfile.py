@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dockerstudy', '0006_dedupe_dockerfiles'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dockerimage',
+            index=models.Index(condition=models.Q(('latest_dockerfile__isnull', False)), fields=['id'], name='dockerimage_own_dockerfile'),
+        ),
+    ]
@@ -1,11 +1,59 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import connections, models, transaction
+from django.db.models import Q
 from django.utils import timezone
 from postgres_copy import CopyManager
 
 
+# Queue status of a DockerImage
+STATUS_NEW = 'new'
+STATUS_REPONAME_DONE = 'reponame_done'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_CHOICES = (
+    (STATUS_NEW, 'New'),
+    (STATUS_REPONAME_DONE, 'Source repo name crawled'),
+    (STATUS_DONE, 'Image info crawled'),
+    (STATUS_FAILED, 'Failed'),
+)
+PENDING_STATUSES = [STATUS_NEW, STATUS_REPONAME_DONE]
+# An image leased this many times without a result is marked as failed, or leaves the refresh queue if crawled
+MAX_ATTEMPTS = 5
+
+# Images still to be processed by each crawler task.
+# Each condition has a matching partial index on DockerImage.
+TASK_QUEUES = {
+    'reponame': Q(status=STATUS_NEW),
+    'imageinfo': Q(status__in=PENDING_STATUSES, source_repo_name__isnull=False),
+    'allimageinfo': Q(status__in=PENDING_STATUSES),
+    # Crawled images, recrawled by descending refresh_priority (see the score_refresh_priority command)
+    'refresh': Q(status=STATUS_DONE, refresh_priority__isnull=False),
+}
+# Pages of the DockerHub search results not crawled yet
+PAGE_QUEUE = Q(tag__isnull=True)
+# Order in which the images of each task are leased, 'id' by default
+TASK_ORDERING = {
+    'refresh': ['-refresh_priority', 'id'],
+}
+# Text search configurations of the full-text indexes, which searches must use to be served by them.
+# Dockerfiles are not stemmed, so that e.g. package names are matched as written.
+DOCKERFILE_SEARCH_CONFIG = 'simple'
+DESCRIPTION_SEARCH_CONFIG = 'english'
+
+
+def dockerfile_search_vector():
+    return SearchVector('content', config=DOCKERFILE_SEARCH_CONFIG)
+
+
+def description_search_vector():
+    return SearchVector('image_description', config=DESCRIPTION_SEARCH_CONFIG)
+
+
 # Create your models here.
 class DockerImageName(models.Model):
-    original_id = models.IntegerField(blank=False, null=False, unique=False)
+    # Unique, so that posting the names of a page twice is harmless (see the 0004_dedupe_image_names migration)
+    original_id = models.IntegerField(blank=False, null=False, unique=True)
     image_name = models.CharField(max_length=2048, blank=False, null=False)
 
     objects = CopyManager()
@@ -24,11 +72,43 @@ class DockerImageName(models.Model):
         }
 
 
+class PageManager(CopyManager):
+
+    # Lease up to count pages not crawled yet, see DockerImageManager.lease
+    def lease(self, count=1, lease_time=timezone.timedelta(minutes=2)):
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        now = timezone.now()
+        lease_expires_at = now + lease_time
+        candidates = self.lease_candidates(now).values('id')[:count]
+        with transaction.atomic(using=self.db):
+            candidates_sql, candidates_params = candidates.query.get_compiler(using=self.db).as_sql()
+            sql = ('UPDATE {table} SET last_sent = %s, lease_expires_at = %s '
+                   'WHERE id IN ({candidates}) RETURNING id, page').format(table=table, candidates=candidates_sql)
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [now, lease_expires_at] + list(candidates_params))
+                rows = cursor.fetchall()
+        return [self.model(id=row[0], page=row[1], last_sent=now, lease_expires_at=lease_expires_at)
+                for row in sorted(rows, key=lambda row: row[1])]
+
+    def lease_candidates(self, now):
+        # Pages not crawled nor leased at now, in lease order, locked when selected (served by the page_queue index)
+        candidates = self.filter(PAGE_QUEUE).filter(Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now))
+        return candidates.select_for_update(
+            skip_locked=connections[self.db].features.has_select_for_update_skip_locked).order_by('page')
+
+
 class Page(models.Model):
     page = models.IntegerField(blank=False, null=False, unique=True)
     last_sent = models.DateTimeField(default=None, blank=True, null=True)
+    lease_expires_at = models.DateTimeField(default=None, blank=True, null=True)
     tag = models.TextField(blank=True, null=True)
-    objects = CopyManager()
+    objects = PageManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['page'], name='page_queue', condition=PAGE_QUEUE),
+        ]
 
     def __unicode__(self):
         return '{} - {}'.format(self.id, self.page)
@@ -45,16 +125,89 @@ class Page(models.Model):
         return {
             'page': self.page,
             'last_sent': self.last_sent,
+            'lease_expires_at': self.lease_expires_at,
             'tag': self.tag
         }
 
+# One row per distinct Dockerfile, shared by the DockerImages using it (see dockerstudy.dockerfiles)
+class Dockerfile(models.Model):
+    sha256 = models.CharField(max_length=64, unique=True)
+    content = models.TextField()
+
+    class Meta:
+        indexes = [
+            GinIndex(dockerfile_search_vector(), name='dockerfile_content_search'),
+        ]
+
+    def __str__(self):
+        return self.sha256
+
+
+class DockerImageManager(CopyManager):
+
+    # Lease up to count images of task to worker in one statement, SKIP LOCKED keeping concurrent callers apart.
+    # Images leased more than MAX_ATTEMPTS times fail, or leave the refresh queue if crawled
+    def lease(self, task, count=1, worker=None, lease_time=timezone.timedelta(minutes=2)):
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        now = timezone.now()
+        lease_expires_at = now + lease_time
+        candidates = self.lease_candidates(task, now).values('id')[:count]
+        if(task == 'refresh'):
+            give_up = ('attempts = CASE WHEN attempts >= %s THEN 0 ELSE attempts + 1 END, '
+                       'refresh_priority = CASE WHEN attempts >= %s THEN NULL ELSE refresh_priority END')
+            give_up_params = [MAX_ATTEMPTS, MAX_ATTEMPTS]
+        else:
+            give_up = 'attempts = attempts + 1, status = CASE WHEN attempts >= %s THEN %s ELSE status END'
+            give_up_params = [MAX_ATTEMPTS, STATUS_FAILED]
+        while True:
+            with transaction.atomic(using=self.db):
+                candidates_sql, candidates_params = candidates.query.get_compiler(using=self.db).as_sql()
+                # The last column tells the images given up: failed, or out of the refresh queue with their attempts reset
+                sql = ('UPDATE {table} SET last_sent = %s, lease_expires_at = %s, leased_by = %s, {give_up} '
+                       'WHERE id IN ({candidates}) '
+                       'RETURNING id, image_name, source_repo_name, status, latest_tag_updated_at, '
+                       'status = %s OR attempts = 0').format(table=table, give_up=give_up, candidates=candidates_sql)
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, [now, lease_expires_at, worker] + give_up_params + list(candidates_params) +
+                                   [STATUS_FAILED])
+                    rows = cursor.fetchall()
+            images = [self.model(id=row[0], image_name=row[1], source_repo_name=row[2], status=row[3],
+                                 latest_tag_updated_at=row[4], last_sent=now, lease_expires_at=lease_expires_at,
+                                 leased_by=worker)
+                      for row in sorted(rows) if not row[5]]
+            if(len(images) > 0 or len(rows) == 0):
+                return images
+
+    def lease_candidates(self, task, now):
+        # Images of task not leased at now, in lease order, locked when selected (served by the partial index of task)
+        candidates = self.filter(TASK_QUEUES[task]).filter(
+            Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now))
+        return candidates.select_for_update(
+            skip_locked=connections[self.db].features.has_select_for_update_skip_locked).order_by(
+                *TASK_ORDERING.get(task, ['id']))
+
+
 class DockerImage(models.Model):
     image_name = models.CharField(max_length=2048, blank=False, null=False)
     source_repo_name = models.CharField(max_length=2048, blank=True, null=True)
     last_sent = models.DateTimeField(default=None, blank=True, null=True)
+    lease_expires_at = models.DateTimeField(default=None, blank=True, null=True)
+    leased_by = models.CharField(max_length=255, blank=True, null=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_NEW)
+    attempts = models.IntegerField(default=0)
+    crawled_at = models.DateTimeField(default=None, blank=True, null=True)
+    crawl_count = models.IntegerField(default=0)
+    change_count = models.IntegerField(default=0)
+    latest_tag_updated_at = models.DateTimeField(default=None, blank=True, null=True)
+    refresh_priority = models.FloatField(default=None, blank=True, null=True)
     reponame_task=models.BooleanField(default=False)
     imageinfo_task=models.BooleanField(default=False)
+    # Crawled Dockerfiles are stored once in Dockerfile, latest_dockerfile is only set on rows loaded from the dataset
+    # until the dedupe_dockerfiles command moves them there (the 0006 migration when upgrading)
     latest_dockerfile = models.TextField(blank=True, null=True)
+    dockerfile = models.ForeignKey(Dockerfile, on_delete=models.SET_NULL, blank=True, null=True,
+                                   related_name='images')
     dockerfile_source = models.TextField(blank=True, null=True)
     tags_count = models.IntegerField(blank=True, null=True)
     tags_name = models.TextField(blank=True, null=True)
@@ -88,6 +241,25 @@ class DockerImage(models.Model):
     license = models.TextField(blank=True, null=True)
     image_description = models.TextField(blank=True, null=True)
 
+    objects = DockerImageManager()
+
+    class Meta:
+        # Partial indexes matching TASK_QUEUES, so that leasing a task only
+        # scans the images left in its queue
+        indexes = [
+            models.Index(fields=['id'], name='dockerimage_reponame_queue', condition=TASK_QUEUES['reponame']),
+            models.Index(fields=['id'], name='dockerimage_imageinfo_queue', condition=TASK_QUEUES['imageinfo']),
+            models.Index(fields=['id'], name='dockerimage_allimageinfo_queue', condition=TASK_QUEUES['allimageinfo']),
+            models.Index(fields=['-refresh_priority', 'id'], name='dockerimage_refresh_queue',
+                         condition=TASK_QUEUES['refresh']),
+            # The images whose latest_dockerfile is not in Dockerfile yet, which the Dockerfile search also scans
+            models.Index(fields=['id'], name='dockerimage_own_dockerfile', condition=Q(latest_dockerfile__isnull=False)),
+            # Indexes of the search endpoint, trigram indexes serving ILIKE '%...%' on names (see dockerstudy.search)
+            GinIndex(description_search_vector(), name='dockerimage_description_search'),
+            GinIndex(fields=['image_name'], name='dockerimage_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['source_repo_name'], name='dockerimage_repo_trgm', opclasses=['gin_trgm_ops']),
+        ]
+
     def __unicode__(self):
         return '{}'.format(self.id)
 
@@ -99,11 +271,18 @@ class DockerImage(models.Model):
     def __str__(self):
         return self.__unicode__()
 
+    @property
+    def dockerfile_content(self):
+        if(self.dockerfile_id != None):
+            return self.dockerfile.content
+        return self.latest_dockerfile
+
     def to_task_dict(self):
         return {
             'pk': self.id,
             'image_name':self.image_name,
-            'source_repo_name':self.source_repo_name
+            'source_repo_name':self.source_repo_name,
+            'latest_tag_updated_at':self.latest_tag_updated_at
             }
 
     def to_dict(self):
@@ -112,9 +291,18 @@ class DockerImage(models.Model):
             'image_name':self.image_name,
             'source_repo_name':self.source_repo_name,
             'last_sent':self.last_sent,
+            'lease_expires_at':self.lease_expires_at,
+            'leased_by':self.leased_by,
+            'status':self.status,
+            'attempts':self.attempts,
+            'crawled_at':self.crawled_at,
+            'crawl_count':self.crawl_count,
+            'change_count':self.change_count,
+            'latest_tag_updated_at':self.latest_tag_updated_at,
+            'refresh_priority':self.refresh_priority,
             'reponame_task':self.reponame_task,
             'imageinfo_task':self.imageinfo_task,
-            'latest_dockerfile':self.latest_dockerfile,
+            'latest_dockerfile':self.dockerfile_content,
             'dockerfile_source':self.dockerfile_source,
             'tags_count':self.tags_count,
             'tags_name':self.tags_name,
@@ -147,4 +335,39 @@ class DockerImage(models.Model):
             'network_count':self.network_count,
             'license':self.license,
             'image_description':self.image_description
-            }
\ No newline at end of file
+            }
+
+# One row per tag of a DockerImage, normalized from tags_name, image_size and image_updated_at
+class ImageTag(models.Model):
+    image = models.ForeignKey(DockerImage, on_delete=models.CASCADE, related_name='tags')
+    name = models.TextField()
+    full_size = models.BigIntegerField(blank=True, null=True)
+    last_updated = models.DateTimeField(default=None, blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['image', 'name'], name='imagetag_image_name'),
+        ]
+        indexes = [
+            models.Index(fields=['last_updated'], name='imagetag_last_updated'),
+        ]
+
+    def __str__(self):
+        return '{}:{}'.format(self.image_id, self.name)
+
+
+# One row per commit involving the Dockerfile of a DockerImage, normalized from the dockerfile_commit_* lists
+class DockerfileCommit(models.Model):
+    image = models.ForeignKey(DockerImage, on_delete=models.CASCADE, related_name='dockerfile_commits')
+    sha = models.CharField(max_length=40)
+    date = models.DateTimeField(default=None, blank=True, null=True)
+    message = models.TextField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['image', 'date'], name='dockerfilecommit_image_date'),
+            models.Index(fields=['sha'], name='dockerfilecommit_sha'),
+        ]
+
+    def __str__(self):
+        return '{}:{}'.format(self.image_id, self.sha)
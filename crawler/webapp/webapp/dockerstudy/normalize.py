@@ -0,0 +1,124 @@
+import ast
+import itertools
+
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import DockerfileCommit, ImageTag
+
+
+BULK_CREATE_BATCH_SIZE = 1000
+
+
+# An item of a stored list, Timestamp('2019-02-13 15:05:50') being read as its string and nan as None
+def stored_item(node):
+    if(isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'Timestamp' and
+       len(node.args) > 0):
+        node = node.args[0]
+    if(isinstance(node, ast.Name) and node.id == 'nan'):
+        return None
+    return ast.literal_eval(node)
+
+
+# Parse a list stored by str(list) in a TextField, such as tags_name, including the lists stringified by pandas
+def parse_stored_list(value):
+    try:
+        node = ast.parse(value.strip(), mode='eval').body
+        if(not isinstance(node, ast.List)):
+            return []
+        return [stored_item(item) for item in node.elts]
+    except (ValueError, SyntaxError, TypeError, AttributeError, MemoryError, RecursionError):
+        return []
+
+
+# Parse a date crawled from DockerHub or GitHub, e.g. 2019-02-14T09:57:18.123Z or 2019-02-14 09:57:18 (UTC)
+def parse_date(value):
+    if(not value):
+        return None
+    try:
+        date = parse_datetime(str(value))
+    except ValueError:
+        return None
+    if(date != None and timezone.is_naive(date)):
+        date = timezone.make_aware(date, timezone.utc)
+    return date
+
+
+def image_tags(image_id, names, sizes, dates, model=ImageTag):
+    return [model(image_id=image_id, name=name, full_size=size, last_updated=parse_date(date))
+            for name, size, date in zip(names, sizes, dates)]
+
+
+def dockerfile_commits(image_id, shas, dates, messages, model=DockerfileCommit):
+    return [model(image_id=image_id, sha=sha, date=parse_date(date), message=message)
+            for sha, date, message in zip(shas, dates, messages)]
+
+
+# The tags and Dockerfile commits of crawled results, for the results which have them
+def result_children(results):
+    tags = {}
+    commits = {}
+    for result in results:
+        pk = int(result['pk'])
+        if(isinstance(result.get('tags_name'), list)):
+            tags[pk] = image_tags(pk, result['tags_name'], result.get('image_size') or [],
+                                  result.get('image_updated_at') or [])
+        if(isinstance(result.get('dockerfile_commit_sha'), list)):
+            commits[pk] = dockerfile_commits(pk, result['dockerfile_commit_sha'],
+                                             result.get('dockerfile_commit_date') or [],
+                                             result.get('dockerfile_commit_message') or [])
+    return tags, commits
+
+
+# Replace the tags and Dockerfile commits of the images given as {image id: rows}, with the models of apps.
+# Call it in a transaction.
+def replace_children(tags, commits, apps=django_apps):
+    ImageTag = apps.get_model('dockerstudy', 'ImageTag')
+    DockerfileCommit = apps.get_model('dockerstudy', 'DockerfileCommit')
+    # Ignore the results of deleted images, as bulk_update does
+    existing = set(apps.get_model('dockerstudy', 'DockerImage').objects.filter(
+        pk__in=set(tags.keys()) | set(commits.keys())).values_list('pk', flat=True))
+    tags = {pk: rows for pk, rows in tags.items() if pk in existing}
+    commits = {pk: rows for pk, rows in commits.items() if pk in existing}
+    if(len(tags) > 0):
+        ImageTag.objects.filter(image_id__in=list(tags.keys())).delete()
+        # A tag may be listed twice when it is pushed while its pages are crawled
+        ImageTag.objects.bulk_create(itertools.chain.from_iterable(tags.values()),
+                                     batch_size=BULK_CREATE_BATCH_SIZE, ignore_conflicts=True)
+    if(len(commits) > 0):
+        DockerfileCommit.objects.filter(image_id__in=list(commits.keys())).delete()
+        DockerfileCommit.objects.bulk_create(itertools.chain.from_iterable(commits.values()),
+                                             batch_size=BULK_CREATE_BATCH_SIZE)
+
+
+# Fill ImageTag and DockerfileCommit from the stringified lists of DockerImage by id ranges, with the models of apps
+# (the historical models in a migration), yielding the number of images normalized so far after each range
+def normalize_stored_lists(apps=django_apps, batch_size=10000):
+    DockerImage = apps.get_model('dockerstudy', 'DockerImage')
+    ImageTag = apps.get_model('dockerstudy', 'ImageTag')
+    DockerfileCommit = apps.get_model('dockerstudy', 'DockerfileCommit')
+    max_id = DockerImage.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    images = DockerImage.objects.filter(Q(tags_name__isnull=False) | Q(dockerfile_commit_sha__isnull=False))
+    normalized = 0
+    for start in range(0, max_id + 1, batch_size):
+        tags = {}
+        commits = {}
+        for image in images.filter(id__gte=start, id__lt=start + batch_size).values(
+                'id', 'tags_name', 'image_size', 'image_updated_at', 'dockerfile_commit_sha',
+                'dockerfile_commit_date', 'dockerfile_commit_message'):
+            if(image['tags_name'] != None):
+                tags[image['id']] = image_tags(image['id'], parse_stored_list(image['tags_name']),
+                                               parse_stored_list(image['image_size']),
+                                               parse_stored_list(image['image_updated_at']), ImageTag)
+            if(image['dockerfile_commit_sha'] != None):
+                commits[image['id']] = dockerfile_commits(image['id'], parse_stored_list(image['dockerfile_commit_sha']),
+                                                          parse_stored_list(image['dockerfile_commit_date']),
+                                                          parse_stored_list(image['dockerfile_commit_message']),
+                                                          DockerfileCommit)
+        with transaction.atomic():
+            replace_children(tags, commits, apps)
+        normalized += len(set(tags.keys()) | set(commits.keys()))
+        yield normalized
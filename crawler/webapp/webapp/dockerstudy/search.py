@@ -0,0 +1,71 @@
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import models
+
+from .models import (DESCRIPTION_SEARCH_CONFIG, DOCKERFILE_SEARCH_CONFIG, DockerImage, Dockerfile,
+                     description_search_vector, dockerfile_search_vector)
+
+
+SEARCH_PAGE_SIZE = 100
+MAX_SEARCH_PAGE_SIZE = 1000
+# Fields of each image found, kept small so that a page is cheap to fetch
+SEARCH_RESULT_FIELDS = ['id', 'image_name', 'source_repo_name', 'image_pull_count', 'image_star_count']
+
+
+# Case-insensitive LIKE, which the trigram indexes serve, unlike the UPPER(...) LIKE of icontains
+class ILike(models.Func):
+    arg_joiner = ' ILIKE '
+    template = '%(expressions)s'
+    output_field = models.BooleanField()
+
+    def __init__(self, field, pattern):
+        super().__init__(models.F(field), models.Value(pattern))
+
+
+def like_pattern(text):
+    # Pattern matching text anywhere, the LIKE wildcards in it being matched literally
+    return '%{}%'.format(text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+
+
+# Whether some images still have their own latest_dockerfile, e.g. after loading the published dataset until the
+# dedupe_dockerfiles command is run, answered by a partial index
+def has_own_dockerfiles():
+    return DockerImage.objects.filter(latest_dockerfile__isnull=False).exists()
+
+
+# Images after the id after, by increasing id, matching all of: dockerfile and description, web search queries
+# ("phrases", -excluded words) of the Dockerfile and the description, and name, a substring of the image or repo name
+def search_queryset(dockerfile=None, description=None, name=None, after=None):
+    if(not (dockerfile or description or name)):
+        raise ValueError('Nothing to search')
+    images = DockerImage.objects.all()
+    if(dockerfile):
+        query = SearchQuery(dockerfile, config=DOCKERFILE_SEARCH_CONFIG, search_type='websearch')
+        dockerfiles = Dockerfile.objects.annotate(search=dockerfile_search_vector()).filter(search=query)
+        condition = models.Q(dockerfile__in=dockerfiles.values('id'))
+        if(has_own_dockerfiles()):
+            # Not served by an index, only until the Dockerfiles are moved to Dockerfile
+            images = images.annotate(own_dockerfile_search=SearchVector('latest_dockerfile',
+                                                                        config=DOCKERFILE_SEARCH_CONFIG))
+            condition |= models.Q(own_dockerfile_search=query)
+        images = images.filter(condition)
+    if(description):
+        images = images.annotate(description_search=description_search_vector()).filter(
+            description_search=SearchQuery(description, config=DESCRIPTION_SEARCH_CONFIG, search_type='websearch'))
+    if(name):
+        images = images.filter(models.Q(ILike('image_name', like_pattern(name))) |
+                               models.Q(ILike('source_repo_name', like_pattern(name))))
+    if(after != None):
+        images = images.filter(id__gt=after)
+    return images.order_by('id').values(*SEARCH_RESULT_FIELDS, dockerfile_sha256=models.F('dockerfile__sha256'))
+
+
+def keyset_page(results, limit):
+    # The first limit results, and the id to continue after if there are more, fetching one more result to know it
+    results = list(results[:limit + 1])
+    next_after = results[limit - 1]['id'] if len(results) > limit else None
+    return results[:limit], next_after
+
+
+# A page of the images of search_queryset, and the id to continue after, None on the last page
+def search_images(dockerfile=None, description=None, name=None, after=None, limit=SEARCH_PAGE_SIZE):
+    return keyset_page(search_queryset(dockerfile, description, name, after), limit)
@@ -0,0 +1,63 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+
+@pytest.fixture
+def migrate(db):
+    # Migrate the test database to a migration of dockerstudy and return the models as of it,
+    # the database being migrated back to the latest migration after the test
+    def migrate(name):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('dockerstudy', name)])
+        return executor.loader.project_state(('dockerstudy', name)).apps
+    yield migrate
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes('dockerstudy'))
+
+
+def test_backfill_queue_state(migrate):
+    DockerImage = migrate('0002_queue_and_search').get_model('dockerstudy', 'DockerImage')
+    DockerImage.objects.bulk_create([
+        DockerImage(image_name='new'),
+        DockerImage(image_name='reponame', reponame_task=True, source_repo_name='user/repo'),
+        DockerImage(image_name='imageinfo', reponame_task=True, imageinfo_task=True),
+        DockerImage(image_name='imageinfo only', imageinfo_task=True),
+    ])
+    DockerImage = migrate('0003_backfill_queue_state').get_model('dockerstudy', 'DockerImage')
+    assert dict(DockerImage.objects.values_list('image_name', 'status')) == {
+        'new': 'new', 'reponame': 'reponame_done', 'imageinfo': 'done', 'imageinfo only': 'done'}
+
+
+def test_dedupe_image_names(migrate):
+    DockerImageName = migrate('0003_backfill_queue_state').get_model('dockerstudy', 'DockerImageName')
+    DockerImageName.objects.bulk_create([DockerImageName(original_id=original_id, image_name=name) for original_id, name
+                                         in [(1, 'first'), (2, 'second'), (1, 'first again'), (1, 'first once more')]])
+    DockerImageName = migrate('0004_dedupe_image_names').get_model('dockerstudy', 'DockerImageName')
+    assert sorted(DockerImageName.objects.values_list('original_id', 'image_name')) == [(1, 'first'), (2, 'second')]
+    assert DockerImageName._meta.get_field('original_id').unique
+
+
+def test_normalize_lists_and_dedupe_dockerfiles(migrate):
+    DockerImage = migrate('0004_dedupe_image_names').get_model('dockerstudy', 'DockerImage')
+    DockerImage.objects.bulk_create([
+        DockerImage(image_name='crawled', tags_name="['latest', 'v1']", image_size='[10, 9]',
+                    image_updated_at="['2019-02-14T09:57:18.123Z', None]", dockerfile_commit_sha="['abc', 'def']",
+                    dockerfile_commit_date="[Timestamp('2018-10-30 15:34:28'), Timestamp('2019-02-13 15:05:50')]",
+                    dockerfile_commit_message="['Add Dockerfile', 'Update it']", latest_dockerfile='FROM alpine\n'),
+        DockerImage(image_name='same dockerfile', latest_dockerfile='FROM alpine\n'),
+        DockerImage(image_name='not crawled'),
+    ])
+    apps = migrate('0006_dedupe_dockerfiles')
+    crawled, same_dockerfile, not_crawled = apps.get_model('dockerstudy', 'DockerImage').objects.order_by('id')
+    ImageTag = apps.get_model('dockerstudy', 'ImageTag')
+    assert list(ImageTag.objects.order_by('id').values_list('image_id', 'name', 'full_size')) == [
+        (crawled.id, 'latest', 10), (crawled.id, 'v1', 9)]
+    commits = apps.get_model('dockerstudy', 'DockerfileCommit').objects.order_by('id')
+    assert [(commit.sha, commit.date.isoformat(), commit.message) for commit in commits] == [
+        ('abc', '2018-10-30T15:34:28+00:00', 'Add Dockerfile'), ('def', '2019-02-13T15:05:50+00:00', 'Update it')]
+    # One Dockerfile row for both images
+    assert apps.get_model('dockerstudy', 'Dockerfile').objects.get().content == 'FROM alpine\n'
+    assert crawled.dockerfile_id == same_dockerfile.dockerfile_id != None
+    assert crawled.latest_dockerfile == same_dockerfile.latest_dockerfile == None
+    assert not_crawled.dockerfile_id == None
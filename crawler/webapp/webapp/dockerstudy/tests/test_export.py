@@ -0,0 +1,66 @@
+import csv
+import datetime
+import gzip
+import io
+
+import pyarrow.parquet as pq
+from django.utils import timezone
+
+from dockerstudy import export
+from dockerstudy.export import export_dataset
+from dockerstudy.models import DockerImage, Dockerfile
+
+
+COLUMNS = ['image_name', 'tags_count', 'has_wiki', 'pushed_at', 'latest_dockerfile', 'collection_method']
+PUSHED_AT = datetime.datetime(2019, 5, 24, 7, 5, 8, tzinfo=timezone.utc)
+ROWS = [
+    ('user/crawled', 3, 'True', PUSHED_AT, 'FROM alpine\n', 'GitHubCI'),
+    ('user/not-crawled', None, None, None, None, None),
+]
+
+
+def exported(format, columns=COLUMNS, chunk_size=1):
+    f = io.BytesIO()
+    for count in export_dataset(f, format, columns, chunk_size):
+        pass
+    return f.getvalue()
+
+
+def read_parquet(data):
+    return pq.read_table(io.BytesIO(data)).to_pylist()
+
+
+def test_parquet_has_typed_columns_and_nulls(monkeypatch):
+    monkeypatch.setattr(export, 'dataset_rows', lambda columns, chunk_size: iter(ROWS))
+    rows = read_parquet(exported('parquet'))
+    assert rows[0] == {'image_name': 'user/crawled', 'tags_count': 3, 'has_wiki': True, 'pushed_at': PUSHED_AT,
+                       'latest_dockerfile': 'FROM alpine\n', 'collection_method': 'GitHubCI'}
+    assert rows[1] == {'image_name': 'user/not-crawled', 'tags_count': None, 'has_wiki': None, 'pushed_at': None,
+                       'latest_dockerfile': None, 'collection_method': None}
+
+
+def test_csv_spells_missing_collection_methods_na(monkeypatch):
+    monkeypatch.setattr(export, 'dataset_rows', lambda columns, chunk_size: iter(ROWS))
+    rows = list(csv.reader(io.TextIOWrapper(gzip.GzipFile(fileobj=io.BytesIO(exported('csv.gz'))), encoding='utf-8')))
+    assert rows[0] == COLUMNS
+    assert rows[2] == ['user/not-crawled', '', '', '', '', 'NA']
+
+
+def test_export_round_trip(db):
+    dockerfile = Dockerfile.objects.create(sha256='0' * 64, content='FROM alpine\n')
+    DockerImage.objects.create(image_name='user/crawled', source_repo_name='user/repo', tags_count=3, has_wiki='True',
+                               pushed_at=PUSHED_AT, dockerfile=dockerfile, dockerfile_source='GitHub')
+    DockerImage.objects.create(image_name='user/bitbucket', dockerfile_source='DockerHub',
+                               latest_dockerfile='FROM debian\n', has_wiki='False')
+    DockerImage.objects.create(image_name='user/not-crawled')
+    rows = read_parquet(exported('parquet'))
+    assert rows == [
+        {'image_name': 'user/crawled', 'tags_count': 3, 'has_wiki': True, 'pushed_at': PUSHED_AT,
+         'latest_dockerfile': 'FROM alpine\n', 'collection_method': 'GitHubCI'},
+        {'image_name': 'user/bitbucket', 'tags_count': None, 'has_wiki': False, 'pushed_at': None,
+         'latest_dockerfile': 'FROM debian\n', 'collection_method': 'BitbucketCI'},
+        {'image_name': 'user/not-crawled', 'tags_count': None, 'has_wiki': None, 'pushed_at': None,
+         'latest_dockerfile': None, 'collection_method': None},
+    ]
+    assert [row['image_name'] for row in read_parquet(exported('parquet', chunk_size=2))] == [
+        row['image_name'] for row in rows]
@@ -0,0 +1,66 @@
+import pytest
+from django.db import connection, transaction
+from django.utils import timezone
+
+from dockerstudy.dockerfiles import dockerfile_hash
+from dockerstudy.models import (STATUS_DONE, STATUS_NEW, STATUS_REPONAME_DONE, TASK_QUEUES, DockerImage, Dockerfile,
+                               Page)
+from dockerstudy.search import search_queryset
+
+
+def status(i):
+    return STATUS_NEW if i % 100 == 0 else STATUS_REPONAME_DONE if i % 100 == 50 else STATUS_DONE
+
+
+@pytest.fixture
+def explain(db):
+    # The plan of a queryset over mostly crawled rows, few of which match the searches, sequential scans being
+    # disabled so that the plan shows whether an index serves the query, which the small test tables would not need
+    Page.objects.bulk_create([Page(page=page, tag=None if page % 100 == 0 else 'Done') for page in range(1, 2001)])
+    DockerImage.objects.bulk_create([
+        DockerImage(image_name='user/image-%d' % i, status=status(i),
+                    source_repo_name='user/repo-%d' % i if i % 200 == 0 else None,
+                    refresh_priority=float(i) if i % 300 == 0 else None,
+                    image_description='A web server' if i % 500 == 0 else 'An image number %d' % i)
+        for i in range(2000)])
+    contents = ['FROM alpine\nRUN apk add curl %d\n' % i if i % 500 == 0 else 'FROM debian %d\n' % i
+                for i in range(2000)]
+    Dockerfile.objects.bulk_create([Dockerfile(sha256=dockerfile_hash(content), content=content)
+                                    for content in contents])
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    def explain(queryset):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+    return explain
+
+
+def trigram_installed():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() != None
+
+
+@pytest.mark.parametrize('task', sorted(TASK_QUEUES))
+def test_lease_uses_task_queue_index(explain, task):
+    assert 'dockerimage_{}_queue'.format(task) in explain(
+        DockerImage.objects.lease_candidates(task, timezone.now()).values('id')[:10])
+
+
+def test_page_lease_uses_page_queue_index(explain):
+    assert 'page_queue' in explain(Page.objects.lease_candidates(timezone.now()).values('id')[:10])
+
+
+def test_search_uses_full_text_indexes(explain):
+    assert 'dockerfile_content_search' in explain(search_queryset(dockerfile='apk curl'))
+    assert 'dockerimage_description_search' in explain(search_queryset(description='"web server"'))
+
+
+def test_name_search_uses_trigram_indexes(explain):
+    if(not trigram_installed()):
+        pytest.skip('needs the pg_trgm extension')
+    plan = explain(search_queryset(name='image-1234'))
+    assert 'dockerimage_name_trgm' in plan and 'dockerimage_repo_trgm' in plan
@@ -0,0 +1,67 @@
+import pytest
+from django.test import RequestFactory
+from django.utils import timezone
+
+from dockerstudy import views
+from dockerstudy.models import MAX_ATTEMPTS, STATUS_DONE, STATUS_FAILED, STATUS_NEW, DockerImage, Page
+
+
+# A lease expired as soon as it is taken, standing for a worker which crashed
+EXPIRED = timezone.timedelta(0)
+
+
+@pytest.mark.parametrize('query', [{'lease': '0'}, {'lease': '-60'}, {'lease': 'x'}, {'count': 'x'},
+                                   {'task': 'unknown'}])
+def test_invalid_lease_requests(monkeypatch, query):
+    monkeypatch.setattr(views, 'lease_docker_images', lambda *args: pytest.fail('leased'))
+    assert views.lease_tasks(RequestFactory().get('/lease_tasks/', query)).status_code == 400
+
+
+def test_lease_pages(db):
+    Page.objects.bulk_create([Page(page=page, tag='Done' if page == 2 else None) for page in range(1, 6)])
+    pages = Page.objects.lease(2)
+    assert [page.page for page in pages] == [1, 3]
+    assert pages[0].lease_expires_at > timezone.now()
+    # Leased pages are not leased again until their lease expires
+    assert [page.page for page in Page.objects.lease(10, EXPIRED)] == [4, 5]
+    assert [page.page for page in Page.objects.lease(10)] == [4, 5]
+    assert Page.objects.lease(10) == []
+    assert Page.objects.get(page=1).lease_expires_at == pages[0].lease_expires_at
+
+
+def test_lease_images(db):
+    DockerImage.objects.bulk_create([DockerImage(image_name='image/%d' % i) for i in range(3)] +
+                                    [DockerImage(image_name='done', status=STATUS_DONE)])
+    images = DockerImage.objects.lease('reponame', 2, 'worker-1')
+    assert [image.image_name for image in images] == ['image/0', 'image/1']
+    assert images[0].leased_by == 'worker-1' and images[0].status == STATUS_NEW
+    assert DockerImage.objects.get(id=images[0].id).attempts == 1
+    assert [image.image_name for image in DockerImage.objects.lease('reponame', 5, 'worker-2', EXPIRED)] == ['image/2']
+    assert [image.image_name for image in DockerImage.objects.lease('reponame', 5, 'worker-2')] == ['image/2']
+    assert DockerImage.objects.lease('reponame', 5) == []
+
+
+def test_images_leased_too_often_fail(db):
+    image = DockerImage.objects.create(image_name='image')
+    for attempt in range(MAX_ATTEMPTS):
+        assert [leased.id for leased in DockerImage.objects.lease('allimageinfo', 1, lease_time=EXPIRED)] == [image.id]
+    # Given up on, rather than leased again, and the next image leased instead
+    other = DockerImage.objects.create(image_name='other')
+    assert [leased.id for leased in DockerImage.objects.lease('allimageinfo', 1)] == [other.id]
+    image.refresh_from_db()
+    assert image.status == STATUS_FAILED and image.attempts == MAX_ATTEMPTS + 1
+    assert DockerImage.objects.lease('allimageinfo', 1) == []
+
+
+def test_refresh_queue(db):
+    low = DockerImage.objects.create(image_name='low', status=STATUS_DONE, refresh_priority=1.0)
+    high = DockerImage.objects.create(image_name='high', status=STATUS_DONE, refresh_priority=2.0)
+    DockerImage.objects.create(image_name='unscored', status=STATUS_DONE)
+    assert [image.id for image in DockerImage.objects.lease('refresh', 5, lease_time=EXPIRED)] == [low.id, high.id]
+    assert [image.id for image in DockerImage.objects.lease('refresh', 1, lease_time=EXPIRED)] == [high.id]
+    for attempt in range(MAX_ATTEMPTS - 1):
+        DockerImage.objects.lease('refresh', 1, lease_time=EXPIRED)
+    # The crawled image stays done, and leaves the refresh queue with its attempts reset
+    assert [image.id for image in DockerImage.objects.lease('refresh', 1)] == [low.id]
+    high.refresh_from_db()
+    assert high.status == STATUS_DONE and high.refresh_priority == None and high.attempts == 0
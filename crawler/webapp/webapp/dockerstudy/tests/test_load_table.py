@@ -0,0 +1,77 @@
+import pandas as pd
+
+from dockerstudy.management.commands.load_table import copy_chunk, merge_chunk, read_chunks, with_defaults
+from dockerstudy.models import DockerImage
+
+
+class RecordingCursor():
+    # Records the statements and the COPY data instead of running them
+
+    def __init__(self):
+        self.statements = []
+        self.copied = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def copy_expert(self, sql, fileobj):
+        self.statements.append(sql)
+        self.copied.append(fileobj.read())
+
+
+def test_copy_chunk_streams_csv_rows():
+    cursor = RecordingCursor()
+    copy_chunk(cursor, '"dockerstudy_dockerimagename"', pd.DataFrame({'original_id': [1, 2], 'image_name': ['a', 'b,c']}))
+    assert cursor.statements == [
+        'COPY "dockerstudy_dockerimagename" ("original_id", "image_name") FROM STDIN WITH (FORMAT csv)']
+    assert cursor.copied == ['1,a\n2,"b,c"\n']
+
+
+def test_merge_chunk_skips_existing_keys():
+    cursor = RecordingCursor()
+    merge_chunk(cursor, '"t"', pd.DataFrame({'original_id': [1], 'image_name': ['a']}), 'original_id', 'skip')
+    create, copy, insert = cursor.statements
+    assert create.startswith('CREATE TEMP TABLE load_table_chunk ON COMMIT DROP AS SELECT "original_id", "image_name"')
+    assert copy.startswith('COPY load_table_chunk')
+    assert insert == ('INSERT INTO "t" ("original_id", "image_name") SELECT DISTINCT ON (s."original_id") '
+                      's."original_id", s."image_name" FROM load_table_chunk s '
+                      'WHERE NOT EXISTS (SELECT 1 FROM "t" t WHERE t."original_id" = s."original_id")')
+
+
+def test_merge_chunk_updates_existing_keys_in_upsert_mode():
+    cursor = RecordingCursor()
+    merge_chunk(cursor, '"t"', pd.DataFrame({'original_id': [1], 'image_name': ['a']}), 'original_id', 'upsert')
+    assert cursor.statements[2] == ('UPDATE "t" t SET "image_name" = s."image_name" FROM load_table_chunk s '
+                                    'WHERE t."original_id" = s."original_id"')
+    assert cursor.statements[3].startswith('INSERT INTO "t"')
+
+
+def test_merge_chunk_of_keys_only_has_nothing_to_update():
+    cursor = RecordingCursor()
+    merge_chunk(cursor, '"t"', pd.DataFrame({'page': [1, 2]}), 'page', 'upsert')
+    assert not any(statement.startswith('UPDATE') for statement in cursor.statements)
+
+
+def test_with_defaults_fills_required_columns():
+    df = with_defaults(pd.DataFrame({'image_name': ['a', 'b'], 'image_pull_count': [1.0, None]}), DockerImage)
+    assert list(df['status']) == ['new', 'new']
+    assert list(df['attempts']) == [0, 0]
+    assert not 'source_repo_name' in df.columns
+    assert not 'id' in df.columns
+    assert str(df['image_pull_count'].dtype) == 'Int64'
+    assert df['image_pull_count'].isna().tolist() == [False, True]
+
+
+def test_read_chunks_skips_malformed_lines(tmp_path):
+    path = tmp_path / 'names.csv'
+    path.write_text('original_id,image_name\n1,a\n2,b,extra\n3,c\n')
+    chunks = list(read_chunks(str(path), None, 10))
+    assert pd.concat(chunks)['image_name'].tolist() == ['a', 'c']
+
+
+def test_read_chunks_of_parquet_files(tmp_path):
+    path = str(tmp_path / 'names.parquet')
+    pd.DataFrame({'original_id': [1, 2, 3], 'image_name': ['a', 'b', 'c']}).to_parquet(path)
+    chunks = list(read_chunks(path, ['image_name'], 2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert list(chunks[0].columns) == ['image_name']
@@ -0,0 +1,36 @@
+from django.apps import apps
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.state import ProjectState
+
+
+def loader():
+    # Reads the migration files only, without the applied migrations of a database
+    return MigrationLoader(None, ignore_no_migrations=True)
+
+
+def test_single_leaf():
+    assert len(loader().graph.leaf_nodes('dockerstudy')) == 1
+
+
+def test_migrations_match_the_models():
+    migration_loader = loader()
+    changes = MigrationAutodetector(migration_loader.project_state(), ProjectState.from_apps(apps)).changes(
+        migration_loader.graph)
+    assert not 'dockerstudy' in changes
+
+
+def test_trigram_extension_before_trigram_indexes():
+    graph = loader().graph
+    operations = []
+    for key in graph.forwards_plan(graph.leaf_nodes('dockerstudy')[0]):
+        operations.extend(graph.nodes[key].operations)
+    extension = [i for i, operation in enumerate(operations) if isinstance(operation, TrigramExtension)]
+    trigram_indexes = [i for i, operation in enumerate(operations)
+                       if isinstance(operation, migrations.AddIndex) and isinstance(operation.index, GinIndex) and
+                       'gin_trgm_ops' in operation.index.opclasses]
+    assert len(extension) == 1 and len(trigram_indexes) == 2
+    assert extension[0] < min(trigram_indexes)
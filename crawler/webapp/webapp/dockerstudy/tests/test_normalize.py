@@ -0,0 +1,52 @@
+import datetime
+
+from django.utils import timezone
+
+from dockerstudy.normalize import parse_date, parse_stored_list, result_children
+
+
+def test_parse_stored_list():
+    assert parse_stored_list("['latest', 'v1']") == ['latest', 'v1']
+    assert parse_stored_list('[10, None]') == [10, None]
+    assert parse_stored_list('') == []
+    assert parse_stored_list('[unterminated') == []
+    assert parse_stored_list(None) == []
+    assert parse_stored_list("'latest'") == []
+    assert parse_stored_list('[__import__("os")]') == []
+
+
+def test_parse_lists_stringified_by_pandas():
+    # As in the dockerfile_commit_date and image_updated_at of the published dataset
+    dates = parse_stored_list("[Timestamp('2018-10-30 15:34:28'), Timestamp('2019-02-13 15:05:50+0000', tz='UTC')]")
+    assert dates == ['2018-10-30 15:34:28', '2019-02-13 15:05:50+0000']
+    assert [parse_date(date) for date in dates] == [
+        datetime.datetime(2018, 10, 30, 15, 34, 28, tzinfo=timezone.utc),
+        datetime.datetime(2019, 2, 13, 15, 5, 50, tzinfo=timezone.utc)]
+    assert parse_stored_list('[1024.0, nan]') == [1024.0, None]
+    assert parse_stored_list("[Timestamp(x)]") == []
+
+
+def test_parse_date_is_utc():
+    assert parse_date('2019-02-14T09:57:18.123Z') == datetime.datetime(2019, 2, 14, 9, 57, 18, 123000, tzinfo=timezone.utc)
+    assert parse_date('2019-02-14 09:57:18') == datetime.datetime(2019, 2, 14, 9, 57, 18, tzinfo=timezone.utc)
+    assert parse_date('2019-02-14T11:57:18+02:00') == datetime.datetime(2019, 2, 14, 9, 57, 18, tzinfo=timezone.utc)
+    assert parse_date(None) is None
+    assert parse_date('') is None
+    assert parse_date('2019-02-30T00:00:00Z') is None
+    assert parse_date('not a date') is None
+
+
+def test_result_children():
+    tags, commits = result_children([
+        {'pk': '1', 'tags_name': ['latest', 'v1'], 'image_size': [10, 9],
+         'image_updated_at': ['2019-02-14T09:57:18Z', None],
+         'dockerfile_commit_sha': ['abc'], 'dockerfile_commit_date': ['2019-01-01T00:00:00Z'],
+         'dockerfile_commit_message': ['Add Dockerfile']},
+        {'pk': 3, 'image_name': 'user/image'},
+    ])
+    assert list(tags.keys()) == [1]
+    assert list(commits.keys()) == [1]
+    assert [(tag.image_id, tag.name, tag.full_size) for tag in tags[1]] == [(1, 'latest', 10), (1, 'v1', 9)]
+    assert tags[1][0].last_updated == datetime.datetime(2019, 2, 14, 9, 57, 18, tzinfo=timezone.utc)
+    assert tags[1][1].last_updated is None
+    assert [(commit.sha, commit.message) for commit in commits[1]] == [('abc', 'Add Dockerfile')]
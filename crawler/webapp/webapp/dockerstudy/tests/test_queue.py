@@ -0,0 +1,49 @@
+from django.db.models import Case, F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from dockerstudy.models import STATUS_DONE, STATUS_REPONAME_DONE
+from dockerstudy.views import with_crawl_stats, with_queue_status
+
+
+def test_image_info_results_finish_the_image():
+    result = with_queue_status({'pk': 1, 'imageinfo_task': True})
+    assert result['status'] == STATUS_DONE
+    assert result['attempts'] == 0
+    assert result['lease_expires_at'] is None
+    assert 'crawled_at' in result
+
+
+def test_repo_name_results_reset_the_attempts():
+    result = with_queue_status({'pk': 1, 'reponame_task': True, 'source_repo_name': 'user/repo'})
+    assert result['status'] == STATUS_REPONAME_DONE
+    assert result['attempts'] == 0
+    assert result['lease_expires_at'] is None
+    assert not 'crawled_at' in result
+
+
+def test_other_results_are_left_as_is():
+    assert with_queue_status({'pk': 1, 'image_name': 'user/image'}) == {'pk': 1, 'image_name': 'user/image'}
+
+
+def test_crawl_stats():
+    before = timezone.now()
+    result = with_crawl_stats({'pk': 1})
+    assert before <= result['crawled_at'] <= timezone.now()
+    assert result['crawl_count'] == F('crawl_count') + 1
+    assert result['refresh_priority'] is None
+    assert not 'change_count' in result
+
+
+def test_latest_tag_update_is_the_most_recent_tag():
+    result = with_crawl_stats({'pk': 1, 'image_updated_at': [
+        '2019-02-14T09:57:18Z', None, '2019-06-20T10:00:00.123Z', 'not a date', '2018-01-01T00:00:00Z']})
+    assert result['latest_tag_updated_at'] == parse_datetime('2019-06-20T10:00:00.123Z')
+    assert with_crawl_stats({'pk': 1, 'image_updated_at': []})['latest_tag_updated_at'] is None
+
+
+def test_changes_are_counted_when_a_change_field_differs():
+    result = with_crawl_stats({'pk': 1, 'pushed_at': '2019-06-20T10:00:00Z', 'image_updated_at': ['2019-02-14T09:57:18Z']})
+    assert isinstance(result['change_count'], Case)
+    sql = str(result['change_count'])
+    assert 'latest_tag_updated_at' in sql and 'pushed_at' in sql
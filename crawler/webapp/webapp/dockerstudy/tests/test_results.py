@@ -0,0 +1,56 @@
+import json
+
+import pytest
+from django.test import RequestFactory
+
+from dockerstudy import views
+from dockerstudy.models import STATUS_DONE, STATUS_NEW, STATUS_REPONAME_DONE, DockerImage
+from dockerstudy.views import RESULT_FIELDS, update_docker_images
+
+
+def post(results):
+    return views.dockerimages(RequestFactory().post('/dockerimages/', json.dumps(results),
+                                                    content_type='application/json'))
+
+
+def test_result_fields_are_fields():
+    for field in RESULT_FIELDS:
+        DockerImage._meta.get_field(field)
+
+
+@pytest.mark.parametrize('field', ['status', 'attempts', 'lease_expires_at', 'leased_by', 'refresh_priority',
+                                   'dockerfile', 'id', 'unknown'])
+def test_other_fields_are_rejected(field):
+    # Before any query, which needs no database
+    with pytest.raises(ValueError, match=field):
+        update_docker_images([{'pk': 1, 'language': 'Go'}, {'pk': 2, field: None}])
+    assert post([{'pk': 2, 'imageinfo_task': True, field: None}]).status_code == 400
+    assert views.dockerimage(RequestFactory().post('/dockerimage/', json.dumps({'pk': 2, field: 1}),
+                                                   content_type='application/json')).status_code == 400
+
+
+def test_invalid_bodies():
+    assert post({'pk': 1}).status_code == 400
+    assert post([1]).status_code == 400
+
+
+def test_results_with_different_fields(db):
+    images = DockerImage.objects.bulk_create([DockerImage(image_name='image/%d' % i) for i in range(4)])
+    response = post([
+        {'pk': images[0].pk, 'reponame_task': True, 'source_repo_name': 'user/repo'},
+        {'pk': images[1].pk, 'imageinfo_task': True, 'language': 'Go', 'latest_dockerfile': 'FROM alpine\n',
+         'tags_name': ['latest'], 'image_size': [10], 'image_updated_at': ['2019-02-14T09:57:18Z']},
+        {'pk': images[2].pk, 'imageinfo_task': True, 'latest_dockerfile': 'FROM alpine\n'},
+    ])
+    assert response.status_code == 200 and json.loads(response.content)['count'] == 3
+    first, second, third, untouched = DockerImage.objects.order_by('id')
+    assert first.status == STATUS_REPONAME_DONE and first.source_repo_name == 'user/repo'
+    assert second.status == STATUS_DONE and second.language == 'Go' and second.crawl_count == 1
+    assert [tag.name for tag in second.tags.all()] == ['latest']
+    assert third.status == STATUS_DONE and third.language == None
+    # Both images refer to the same stored Dockerfile
+    assert second.dockerfile_id == third.dockerfile_id and second.dockerfile_content == 'FROM alpine\n'
+    assert untouched.status == STATUS_NEW and untouched.crawl_count == 0
+    # A batch with a forbidden field is rejected as a whole
+    assert post([{'pk': images[3].pk, 'language': 'C'}, {'pk': images[0].pk, 'status': 'new'}]).status_code == 400
+    assert DockerImage.objects.get(pk=images[3].pk).language == None
@@ -0,0 +1,106 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db import models
+from django.test import RequestFactory
+
+from dockerstudy import views
+from dockerstudy.dockerfiles import dockerfile_hash
+from dockerstudy.models import DockerImage, Dockerfile
+from dockerstudy.search import (MAX_SEARCH_PAGE_SIZE, SEARCH_PAGE_SIZE, has_own_dockerfiles, keyset_page, like_pattern,
+                                search_images, search_queryset)
+
+
+def test_like_pattern_matches_wildcards_literally():
+    assert like_pattern('nginx') == '%nginx%'
+    assert like_pattern('100%_sure\\') == '%100\\%\\_sure\\\\%'
+
+
+def test_name_search_uses_ilike():
+    sql = str(search_queryset(name='my_app').query)
+    assert '"image_name" ILIKE %my\\_app%' in sql
+    assert '"source_repo_name" ILIKE %my\\_app%' in sql
+    assert not 'UPPER(' in sql
+    # ILike is an expression of the search only, not a lookup added to every CharField
+    assert models.CharField().get_lookup('ilike') == None
+
+
+def test_full_text_search_and_keyset(monkeypatch):
+    monkeypatch.setattr('dockerstudy.search.has_own_dockerfiles', lambda: False)
+    sql = str(search_queryset(dockerfile='apt-get -curl', description='"web server"', after=42).query)
+    assert 'websearch_to_tsquery' in sql
+    assert '"dockerstudy_dockerfile"' in sql
+    assert not 'latest_dockerfile' in sql
+    assert '"dockerstudy_dockerimage"."id" > 42' in sql
+    assert sql.endswith('ORDER BY "dockerstudy_dockerimage"."id" ASC')
+    # Images with their own Dockerfile are searched too until it is moved to Dockerfile
+    monkeypatch.setattr('dockerstudy.search.has_own_dockerfiles', lambda: True)
+    assert '"dockerstudy_dockerimage"."latest_dockerfile"' in str(search_queryset(dockerfile='apt-get').query)
+
+
+def test_dockerfile_search(db):
+    dockerfiles = [Dockerfile.objects.create(sha256=dockerfile_hash(content), content=content)
+                   for content in ['FROM alpine\nRUN apk add curl\n', 'FROM debian\nRUN apt-get install wget\n']]
+    DockerImage.objects.bulk_create([
+        DockerImage(image_name='stored/curl', dockerfile=dockerfiles[0]),
+        DockerImage(image_name='stored/wget', dockerfile=dockerfiles[1]),
+        DockerImage(image_name='loaded/curl', latest_dockerfile='FROM ubuntu\nRUN apt-get install curl\n'),
+    ])
+    names = lambda query: [image['image_name'] for image in search_images(dockerfile=query)[0]]
+    assert names('curl') == ['stored/curl', 'loaded/curl']
+    assert names('apt-get -wget') == ['loaded/curl']
+    call_command('dedupe_dockerfiles', stdout=io.StringIO())
+    assert not has_own_dockerfiles()
+    assert names('curl') == ['stored/curl', 'loaded/curl']
+    assert names('"apt-get install"') == ['stored/wget', 'loaded/curl']
+
+
+@pytest.mark.parametrize('criteria', [{}, {'name': ''}, {'after': 10}])
+def test_nothing_to_search(criteria):
+    with pytest.raises(ValueError):
+        search_queryset(**criteria)
+
+
+class Results(list):
+    # Records the slices taken, as a queryset would fetch them
+    def __getitem__(self, index):
+        if(isinstance(index, slice)):
+            self.fetched = index
+        return list.__getitem__(self, index)
+
+
+def test_keyset_page():
+    results = Results({'id': i} for i in [3, 5, 8, 13, 21])
+    assert keyset_page(results, 2) == ([{'id': 3}, {'id': 5}], 5)
+    assert results.fetched == slice(None, 3)
+    assert keyset_page(results, 4) == ([{'id': 3}, {'id': 5}, {'id': 8}, {'id': 13}], 13)
+    assert keyset_page(results, 5) == (list(results), None)
+    assert keyset_page(Results(), 5) == ([], None)
+
+
+def search(monkeypatch, query):
+    calls = []
+
+    def search_images(*args):
+        calls.append(args)
+        return [{'id': 1}], None
+    monkeypatch.setattr(views, 'search_images', search_images)
+    response = views.search(RequestFactory().get('/dockerstudy/search/', query))
+    return response, calls
+
+
+def test_search_view(monkeypatch):
+    response, calls = search(monkeypatch, {'name': 'nginx', 'after': '7'})
+    assert response.status_code == 200
+    assert json.loads(response.content) == {'results': [{'id': 1}], 'next': None}
+    assert calls == [(None, None, 'nginx', 7, SEARCH_PAGE_SIZE)]
+    assert search(monkeypatch, {'name': 'nginx', 'limit': '100000'})[1][0][-1] == MAX_SEARCH_PAGE_SIZE
+    assert search(monkeypatch, {'name': 'nginx', 'limit': '0'})[1][0][-1] == 1
+    assert search(monkeypatch, {'name': 'nginx', 'after': 'x'})[0].status_code == 400
+
+
+def test_search_view_without_criteria():
+    response = views.search(RequestFactory().get('/dockerstudy/search/', {'limit': '10'}))
+    assert response.status_code == 400
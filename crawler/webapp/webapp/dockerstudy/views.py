@@ -1,13 +1,34 @@
-from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.core.exceptions import FieldDoesNotExist
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.csrf import csrf_exempt
 from .models import DockerImageName
 from .models import Page
 from .models import DockerImage
+from .models import STATUS_DONE, STATUS_REPONAME_DONE
+from .dockerfiles import with_dockerfiles
+from .export import EXPORT_CHUNK_SIZE, stream_dataset
+from .normalize import parse_stored_list, replace_children, result_children
+from .search import MAX_SEARCH_PAGE_SIZE, SEARCH_PAGE_SIZE, search_images
 import random
 import json
+import gzip
+
+
+BULK_CREATE_BATCH_SIZE = 1000
+
+
+# Save image names and mark their pages as done. Names already saved are skipped,
+# so a page posted twice (e.g. after its lease expired) does not create duplicates.
+def save_image_names(image_dic, pages):
+    images = [DockerImageName(original_id=int(key), image_name=image_dic[key]) for key in image_dic.keys()]
+    with transaction.atomic():
+        DockerImageName.objects.bulk_create(images, batch_size=BULK_CREATE_BATCH_SIZE, ignore_conflicts=True)
+        Page.objects.filter(page__in=pages).update(tag='Done', lease_expires_at=None)
 
 
 @csrf_exempt
@@ -20,93 +41,316 @@ def post_image_name(request):
         'msg': 'Bad Request',
         'code': 502,
         })
-    for key in image_dic.keys():
-        image = DockerImageName(original_id=key, image_name=image_dic[key])
-        image.save()
     page = get_object_or_404(Page, page=jsondata['page'])
-    page.tag = 'Done'
-    page.save(update_fields=['tag'])
+    save_image_names(image_dic, [page.page])
     return JsonResponse({
         'msg': 'OK!',
         'code': 200,
     })
 
 
+#Post the image names of many pages at once
+#body: {"image_list": {original_id: image_name, ...}, "pages": [page, ...]}, optionally gzip-compressed
 @csrf_exempt
-def get_image_name_task(request):
-    last_process_threshold = timezone.now() - timezone.timedelta(minutes=2)
-    pages = Page.objects.filter(Q(last_sent__lte=last_process_threshold, tag__isnull=True) | Q(
-        last_sent__isnull=True)).order_by('page')
+def post_image_names(request):
     try:
-        page = pages[0]
-    except Exception:
+        jsondata = json.loads(read_body(request))
+        save_image_names(jsondata['image_list'], [int(page) for page in jsondata['pages']])
+    except (ValueError, KeyError, TypeError, AttributeError, OSError):
+        return HttpResponseBadRequest('Invalid image names')
+    return JsonResponse({
+        'msg': 'OK!',
+        'code': 200,
+        'count': len(jsondata['image_list'])
+    })
+
+
+# Default lease time of a single page
+PAGE_LEASE_MINUTES = 2
+
+
+@csrf_exempt
+def get_image_name_task(request):
+    pages = Page.objects.lease()
+    if(len(pages) == 0):
         return HttpResponseBadRequest('No more pages left')
-    page.update_last_sent()
-    page.save(update_fields=["last_sent"])
-    obj = page.to_dict()
+    obj = pages[0].to_dict()
     return JsonResponse(obj)
 
+
+#Lease a batch of pages of the DockerHub search results
+@csrf_exempt
+def lease_pages(request):
+    try:
+        count = min(max(int(request.GET.get('count', 1)), 1), MAX_LEASE_COUNT)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid count')
+    pages = Page.objects.lease(count, timezone.timedelta(minutes=PAGE_LEASE_MINUTES) * min(count, MAX_LEASED_TASK_TIMES))
+    return JsonResponse({
+        'pages': [page.page for page in pages],
+        'lease_expires_at': pages[0].lease_expires_at if pages else None,
+    })
+
+# Default lease time of a single image for each task.
+# The lease time of crawl_all_images_info_task is higher, as some images have thousands of tags.
+TASK_LEASE_MINUTES = {
+    'reponame': 2,
+    'imageinfo': 2,
+    'allimageinfo': 5,
+    'refresh': 5,
+}
+MAX_LEASE_COUNT = 1000
+# A batch is leased for at most this many times the lease time of a single task, so that the
+# tasks leased by a crashed worker are not locked for long. A larger batch should be crawled
+# concurrently, its results being posted along the way.
+MAX_LEASED_TASK_TIMES = 10
+
+
+def lease_docker_images(task, count=1, worker=None, lease_seconds=None):
+    max_lease_time = timezone.timedelta(minutes=TASK_LEASE_MINUTES[task]) * MAX_LEASED_TASK_TIMES
+    if(lease_seconds is None):
+        lease_time = timezone.timedelta(minutes=TASK_LEASE_MINUTES[task]) * count
+    else:
+        lease_time = timezone.timedelta(seconds=lease_seconds)
+    return DockerImage.objects.lease(task, count, worker, min(lease_time, max_lease_time))
+
+#Lease a batch of images for one of the tasks below
+#identifier: the task name (reponame / imageinfo / allimageinfo / refresh)
+@csrf_exempt
+def lease_tasks(request):
+    task = request.GET.get('task', 'allimageinfo')
+    if(task not in TASK_LEASE_MINUTES):
+        return HttpResponseBadRequest('Unknown task')
+    try:
+        count = min(max(int(request.GET.get('count', 1)), 1), MAX_LEASE_COUNT)
+        lease_seconds = request.GET.get('lease')
+        if(lease_seconds is not None):
+            lease_seconds = int(lease_seconds)
+            if(lease_seconds <= 0):
+                raise ValueError('The lease must be positive')
+    except ValueError:
+        return HttpResponseBadRequest('Invalid count or lease')
+    images = lease_docker_images(task, count, request.GET.get('worker'), lease_seconds)
+    return JsonResponse({
+        'tasks': [image.to_task_dict() for image in images],
+        'lease_expires_at': images[0].lease_expires_at if images else None,
+    })
+
 #Get source repo name only
 #identifier: reponame_task
 @csrf_exempt
 def get_source_repo_name_task(request):
-    last_process_threshold = timezone.now() - timezone.timedelta(minutes=2)
-    images = DockerImage.objects.filter(Q(last_sent__lte=last_process_threshold, reponame_task=False) | Q(last_sent__isnull=True))
-    try:
-        image = images[0]
-    except Exception:
+    images = lease_docker_images('reponame')
+    if(len(images) == 0):
         return HttpResponseBadRequest('No more images left')
-    image.update_last_sent()
-    image.save(update_fields=["last_sent"])
-    obj = image.to_task_dict()
+    obj = images[0].to_task_dict()
     return JsonResponse(obj)
 
 #Crawl image info which has a source repo
 #identifier: imageinfo_task
 @csrf_exempt
 def docker_image_info_crawler_task(request):
-    last_process_threshold = timezone.now() - timezone.timedelta(minutes=2)
-    images = DockerImage.objects.filter(Q(source_repo_name__isnull=False, last_sent__lte=last_process_threshold, imageinfo_task=False) | Q(source_repo_name__isnull=False, last_sent__isnull=True))
-    try:
-        image = images[0]
-    except Exception:
+    images = lease_docker_images('imageinfo')
+    if(len(images) == 0):
         return JsonResponse({
         'msg': 'No more images left',
         'code': 400})
-    image.update_last_sent()
-    image.save(update_fields=["last_sent"])
-    obj = image.to_task_dict()
+    obj = images[0].to_task_dict()
     return JsonResponse(obj)
 
 #Crawl image info, no matter it has a source repo or not
 #identifier: imageinfo_task
-# The last process threshold should be high, as some images may have thousands of tags.
 @csrf_exempt
 def crawl_all_images_info_task(request):
-    last_process_threshold = timezone.now() - timezone.timedelta(minutes=30)
-    images = DockerImage.objects.filter(Q(last_sent__lte=last_process_threshold, imageinfo_task=False) | Q(last_sent__isnull=True))
-    try:
-        image = images[0]
-    except Exception:
+    images = lease_docker_images('allimageinfo')
+    if(len(images) == 0):
         return JsonResponse({
         'msg': 'No more images left',
         'code': 400})
-    image.update_last_sent()
-    image.save(update_fields=["last_sent"])
-    obj = image.to_task_dict()
+    obj = images[0].to_task_dict()
     return JsonResponse(obj)
 
+# Move an image along the task queue once the result of a task is posted
+def with_queue_status(result):
+    if(result.get('imageinfo_task')):
+        return with_crawl_stats(dict(result, status=STATUS_DONE, lease_expires_at=None, attempts=0))
+    if(result.get('reponame_task')):
+        # The leases of the reponame task do not count against the attempts of the imageinfo task
+        return dict(result, status=STATUS_REPONAME_DONE, lease_expires_at=None, attempts=0)
+    return result
+
+# Fields compared with their previous value to tell whether an image changed since its last crawl
+CHANGE_FIELDS = ['latest_tag_updated_at', 'pushed_at']
+
+# Record when an image was crawled and whether it changed, for scheduling refreshes.
+# The image leaves the refresh queue until its priority is scored again.
+def with_crawl_stats(result):
+    result = dict(result, crawled_at=timezone.now(), crawl_count=F('crawl_count') + 1, refresh_priority=None)
+    if(isinstance(result.get('image_updated_at'), list)):
+        dates = [parse_datetime(date) for date in result['image_updated_at'] if date]
+        dates = [date for date in dates if date != None]
+        result['latest_tag_updated_at'] = max(dates) if dates else None
+    changes = [Q(**{key + '__isnull': False}) & ~Q(**{key: result[key]})
+               for key in CHANGE_FIELDS if result.get(key) != None]
+    if(len(changes) > 0):
+        changed = changes[0]
+        for change in changes[1:]:
+            changed |= change
+        result['change_count'] = Case(When(changed, then=F('change_count') + 1), default=F('change_count'))
+    return result
+
+# Incremental crawls only post the tags updated since the last crawl. Put them in front of the
+# stored tags, replacing stored tags of the same name. Tags deleted from DockerHub are only
+# removed by a full crawl.
+def merge_incremental_tags(results):
+    pks = [int(result['pk']) for result in results if result.get('tags_incremental')]
+    stored = {}
+    if(len(pks) > 0):
+        stored = {image['pk']: image for image in DockerImage.objects.filter(pk__in=pks).values(
+            'pk', 'tags_name', 'image_size', 'image_updated_at')}
+    merged = []
+    for result in results:
+        result = dict(result)
+        if(result.pop('tags_incremental', False) and int(result['pk']) in stored and 'tags_name' in result):
+            image = stored[int(result['pk'])]
+            names = set(result['tags_name'])
+            tags = zip(parse_stored_list(image['tags_name']), parse_stored_list(image['image_size']),
+                       parse_stored_list(image['image_updated_at']))
+            result['tags_name'] = list(result['tags_name'])
+            result['image_size'] = list(result['image_size'])
+            result['image_updated_at'] = list(result['image_updated_at'])
+            for name, size, updated_at in tags:
+                if(name not in names):
+                    result['tags_name'].append(name)
+                    result['image_size'].append(size)
+                    result['image_updated_at'].append(updated_at)
+        merged.append(result)
+    return merged
+
 @csrf_exempt
 def dockerimage(request):
     body_unicode = request.body.decode('utf-8')
-    jsondata = json.loads(body_unicode)
+    try:
+        jsondata = json.loads(body_unicode)
+        check_result_fields(jsondata)
+    except (ValueError, AttributeError):
+        return HttpResponseBadRequest('Invalid result')
+    jsondata = with_queue_status(merge_incremental_tags([jsondata])[0])
     image = get_object_or_404(DockerImage, pk=int(jsondata['pk']))
-    update_fields=list(jsondata.keys())
-    update_fields.remove('pk')
-    for key in update_fields:
-        setattr(image,key,jsondata[key])
-    image.save(update_fields=update_fields)
+    with transaction.atomic():
+        jsondata = with_dockerfiles([jsondata])[0]
+        update_fields=list(jsondata.keys())
+        update_fields.remove('pk')
+        for key in update_fields:
+            setattr(image,key,jsondata[key])
+        image.save(update_fields=update_fields)
+        replace_children(*result_children([jsondata]))
     return JsonResponse({
         'msg': 'OK!',
         'code': 200
     })
+
+
+BULK_UPDATE_BATCH_SIZE = 100
+
+
+# Read the body of a request, optionally gzip-compressed
+def read_body(request):
+    body = request.body
+    if(request.META.get('HTTP_CONTENT_ENCODING') == 'gzip'):
+        body = gzip.decompress(body)
+    return body.decode('utf-8')
+
+
+# Read a list of results from a JSON array or NDJSON body, optionally gzip-compressed
+def read_results(request):
+    body_unicode = read_body(request)
+    if(request.content_type == 'application/x-ndjson'):
+        return [json.loads(line) for line in body_unicode.splitlines() if line.strip()]
+    results = json.loads(body_unicode)
+    if(not isinstance(results, list)):
+        raise ValueError('Expected a list of results')
+    return results
+
+
+# Fields of DockerImage set by the results posted by the crawlers, the others being set by the webapp only
+RESULT_FIELDS = set([
+    'source_repo_name', 'reponame_task', 'imageinfo_task', 'latest_dockerfile', 'dockerfile_source', 'tags_count',
+    'tags_name', 'image_size', 'image_updated_at', 'image_pull_count', 'image_star_count', 'repo_commits_count',
+    'dockerfile_commit_sha', 'dockerfile_commit_date', 'dockerfile_commit_message', 'language', 'forks_count',
+    'stargazers_count', 'watchers_count', 'repo_size', 'default_branch', 'open_issues_count', 'topics', 'has_issues',
+    'has_projects', 'has_wiki', 'has_pages', 'has_downloads', 'archived', 'pushed_at', 'created_at', 'updated_at',
+    'subscribers_count', 'network_count', 'license', 'image_description',
+])
+
+
+def check_result_fields(result):
+    fields = set(result.keys()) - RESULT_FIELDS - set(['pk', 'tags_incremental'])
+    if(len(fields) > 0):
+        raise ValueError('Fields not set by results: {}'.format(', '.join(sorted(fields))))
+
+
+# Apply crawled results with one bulk UPDATE per distinct set of updated fields,
+# store their Dockerfiles once per content and replace the tags and Dockerfile
+# commits of the images in their own tables
+def update_docker_images(results):
+    for result in results:
+        check_result_fields(result)
+    results = merge_incremental_tags(results)
+    with transaction.atomic():
+        groups = {}
+        for result in map(with_queue_status, with_dockerfiles(results)):
+            update_fields = tuple(sorted(key for key in result.keys() if key != 'pk'))
+            image = DockerImage(pk=int(result['pk']))
+            for key in update_fields:
+                setattr(image, key, result[key])
+            groups.setdefault(update_fields, {})[image.pk] = image
+        for update_fields, images in groups.items():
+            if(len(update_fields) > 0):
+                DockerImage.objects.bulk_update(list(images.values()), update_fields, batch_size=BULK_UPDATE_BATCH_SIZE)
+        replace_children(*result_children(results))
+
+
+@csrf_exempt
+def dockerimages(request):
+    try:
+        results = read_results(request)
+        update_docker_images(results)
+    except (ValueError, KeyError, TypeError, AttributeError, OSError):
+        return HttpResponseBadRequest('Invalid results')
+    return JsonResponse({
+        'msg': 'OK!',
+        'code': 200,
+        'count': len(results)
+    })
+
+
+#Download the dataset, streamed from a server-side cursor
+#format: csv.gz (default) or parquet, columns: comma separated, those of the published dataset by default
+def export_dataset(request):
+    format = request.GET.get('format', 'csv.gz')
+    columns = request.GET['columns'].split(',') if request.GET.get('columns') else None
+    try:
+        stream = stream_dataset(format, columns, EXPORT_CHUNK_SIZE)
+    except (ValueError, FieldDoesNotExist):
+        return HttpResponseBadRequest('Invalid format or columns')
+    response = StreamingHttpResponse(stream, content_type='application/octet-stream')
+    response['Content-Disposition'] = 'attachment; filename="docker_image_dataset.{}"'.format(format)
+    return response
+
+
+#Search images, a page at a time, by increasing id
+#dockerfile, description: web search queries, name: part of the image or source repo name,
+#after: the "next" of the previous page, limit: images per page
+def search(request):
+    try:
+        limit = min(max(int(request.GET.get('limit', SEARCH_PAGE_SIZE)), 1), MAX_SEARCH_PAGE_SIZE)
+        after = int(request.GET['after']) if request.GET.get('after') else None
+        results, next_after = search_images(request.GET.get('dockerfile'), request.GET.get('description'),
+                                            request.GET.get('name'), after, limit)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid search')
+    return JsonResponse({
+        'results': results,
+        'next': next_after,
+    })